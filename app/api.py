@@ -0,0 +1,208 @@
+# api.py
+import base64
+import gzip
+import hashlib
+import json
+from datetime import datetime
+
+from flask import Blueprint, Response, abort, request
+
+from . import metrics
+from .cache import response_cache
+from .config import app
+from .guid import Guid
+from .movie import Movie
+from .section import Section
+from .server import Server
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+api = Blueprint("api", __name__, url_prefix="/api")
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+MIN_COMPRESS_SIZE = 512
+RESERVED_ARGS = {"after", "limit", "fields", "sort"}
+OPERATORS = {
+    "gt": ">",
+    "lt": "<",
+    "gte": ">=",
+    "lte": "<=",
+    "ne": "!=",
+    "like": "like",
+    "ilike": "ilike",
+}
+
+
+def _coerce(column, value):
+    if value is None:
+        return None
+    python_type = column.type.python_type
+    if python_type is bool:
+        return str(value).lower() in ("1", "true", "yes")
+    if python_type is datetime:
+        return datetime.fromisoformat(value)
+    if python_type in (int, float):
+        return python_type(value)
+    return value
+
+
+def _encode_cursor(cursor):
+    if isinstance(cursor, tuple):
+        value = cursor[0].isoformat() if isinstance(cursor[0], datetime) else cursor[0]
+        cursor = [value, cursor[1]]
+    return base64.urlsafe_b64encode(json.dumps(cursor).encode()).decode()
+
+
+def _decode_cursor(model, token, key):
+    try:
+        cursor = json.loads(base64.urlsafe_b64decode(token.encode()))
+        if key == "id":
+            return int(cursor)
+        return _coerce(model.__table__.columns[key], cursor[0]), int(cursor[1])
+    except (ValueError, TypeError, IndexError, KeyError):
+        abort(400, description="Invalid cursor")
+
+
+def _filters(model, args):
+    columns = model.__table__.columns
+    filters = []
+    for arg, value in args.items():
+        if arg in RESERVED_ARGS:
+            continue
+        field, _, operator = arg.partition("__")
+        if field not in columns or field in model._hidden_fields:
+            abort(400, description=f"Unknown field: {field}")
+        if operator and operator not in OPERATORS:
+            abort(400, description=f"Unknown operator: {operator}")
+        try:
+            value = _coerce(columns[field], value)
+        except ValueError:
+            abort(400, description=f"Invalid value for {field}")
+        filters.append((field, OPERATORS.get(operator, "="), value))
+    return filters
+
+
+def _accepted_encodings(header):
+    """The codings of an Accept-Encoding header with q > 0."""
+    accepted = set()
+    for item in header.split(","):
+        coding, *params = (part.strip() for part in item.split(";"))
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if coding and q > 0:
+            accepted.add(coding.lower())
+    return accepted
+
+
+def _compress(response):
+    accept_encoding = _accepted_encodings(request.headers.get("Accept-Encoding", ""))
+    if response.status_code != 200 or len(response.get_data()) < MIN_COMPRESS_SIZE:
+        return response
+    if brotli is not None and "br" in accept_encoding:
+        response.set_data(brotli.compress(response.get_data()))
+        response.headers["Content-Encoding"] = "br"
+    elif "gzip" in accept_encoding:
+        response.set_data(gzip.compress(response.get_data(), compresslevel=6))
+        response.headers["Content-Encoding"] = "gzip"
+    response.vary.add("Accept-Encoding")
+    return response
+
+
+def list_records(model):
+    """Keyset-paginated JSON listing of ``model`` built on Model.search.
+
+    Query args: field filters (``year=1988``, ``year__gte=1980``), ``sort``
+    (a column, default id), ``after`` (the ``next`` cursor of the previous
+    page), ``limit`` and ``fields`` (comma-separated projection). Bodies are
+    served from the response cache until ``model`` is written to.
+    """
+    key = response_cache.key(request.path, request.args, [model.__tablename__])
+    body = response_cache.get(key)
+    if body is None:
+        body = _render_page(model)
+        response_cache.set(key, body)
+    response = Response(body, mimetype="application/json")
+    response.set_etag(hashlib.sha1(body.encode()).hexdigest(), weak=True)
+    response.make_conditional(request)
+    return _compress(response)
+
+
+def _render_page(model):
+    columns = model.__table__.columns
+    key = request.args.get("sort", "id")
+    if key not in columns or key in model._hidden_fields:
+        abort(400, description=f"Unknown sort field: {key}")
+    try:
+        limit = min(int(request.args.get("limit", DEFAULT_LIMIT)), MAX_LIMIT)
+    except ValueError:
+        abort(400, description="Invalid limit")
+    fields = None
+    if request.args.get("fields"):
+        fields = request.args["fields"].split(",")
+        unknown = [f for f in fields if f not in columns or f in model._hidden_fields]
+        if unknown:
+            abort(400, description=f"Unknown fields: {', '.join(unknown)}")
+    after = request.args.get("after")
+    if after is not None:
+        after = _decode_cursor(model, after, key)
+
+    results = model.search(_filters(model, request.args))
+    if fields:
+        results = results.only(*set(fields) | {key})
+    records = results.page(after=after, limit=limit, key=key)
+    next_cursor = None
+    if len(records) == limit:
+        next_cursor = _encode_cursor(results.cursor(records[-1], key))
+    return json.dumps({
+        "data": [record.to_dict(fields) for record in records],
+        "next": next_cursor,
+    }, separators=(",", ":"))
+
+
+@api.route("/movies")
+def movies():
+    return list_records(Movie)
+
+
+@api.route("/guids")
+def guids():
+    return list_records(Guid)
+
+
+@api.route("/sections")
+def sections():
+    return list_records(Section)
+
+
+@api.route("/servers")
+def servers():
+    return list_records(Server)
+
+
+@api.route("/cache")
+def cache_stats():
+    return {
+        "responses": response_cache.stats(),
+        "entities": {
+            model.__name__: model.entity_cache_stats()
+            for model in (Movie, Section)
+        },
+    }
+
+
+@app.route("/metrics")
+def prometheus_metrics():
+    return Response(metrics.registry.render(), content_type=metrics.CONTENT_TYPE)
+
+
+app.register_blueprint(api)
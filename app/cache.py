@@ -0,0 +1,211 @@
+# cache.py
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlencode
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from .config import redis_url, response_cache_ttl
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+
+class LRUCache:
+    """Thread-safe bounded mapping that evicts the least recently used key."""
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            return default
+
+    def get_many(self, keys):
+        """Return ({key: value} for cached keys, [missing keys])."""
+        found = {}
+        missing = []
+        with self._lock:
+            for key in keys:
+                if key in self._data:
+                    self._data.move_to_end(key)
+                    found[key] = self._data[key]
+                else:
+                    missing.append(key)
+            self.hits += len(found)
+            self.misses += len(missing)
+        return found, missing
+
+    def set(self, key, value):
+        self.set_many({key: value})
+
+    def set_many(self, mapping):
+        with self._lock:
+            for key, value in mapping.items():
+                self._data[key] = value
+                self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate(self, key):
+        self.invalidate_many([key])
+
+    def invalidate_many(self, keys):
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        requests = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / requests if requests else 0.0,
+        }
+
+
+def invalidate_on_commit(session, cache, keys=None):
+    """Drop ``keys`` (None: every key) of ``cache`` for a write made in ``session``.
+
+    They are dropped now, so the writing transaction does not read stale
+    entries, and again once it commits or rolls back: another thread may
+    cache the old rows between this write and the commit, and those must
+    not outlive it.
+    """
+    pending = session.info.setdefault("invalidate", {})
+    if keys is None:
+        cache.clear()
+        pending[cache] = None
+        return
+    keys = set(keys)
+    cache.invalidate_many(keys)
+    if pending.get(cache, ()) is not None:
+        pending.setdefault(cache, set()).update(keys)
+
+
+@event.listens_for(Session, "after_commit")
+@event.listens_for(Session, "after_rollback")
+def _invalidate_pending(session):
+    for cache, keys in session.info.pop("invalidate", {}).items():
+        if keys is None:
+            cache.clear()
+        else:
+            cache.invalidate_many(keys)
+
+
+class ResponseCache:
+    """Cache of rendered read responses, invalidated by model generations.
+
+    Every committed write bumps a per-model generation counter and cache
+    keys embed the current generations of the models a route reads, so
+    entries built before a write are simply never looked up again and age
+    out through the TTL. Uses Redis when ``REDIS_URL`` is set, otherwise an
+    in-process LRU (single process, e.g. tests).
+    """
+
+    prefix = "plex_db"
+
+    def __init__(self, url=None, ttl=300, maxsize=4096):
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.redis = redis.Redis.from_url(url) if url and redis else None
+        self._local = LRUCache(maxsize)
+        self._generations = {}
+        self._lock = threading.Lock()
+        self._logger = logging.getLogger(self.__class__.__name__)
+
+    def bump(self, name):
+        if self.redis is not None:
+            try:
+                self.redis.incr(f"{self.prefix}:generation:{name}")
+                return
+            except redis.RedisError as e:
+                self._logger.warning(f"Failed to bump generation of {name}: {e}")
+        with self._lock:
+            self._generations[name] = self._generations.get(name, 0) + 1
+
+    def generations(self, names):
+        if self.redis is not None:
+            try:
+                values = self.redis.mget(
+                    [f"{self.prefix}:generation:{name}" for name in names])
+                return [int(value or 0) for value in values]
+            except redis.RedisError as e:
+                self._logger.warning(f"Failed to read generations: {e}")
+        return [self._generations.get(name, 0) for name in names]
+
+    def key(self, path, args, names):
+        """Cache key for a route, its normalised query args and models."""
+        query = urlencode(sorted(args.items(multi=True)))
+        generations = ",".join(
+            f"{name}:{generation}"
+            for name, generation in zip(names, self.generations(names)))
+        digest = hashlib.sha1(f"{path}?{query}@{generations}".encode()).hexdigest()
+        return f"{self.prefix}:response:{digest}"
+
+    def get(self, key):
+        value = None
+        if self.redis is not None:
+            try:
+                value = self.redis.get(key)
+                value = value.decode() if value is not None else None
+            except redis.RedisError as e:
+                self._logger.warning(f"Failed to read cached response: {e}")
+        else:
+            entry = self._local.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                value = entry[1]
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def set(self, key, value):
+        if self.redis is not None:
+            try:
+                self.redis.set(key, value, ex=self.ttl)
+            except redis.RedisError as e:
+                self._logger.warning(f"Failed to cache response: {e}")
+        else:
+            self._local.set(key, (time.monotonic() + self.ttl, value))
+
+    def stats(self):
+        requests = self.hits + self.misses
+        return {
+            "backend": "redis" if self.redis is not None else "local",
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / requests if requests else 0.0,
+        }
+
+
+response_cache = ResponseCache(redis_url, response_cache_ttl)
@@ -3,12 +3,27 @@
 from flask import Flask
 from flask_migrate import Migrate
 from flask_sqlalchemy import SQLAlchemy
+import json
 import os
 
 baseurl = os.environ.get("BASEURL")
 token = os.environ.get("TOKEN")
 db_password = os.environ.get("DB_PASSWORD")
 ip_address = os.environ.get("IP_ADDRESS")
+bulk_batch_size = int(os.environ.get("BULK_BATCH_SIZE", 500))
+batch_flush_every = int(os.environ.get("BATCH_FLUSH_EVERY", 1000))
+sync_page_size = int(os.environ.get("SYNC_PAGE_SIZE", 200))
+copy_initial_load = os.environ.get("COPY_INITIAL_LOAD", "1") != "0"
+sync_workers = int(os.environ.get("SYNC_WORKERS", 4))
+image_workers = int(os.environ.get("IMAGE_WORKERS", 8))
+image_processes = int(os.environ.get("IMAGE_PROCESSES", os.cpu_count() or 1))
+image_renditions = json.loads(os.environ.get("IMAGE_RENDITIONS", "null"))
+redis_url = os.environ.get("REDIS_URL")
+response_cache_ttl = int(os.environ.get("RESPONSE_CACHE_TTL", 300))
+entity_cache_size = int(os.environ.get("ENTITY_CACHE_SIZE", 10000))
+guid_cache_size = int(os.environ.get("GUID_CACHE_SIZE", 100000))
+max_image_bytes = int(os.environ.get("MAX_IMAGE_BYTES", 32 * 1024 * 1024))
+image_spool_bytes = int(os.environ.get("IMAGE_SPOOL_BYTES", 4 * 1024 * 1024))
 
 
 
@@ -16,7 +31,8 @@ static = "/home/ubuntu/plex_db/static"
 app = Flask(__name__, static_folder=static)
 
 # app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///database.db'
-app.config['SQLALCHEMY_DATABASE_URI'] = f"postgresql://plex:{db_password}@{ip_address}:5432/plex"
+app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get(
+    "DATABASE_URL", f"postgresql://plex:{db_password}@{ip_address}:5432/plex")
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 app.config['LOG_LEVEL'] = 'DEBUG'
 
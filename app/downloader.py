@@ -0,0 +1,170 @@
+# downloader.py
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .config import image_workers, image_processes
+from .image import Image
+from .image_manifest import ImageManifest
+from .utils import build_url
+
+
+@dataclass
+class DownloadResult:
+    media_id: int
+    kind: str
+    key: str
+    renditions: list = field(default_factory=list)
+    outputs: list = field(default_factory=list)
+    ok: bool = False
+    skipped: bool = False
+    error: str = None
+    etag: str = None
+    last_modified: str = None
+
+
+class ImageDownloader:
+    """Download artwork for many media rows over one pooled HTTP session.
+
+    Downloads run on a bounded thread pool; every worker shares the
+    session's keep-alive connections to the Plex server. Decoding and
+    encoding the renditions of each download runs in a process pool that
+    is started on first use and kept until ``close`` (or the end of a
+    ``with`` block). Its workers are started by a forkserver (spawn where
+    that is unavailable), never forked from the threaded caller.
+    """
+
+    def __init__(self, workers=None, session=None, processes=None):
+        self.workers = workers or image_workers
+        self.processes = processes or image_processes
+        self.session = session or self.build_session(self.workers)
+        self._pool = None
+        self._pool_lock = threading.Lock()
+        self._logger = logging.getLogger(self.__class__.__name__)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def process_pool(self):
+        """The process pool renditions are rendered in, started on first use."""
+        with self._pool_lock:
+            if self._pool is None:
+                method = ("forkserver" if "forkserver" in multiprocessing.get_all_start_methods()
+                          else "spawn")
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.processes, mp_context=multiprocessing.get_context(method))
+            return self._pool
+
+    def close(self):
+        """Shut down the process pool; a later download starts a new one."""
+        with self._pool_lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown()
+
+    @staticmethod
+    def build_session(pool_size):
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    def download(self, media, renditions, force_ext=None, quality=None,
+                 manifest=True, revalidate=False):
+        """Download every ``renditions`` kind (e.g. thumb/art) for each row.
+
+        ``renditions`` maps an image attribute to a list of rendition dicts
+        (see ``image.render``); ``force_ext``/``quality`` fill in those that
+        do not set a format or quality. Sources whose renditions are all
+        recorded in the ImageManifest with the same key and settings are
+        skipped; with ``revalidate`` they are re-requested conditionally
+        instead. Returns one DownloadResult per source image.
+        """
+        # Read ORM attributes here; rows must not be touched from workers.
+        jobs = [
+            DownloadResult(
+                row.id, kind, getattr(row, kind),
+                renditions=[
+                    {"format": force_ext, "quality": quality, **rendition}
+                    for rendition in renditions[kind]
+                ]
+            )
+            for row in media for kind in renditions
+        ]
+        entries = ImageManifest.lookup(
+            ImageManifest.rendition_key_for(job.key, ImageManifest.settings_for(**rendition))
+            for job in jobs if job.key for rendition in job.renditions
+        ) if manifest else {}
+        results = []
+        pending = []
+        for job in jobs:
+            job_entries = [
+                entries.get(ImageManifest.rendition_key_for(
+                    job.key, ImageManifest.settings_for(**rendition)))
+                for rendition in job.renditions
+            ]
+            if not all(entry and entry.is_current() for entry in job_entries):
+                pending.append((job, None))
+            else:
+                job.outputs = [
+                    {"settings": entry.settings, "path": entry.path, "size": entry.size}
+                    for entry in job_entries
+                ]
+                if revalidate:
+                    pending.append((job, job_entries[0].conditional_headers()))
+                else:
+                    job.ok = job.skipped = True
+                    results.append(job)
+        processes = self.process_pool() if pending else None
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = [
+                executor.submit(self._download, job, headers, processes)
+                for job, headers in pending
+            ]
+            for future in as_completed(futures):
+                results.append(future.result())
+        if manifest:
+            ImageManifest.record(
+                result for result in results if result.ok and not result.skipped)
+        failed = sum(1 for result in results if not result.ok)
+        skipped = sum(1 for result in results if result.skipped)
+        self._logger.info(
+            f"Downloaded {len(results) - failed - skipped}/{len(results)} images "
+            f"({skipped} unchanged, {failed} failed).")
+        return results
+
+    def _download(self, job, headers=None, processes=None):
+        if not job.key:
+            job.error = f"No {job.kind} key"
+            return job
+        try:
+            # Fetched into a named file the render process opens by path.
+            image = Image(build_url(job.key), job.key, session=self.session,
+                          headers=headers, named=processes is not None)
+            if image.not_modified:
+                job.ok = job.skipped = True
+                return job
+            outputs = image.render(job.renditions, executor=processes)
+            if outputs is None:
+                job.error = f"HTTP {image.response.status_code}"
+                return job
+            job.outputs = [
+                {"settings": ImageManifest.settings_for(**rendition), **output}
+                for rendition, output in zip(job.renditions, outputs)
+            ]
+            job.etag = image.response.headers.get("ETag")
+            job.last_modified = image.response.headers.get("Last-Modified")
+            job.ok = True
+        except Exception as e:
+            job.error = str(e)
+            self._logger.warning(f"Failed to download {job.kind} {job.key}: {e}")
+        return job
@@ -0,0 +1,95 @@
+# fulltext.py
+import re
+
+from sqlalchemy import DDL, column, event, func, literal_column, table
+
+# Rank of a match in each weight class, highest first.
+WEIGHTS = {"A": 10.0, "B": 4.0, "C": 1.0, "D": 0.5}
+_TERM = re.compile(r"\w+")
+
+
+def shadow_objects(name):
+    """Names of the objects backing full-text search on table ``name``."""
+    fts = f"{name}_fts"
+    return {
+        fts, f"{fts}_data", f"{fts}_idx", f"{fts}_docsize", f"{fts}_config",
+        "search_vector", f"ix_{name}_search_vector",
+    }
+
+
+def _postgresql_ddl(name, fields):
+    vector = " || ".join(
+        f"setweight(to_tsvector('english'::regconfig, coalesce(\"{field}\", '')), '{weight}')"
+        for field, weight in fields.items()
+    )
+    return [
+        f"ALTER TABLE {name} ADD COLUMN search_vector tsvector "
+        f"GENERATED ALWAYS AS ({vector}) STORED",
+        f"CREATE INDEX ix_{name}_search_vector ON {name} USING GIN (search_vector)",
+    ]
+
+
+def _sqlite_ddl(name, fields):
+    fts = f"{name}_fts"
+    columns = ", ".join(f'"{field}"' for field in fields)
+    new = ", ".join(f'new."{field}"' for field in fields)
+    old = ", ".join(f'old."{field}"' for field in fields)
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({columns}, "
+        f"content='{name}', content_rowid='id', "
+        f"tokenize='porter unicode61 remove_diacritics 2')",
+        f"CREATE TRIGGER {fts}_ai AFTER INSERT ON {name} BEGIN "
+        f"INSERT INTO {fts}(rowid, {columns}) VALUES (new.id, {new}); END",
+        f"CREATE TRIGGER {fts}_ad AFTER DELETE ON {name} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {columns}) "
+        f"VALUES ('delete', old.id, {old}); END",
+        f"CREATE TRIGGER {fts}_au AFTER UPDATE OF {columns} ON {name} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {columns}) "
+        f"VALUES ('delete', old.id, {old}); "
+        f"INSERT INTO {fts}(rowid, {columns}) VALUES (new.id, {new}); END",
+    ]
+
+
+def register_fulltext(model_table, fields):
+    """Create the full-text index for ``fields`` ({column: weight}) with the table.
+
+    Postgres gets a generated, weighted ``tsvector`` column with a GIN index;
+    SQLite an FTS5 external-content table kept in sync by triggers, so every
+    write path (ORM, bulk upsert, raw SQL) updates it.
+    """
+    name = model_table.name
+    model_table.info["fulltext"] = fields
+    model_table.info.setdefault("shadow_objects", set()).update(shadow_objects(name))
+    for statement in _postgresql_ddl(name, fields):
+        event.listen(model_table, "after_create",
+                     DDL(statement).execute_if(dialect="postgresql"))
+    for statement in _sqlite_ddl(name, fields):
+        event.listen(model_table, "after_create",
+                     DDL(statement).execute_if(dialect="sqlite"))
+    event.listen(model_table, "before_drop",
+                 DDL(f"DROP TABLE IF EXISTS {name}_fts").execute_if(dialect="sqlite"))
+
+
+def ranked_query(model, query, dialect):
+    """ORM query of ``model`` records matching ``query``, best match first.
+
+    Returns None when ``query`` holds no searchable terms.
+    """
+    terms = _TERM.findall(query or "")
+    if not terms:
+        return None
+    name = model.__tablename__
+    if dialect == "postgresql":
+        vector = literal_column(f"{name}.search_vector")
+        tsquery = func.websearch_to_tsquery(
+            literal_column("'english'::regconfig"), query)
+        return (model.query
+                .filter(vector.op("@@")(tsquery))
+                .order_by(func.ts_rank_cd(vector, tsquery).desc(), model.id))
+    fts = table(f"{name}_fts", column("rowid"))
+    weights = [WEIGHTS[weight] for weight in model.__table__.info["fulltext"].values()]
+    match = " ".join(f'"{term}"' for term in terms)
+    return (model.query
+            .join(fts, fts.c.rowid == model.id)
+            .filter(literal_column(f"{name}_fts").match(match))
+            .order_by(func.bm25(literal_column(f"{name}_fts"), *weights), model.id))
@@ -1,16 +1,213 @@
 # guid.py
-from .config import db
+from datetime import datetime
+from uuid import uuid4
+
+from sqlalchemy import bindparam, delete, event, select, text
+
+from . import pg_copy
+from .cache import LRUCache, invalidate_on_commit
+from .config import db, guid_cache_size
 from .model import Model
 
 
+def parse_scheme(guid):
+    if guid and "://" in guid:
+        return guid.split("://", 1)[0]
+    return None
+
+
+def _scheme_default(context):
+    return parse_scheme(context.get_current_parameters().get("guid"))
+
+
 class Guid(Model):
     id = db.Column(db.Integer, primary_key=True)
     guid = db.Column(db.String)
+    scheme = db.Column(db.String, default=_scheme_default, onupdate=_scheme_default)
     media_type = db.Column(db.String)
     media_id = db.Column(db.Integer)
     __table_args__ = (
         db.CheckConstraint(
             "(media_type = 'movie' AND media_id IS NOT NULL) OR "
-            "(media_type = 'episode' AND media_id IS NOT NULL)"
-        ),
+            "(media_type = 'episode' AND media_id IS NOT NULL)",
+            name="ck_guid_media"),
+        # Also serves guid lookups: guid is the leading column.
+        db.UniqueConstraint(
+            "guid", "media_type", "media_id", name="uq_guid_guid_media"),
     )
+    _indexes = (
+        {"columns": ("media_type", "media_id"), "name": "ix_guid_media"},
+    )
+    _resolved = LRUCache(guid_cache_size)
+    _link_stage = "guid_link_stage"
+
+    @classmethod
+    def resolve_many(cls, guids, chunk_size=5000):
+        """Map external ids (``imdb://tt0096734``) to their media.
+
+        Returns {guid: [(media_type, media_id), ...]}; unknown guids map to
+        an empty list. Answers come from an LRU cache where possible and
+        the misses are resolved with one IN query per ``chunk_size``.
+        """
+        guids = list(dict.fromkeys(guids))
+        found, missing = cls._resolved.get_many(guids)
+        table = cls.__table__
+        for i in range(0, len(missing), chunk_size):
+            chunk = missing[i:i + chunk_size]
+            resolved = {guid: [] for guid in chunk}
+            for row in db.session.execute(
+                select(table.c.guid, table.c.media_type, table.c.media_id)
+                .where(table.c.guid.in_(chunk))
+            ):
+                resolved[row.guid].append((row.media_type, row.media_id))
+            cls._resolved.set_many(
+                {guid: tuple(media) for guid, media in resolved.items()})
+            found.update(resolved)
+        return {guid: list(found[guid]) for guid in guids}
+
+    @classmethod
+    def resolve(cls, guid):
+        return cls.resolve_many([guid])[guid]
+
+    @classmethod
+    def sync_links(cls, media_type, links, chunk_size=500):
+        """Make the guids of each media match ``links`` ({media_id: [guid]}).
+
+        Existing links are read in one query per chunk, missing ones are
+        inserted with one executemany and stale ones deleted in bulk. The
+        caller commits.
+        """
+        table = cls.__table__
+        media_ids = list(links)
+        existing = {}
+        for i in range(0, len(media_ids), chunk_size):
+            for row in db.session.execute(
+                select(table.c.id, table.c.guid, table.c.media_id)
+                .where(table.c.media_type == media_type)
+                .where(table.c.media_id.in_(media_ids[i:i + chunk_size]))
+            ):
+                existing[(row.media_id, row.guid)] = row.id
+        wanted = {
+            (media_id, guid)
+            for media_id, guids in links.items() for guid in guids
+        }
+        now = datetime.now()
+        missing = [
+            {
+                "guid": guid,
+                "media_type": media_type,
+                "media_id": media_id,
+                "uuid": str(uuid4()),
+                "created_at": now,
+                "updated_at": now,
+            }
+            for media_id, guid in sorted(wanted - existing.keys())
+        ]
+        stale = {link: id for link, id in existing.items() if link not in wanted}
+        stale_ids = list(stale.values())
+        if missing:
+            # executemany of one statement: compiled once, not per chunk.
+            db.session.execute(
+                cls._insert().on_conflict_do_nothing(
+                    index_elements=["guid", "media_type", "media_id"]),
+                missing)
+        for i in range(0, len(stale_ids), chunk_size):
+            db.session.execute(
+                delete(table).where(table.c.id.in_(stale_ids[i:i + chunk_size])))
+        invalidate_on_commit(db.session, cls._resolved,
+                             [row["guid"] for row in missing] + [guid for _, guid in stale])
+        if missing or stale:
+            cls._touch()
+        counts = {
+            "inserted": len(missing),
+            "deleted": len(stale),
+            "unchanged": len(wanted) - len(missing),
+        }
+        cls._logger.debug(f"Synced {media_type} guid links: {counts}")
+        return counts
+
+    @classmethod
+    def create_link_stage(cls, media_table, key):
+        """Create the temp table ``stage_links`` COPYs links into, dropped on commit.
+
+        Links are staged by the ``key`` of their media, whose ids are not
+        known yet; a NULL guid records media staged with no guids.
+        """
+        connection = db.session.connection()
+        key_type = media_table.c[key].type.compile(dialect=connection.dialect)
+        pg_copy.create_stage(
+            connection, cls._link_stage, cls.__table__,
+            ["guid", "scheme", "uuid", "created_at", "updated_at"],
+            extra=[("media_key", key_type), ("copy_seq", "bigint")])
+
+    @classmethod
+    def stage_links(cls, links, seq):
+        """COPY ``links`` ({media key: [guid]}) into the link stage.
+
+        For each media key only the links staged with the highest ``seq``
+        count.
+        """
+        now = datetime.now()
+        pg_copy.copy_rows(
+            db.session.connection(), cls._link_stage,
+            ["media_key", "copy_seq", "guid", "scheme", "uuid", "created_at", "updated_at"], (
+                (media_key, seq, guid, parse_scheme(guid), str(uuid4()), now, now)
+                for media_key, guids in links.items() for guid in (dict.fromkeys(guids) or [None])
+            ))
+
+    @classmethod
+    def _latest_links(cls):
+        return (
+            f"(SELECT *, max(copy_seq) OVER (PARTITION BY media_key) AS last_seq "
+            f"FROM {cls._link_stage}) l"
+        )
+
+    @classmethod
+    def copy_staged_links(cls, media_type, media_table, key, stage):
+        """``sync_links`` for the media ``copy_load`` inserted from ``stage``.
+
+        Inserts their staged links with one INSERT ... SELECT; media marked
+        ``copy_conflict`` in ``stage`` are left to ``staged_links``. The
+        caller commits.
+        """
+        connection = db.session.connection()
+        quote = connection.dialect.identifier_preparer.quote
+        columns = ["guid", "scheme", "media_type", "media_id", "uuid", "created_at", "updated_at"]
+        inserted = connection.execute(text(
+            f"INSERT INTO {quote(cls.__table__.name)} ({', '.join(map(quote, columns))}) "
+            f"SELECT l.guid, l.scheme, :media_type, m.id, l.uuid, l.created_at, l.updated_at "
+            f"FROM {cls._latest_links()} "
+            f"JOIN {quote(media_table.name)} m ON m.{quote(key)} = l.media_key "
+            f"WHERE l.copy_seq = l.last_seq AND l.guid IS NOT NULL AND NOT EXISTS ("
+            f"SELECT 1 FROM {stage} s WHERE s.{quote(key)} = l.media_key AND s.copy_conflict) "
+            f"ON CONFLICT (guid, media_type, media_id) DO NOTHING"
+        ), {"media_type": media_type}).rowcount
+        if inserted:
+            # Too many guids to name; any of them may be cached as unknown.
+            invalidate_on_commit(db.session, cls._resolved)
+            cls._touch()
+        cls._logger.debug(f"COPY loaded {inserted} {media_type} guid links.")
+        return inserted
+
+    @classmethod
+    def staged_links(cls, media_keys):
+        """The staged links of ``media_keys`` ({media key: [guid]}), if any."""
+        links = {}
+        for row in db.session.execute(text(
+            f"SELECT l.media_key, l.guid FROM {cls._latest_links()} "
+            f"WHERE l.copy_seq = l.last_seq AND l.media_key IN :keys"
+        ).bindparams(bindparam("keys", expanding=True)), {"keys": list(media_keys)}):
+            guids = links.setdefault(row.media_key, [])
+            if row.guid is not None:
+                guids.append(row.guid)
+        return links
+
+
+@event.listens_for(Guid, "after_insert")
+@event.listens_for(Guid, "after_update")
+@event.listens_for(Guid, "after_delete")
+def _invalidate_resolved(mapper, connection, target):
+    state = db.inspect(target)
+    guids = [target.guid]
+    guids.extend(state.attrs.guid.history.deleted or ())
+    invalidate_on_commit(state.session, Guid._resolved, guids)
@@ -1,26 +1,90 @@
 import os
-import mimetypes
-import requests
+import logging
 from PIL import Image as PILImage
 import io
+import shutil
+import tempfile
 
-from app.utils import create_dir, get_extension
+from app.metrics import timed
+from app.utils import atomic_save, fetch, get_extension, resize, target_size
 from .config import static
 
+
+def output_format(extension, force_ext=None):
+    if force_ext:
+        if force_ext.lower() in ['jpg', 'jpeg']:
+            return 'JPEG', ".jpg"
+        return force_ext.upper(), f".{force_ext.lower()}"
+    return PILImage.registered_extensions().get(
+        extension.lower(), extension.strip('.').upper()), extension
+
+
+def save_params(format, quality=None):
+    save_params = {}
+    if format == 'JPEG':
+        if quality and quality <= 95:
+            save_params['quality'] = quality
+        else:
+            save_params['quality'] = 75
+    elif format in ('WEBP', 'AVIF') and quality:
+        save_params['quality'] = quality
+    return save_params
+
+
+def render(data, base_path, extension, renditions):
+    """Decode ``data`` once and write every rendition next to ``base_path``.
+
+    ``data`` is the encoded source as bytes, a file object or a file path.
+    Each rendition is a dict of optional ``name``, ``max_width``,
+    ``max_height``, ``format`` and ``quality``. JPEG sources are decoded at
+    the smallest DCT scale that still covers the largest rendition. Runs in
+    a worker process, so it only takes and returns plain data.
+    """
+    if isinstance(data, str):
+        with open(data, 'rb') as f:
+            return render(f, base_path, extension, renditions)
+    img = PILImage.open(data if hasattr(data, 'read') else io.BytesIO(data))
+    targets = [
+        target_size(img.size, r.get("max_width"), r.get("max_height"))
+        for r in renditions
+    ]
+    if img.format == 'JPEG':
+        img.draft('RGB', (max(w for w, _ in targets), max(h for _, h in targets)))
+    if img.mode != 'RGB':
+        img = img.convert('RGB')
+    outputs = []
+    for rendition in renditions:
+        format, new_extension = output_format(extension, rendition.get("format"))
+        suffix = f"_{rendition['name']}" if rendition.get("name") else ""
+        path = base_path + suffix + new_extension
+        out = resize(img, rendition.get("max_width"), rendition.get("max_height"))
+        atomic_save(out, path, format, **save_params(format, rendition.get("quality")))
+        outputs.append({"path": path, "size": os.path.getsize(path)})
+    return outputs
+
+
 class Image:
-    def __init__(self, url, path) -> None:
-        self._set_response(url)
-        self._set_img()
+    _logger = logging.getLogger("Image")
+
+    def __init__(self, url, path, session=None, headers=None, named=False) -> None:
+        self.session = session
+        self._set_response(url, headers, named)
+        if self.response.status_code != 200:
+            return
         self._set_extension()
         self._set_path(path)
 
+    @property
+    def not_modified(self):
+        return self.response.status_code == 304
+
     def _set_img(self, max_width=None, max_height=None):
-        self.img = PILImage.open(io.BytesIO(self.response.content))
+        self.img = PILImage.open(self.buffer)
         if self.img.mode != 'RGB':
             self.img = self.img.convert('RGB')
     
-    def _set_response(self, url):
-        self.response = requests.get(url)
+    def _set_response(self, url, headers=None, named=False):
+        self.response, self.buffer = fetch(url, self.session, headers, named=named)
 
     def _set_extension(self):
         self.extension = get_extension(self.response)
@@ -29,43 +93,51 @@ class Image:
         self.path = static + path + self.extension
 
     def _resize(self, max_width=None, max_height=None):
-        original_width, original_height = self.img.size
-        if max_width and max_height:
-            self.img = self.img.resize((max_width, max_height))
-        elif max_width:
-            new_height = int((max_width / original_width) * original_height)
-            self.img = self.img.resize((max_width, new_height))
-        elif max_height:
-            new_width = int((max_height / original_height) * original_width)
-            self.img = self.img.resize((new_width, max_height))
+        self.img = resize(self.img, max_width, max_height)
     
     def _save(self, force_ext=None, quality=None):
-        if force_ext:
-            if force_ext.lower() in ['jpg', 'jpeg']:
-                format = 'JPEG'
-                new_extension = ".jpg"
-            else:
-                format = force_ext.upper()
-                new_extension = f".{force_ext.lower()}"
-            self.path = self.path.rsplit('.', 1)[0] + new_extension
-        else:
-            format = self.extension.strip('.').upper()
-        save_params = {}
-        if format == 'JPEG':
-            if quality and quality <= 95:
-                save_params['quality'] = quality
-            else:
-                save_params['quality'] = 75
-        self.img.save(self.path, format=format, **save_params)
+        format, new_extension = output_format(self.extension, force_ext)
+        self.path = self.path.rsplit('.', 1)[0] + new_extension
+        atomic_save(self.img, self.path, format, **save_params(format, quality))
         print(f"Image saved to {self.path}")
 
+    @timed("download")
     def download(self, max_width=None, max_height=None, force_ext=None, quality=None):
         if self.response.status_code == 200:
-            if max_width or max_height:
-                self._resize(max_width, max_height)
-            create_dir(self.path)
-            self._save(force_ext, quality)
+            with self.buffer:
+                self._set_img()
+                if max_width or max_height:
+                    self._resize(max_width, max_height)
+                self._save(force_ext, quality)
+            return True
         else:
             print(f"Failed to download image, status code: {self.response.status_code}")
+            return False
+
+    @timed("render")
+    def render(self, renditions, executor=None):
+        """Write several renditions from this one download.
 
-    
\ No newline at end of file
+        With an ``executor`` (e.g. a ProcessPoolExecutor) the decode and
+        encode work runs there instead of in the calling thread; the body is
+        handed over as a temp file path, never as bytes. Fetch ``named`` so
+        that path is the download itself rather than a copy of it.
+        """
+        if self.response.status_code != 200:
+            self._logger.warning(
+                f"Failed to download image, status code: {self.response.status_code}")
+            return None
+        base_path = self.path.rsplit('.', 1)[0]
+        with self.buffer:
+            if executor is None:
+                return render(self.buffer, base_path, self.extension, renditions)
+            if isinstance(getattr(self.buffer, 'name', None), str):
+                return executor.submit(
+                    render, self.buffer.name, base_path, self.extension, renditions
+                ).result()
+            with tempfile.NamedTemporaryFile(suffix=self.extension) as source:
+                shutil.copyfileobj(self.buffer, source)
+                source.flush()
+                return executor.submit(
+                    render, source.name, base_path, self.extension, renditions
+                ).result()
@@ -0,0 +1,64 @@
+# image_manifest.py
+import os
+
+from .config import db
+from .model import Model
+
+
+class ImageManifest(Model):
+    rendition_key = db.Column(db.String)
+    source_key = db.Column(db.String)
+    settings = db.Column(db.String)
+    etag = db.Column(db.String)
+    last_modified = db.Column(db.String)
+    path = db.Column(db.String)
+    size = db.Column(db.Integer)
+    __table_args__ = (
+        db.UniqueConstraint(
+            "rendition_key", name="uq_imagemanifest_rendition_key"),
+    )
+
+    @staticmethod
+    def settings_for(**settings):
+        return ",".join(
+            f"{k}={v}" for k, v in sorted(settings.items()) if v is not None)
+
+    @staticmethod
+    def rendition_key_for(source_key, settings):
+        return f"{source_key}|{settings}"
+
+    @classmethod
+    def lookup(cls, rendition_keys, chunk_size=500):
+        rendition_keys = list(rendition_keys)
+        entries = {}
+        for i in range(0, len(rendition_keys), chunk_size):
+            chunk = rendition_keys[i:i + chunk_size]
+            for entry in cls.query.filter(cls.rendition_key.in_(chunk)):
+                entries[entry.rendition_key] = entry
+        return entries
+
+    @classmethod
+    def record(cls, results):
+        return cls.bulk_upsert(
+            ({
+                "rendition_key": cls.rendition_key_for(result.key, output["settings"]),
+                "source_key": result.key,
+                "settings": output["settings"],
+                "etag": result.etag,
+                "last_modified": result.last_modified,
+                "path": output["path"],
+                "size": output["size"],
+            } for result in results for output in result.outputs),
+            key="rendition_key"
+        )
+
+    def is_current(self):
+        return bool(self.path) and os.path.exists(self.path)
+
+    def conditional_headers(self):
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
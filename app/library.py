@@ -2,7 +2,7 @@
 
 from .config import db
 from .model import Model
-from .section import Section
+from .sync import SectionSyncer, sections_of
 
 
 class Library(Model):
@@ -13,9 +13,21 @@ class Library(Model):
     key = db.Column(db.String)
 
     @classmethod
-    def create(cls, _obj=None, **kwargs):
-        # if obj:
-        #     for section in obj.sections():
-        #         if section.get("movie"):
-        #             Section.create(section)
-        return super().create(_obj=_obj, **kwargs)
\ No newline at end of file
+    def create(cls, obj=None, workers=None, **kwargs):
+        """Record a library; with a plexapi Library, also sync and record its sections.
+
+        Given a plexapi Library this is idempotent: the library is upserted
+        by identifier and its sections by uuid. Sections are synced in
+        parallel by SectionSyncer; one failing section is logged without
+        failing the others or the library.
+        """
+        if obj is None:
+            return super().create(**kwargs)
+        record = cls.upsert(obj, _key="identifier", **kwargs)
+        results = SectionSyncer(workers).sync(sections_of(obj), record=True)
+        failed = [result for result in results if not result.ok]
+        if failed:
+            cls._logger.warning(
+                f"{len(failed)}/{len(results)} sections of {record} failed to sync: "
+                + ", ".join(f"{result.key} ({result.error})" for result in failed))
+        return record
\ No newline at end of file
@@ -0,0 +1,332 @@
+# metrics.py
+import functools
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Prometheus' default latency buckets, in seconds.
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 10, 25, 50, 100, 250, 1000)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Innermost last: the operations the current thread/task is inside.
+_operations = ContextVar("operations", default=())
+_sync_run = ContextVar("sync_run", default=None)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [*zip(names, values), *extra]
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    """A labelled family of samples, rendered in the Prometheus text format."""
+
+    type = None
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(str(labels[name]) for name in self.labels)
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+        with self._lock:
+            values = sorted(self._values.items())
+        for key, value in values:
+            lines.extend(self._samples(key, value))
+        return lines
+
+    def _samples(self, key, value):
+        return [f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}"]
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        key = self._key(labels)
+        with self._lock:
+            return self._values.get(key, 0)
+
+
+class Gauge(Metric):
+    type = "gauge"
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def value(self, **labels):
+        key = self._key(labels)
+        with self._lock:
+            return self._values.get(key)
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=DURATION_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total, count = self._values.get(key) or ((0,) * len(self.buckets), 0, 0)
+            counts = tuple(n + (value <= bound) for n, bound in zip(counts, self.buckets))
+            self._values[key] = (counts, total + value, count + 1)
+
+    def count(self, **labels):
+        key = self._key(labels)
+        with self._lock:
+            value = self._values.get(key)
+        return value[2] if value else 0
+
+    def sum(self, **labels):
+        key = self._key(labels)
+        with self._lock:
+            value = self._values.get(key)
+        return value[1] if value else 0
+
+    def _samples(self, key, value):
+        counts, total, count = value
+        lines = [
+            f"{self.name}_bucket{_format_labels(self.labels, key, [('le', _format_value(float(bound)))])} {n}"
+            for bound, n in zip(self.buckets, counts)
+        ]
+        lines.append(f"{self.name}_bucket{_format_labels(self.labels, key, [('le', '+Inf')])} {count}")
+        lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {_format_value(float(total))}")
+        lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {count}")
+        return lines
+
+
+class Registry:
+    """The metrics exposed at ``/metrics``."""
+
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, help, labels=()):
+        return self.register(Counter(name, help, labels))
+
+    def gauge(self, name, help, labels=()):
+        return self.register(Gauge(name, help, labels))
+
+    def histogram(self, name, help, labels=(), buckets=DURATION_BUCKETS):
+        return self.register(Histogram(name, help, labels, buckets))
+
+    def clear(self):
+        for metric in self._metrics:
+            metric.clear()
+
+    def render(self):
+        return "\n".join(line for metric in self._metrics for line in metric.render()) + "\n"
+
+
+registry = Registry()
+
+operations = registry.counter(
+    "plexdb_operations_total", "Model, Plex and image operations by outcome.",
+    ("model", "operation", "outcome"))
+operation_seconds = registry.histogram(
+    "plexdb_operation_duration_seconds", "Latency of model, Plex and image operations.",
+    ("model", "operation"))
+operation_statements = registry.histogram(
+    "plexdb_operation_statements", "SQL statements executed per operation, nested "
+    "operations included.", ("model", "operation"), STATEMENT_BUCKETS)
+statements = registry.counter(
+    "plexdb_sql_statements_total", "SQL statements by verb and innermost operation.",
+    ("statement", "operation"))
+statement_seconds = registry.histogram(
+    "plexdb_sql_statement_duration_seconds", "Latency of SQL statements by verb.",
+    ("statement",))
+transferred = registry.counter(
+    "plexdb_bytes_total", "Bytes received from Plex, by source (plex API or image).", ("source",))
+sync_runs = registry.counter(
+    "plexdb_sync_runs_total", "Section syncs by outcome.", ("section", "outcome"))
+sync_rows = registry.counter(
+    "plexdb_sync_rows_total", "Items read by section syncs.", ("section",))
+sync_bytes = registry.counter(
+    "plexdb_sync_bytes_total", "Plex response bytes read by section syncs.", ("section",))
+sync_seconds = registry.histogram(
+    "plexdb_sync_duration_seconds", "Duration of section syncs.", ("section",),
+    (0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0, 3600.0))
+sync_rows_rate = registry.gauge(
+    "plexdb_sync_rows_per_second", "Items per second of the last sync.", ("section",))
+sync_bytes_rate = registry.gauge(
+    "plexdb_sync_bytes_per_second", "Plex response bytes per second of the last sync.",
+    ("section",))
+
+
+class _Frame:
+    __slots__ = ("model", "operation", "statements")
+
+    def __init__(self, model, operation):
+        self.model = model
+        self.operation = operation
+        self.statements = 0
+
+
+@contextmanager
+def operation(model, name):
+    """Time a logical operation and count the SQL statements run inside it.
+
+    Re-entering the operation already innermost (an override calling
+    ``super()``) records it once.
+    """
+    stack = _operations.get()
+    if stack and stack[-1].model == model and stack[-1].operation == name:
+        yield stack[-1]
+        return
+    frame = _Frame(model, name)
+    token = _operations.set((*stack, frame))
+    outcome = "error"
+    start = time.perf_counter()
+    try:
+        yield frame
+        outcome = "ok"
+    finally:
+        elapsed = time.perf_counter() - start
+        _operations.reset(token)
+        operations.inc(model=model, operation=name, outcome=outcome)
+        operation_seconds.observe(elapsed, model=model, operation=name)
+        operation_statements.observe(frame.statements, model=model, operation=name)
+
+
+def _owner_name(owner):
+    if isinstance(owner, type):
+        return owner.__name__
+    # Results carries the model it queries.
+    model = getattr(owner, "model", None)
+    return model.__name__ if isinstance(model, type) else type(owner).__name__
+
+
+def timed(name, model=None):
+    """Decorate a method (or, with ``model``, a function) as an ``operation``.
+
+    The model label is ``model`` or the class the method is called on.
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with operation(model or _owner_name(args[0]), name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class SyncRun:
+    def __init__(self, section):
+        self.section = section
+        self.rows = 0
+        self.bytes = 0
+
+
+@contextmanager
+def sync_run(section):
+    """Record rows and Plex bytes/sec of one section sync.
+
+    The body sets ``rows``; bytes are counted by the response hook of
+    sessions passed to ``observe_session``.
+    """
+    run = SyncRun(str(section))
+    token = _sync_run.set(run)
+    outcome = "error"
+    start = time.perf_counter()
+    try:
+        yield run
+        outcome = "ok"
+    finally:
+        elapsed = time.perf_counter() - start
+        _sync_run.reset(token)
+        sync_runs.inc(section=run.section, outcome=outcome)
+        sync_seconds.observe(elapsed, section=run.section)
+        sync_rows.inc(run.rows, section=run.section)
+        sync_bytes.inc(run.bytes, section=run.section)
+        if outcome == "ok" and elapsed:
+            sync_rows_rate.set(run.rows / elapsed, section=run.section)
+            sync_bytes_rate.set(run.bytes / elapsed, section=run.section)
+
+
+def count_bytes(source, size):
+    transferred.inc(size, source=source)
+    run = _sync_run.get()
+    if run is not None and source == "plex":
+        run.bytes += size
+
+
+def _count_response(response, *args, stream=False, **kwargs):
+    size = response.headers.get("Content-Length")
+    if size is None and not stream:
+        size = len(response.content)
+    if size is not None:
+        count_bytes("plex", int(size))
+
+
+def observe_session(session):
+    """Count the bytes of every response ``session`` (a requests.Session) receives."""
+    hooks = session.hooks.setdefault("response", [])
+    if _count_response not in hooks:
+        hooks.append(_count_response)
+    return session
+
+
+def _verb(statement):
+    head = statement.lstrip()[:12].split(None, 1)
+    return head[0].upper() if head else "OTHER"
+
+
+# The start time lives on the execution context, which is dropped with the
+# statement whether or not it reaches after_cursor_execute.
+@event.listens_for(Engine, "before_cursor_execute")
+def _start_statement(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._metrics_start = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _end_statement(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, "_metrics_start", None)
+    elapsed = time.perf_counter() - started if started is not None else 0.0
+    verb = _verb(statement)
+    stack = _operations.get()
+    for frame in stack:
+        frame.statements += 1
+    innermost = f"{stack[-1].model}.{stack[-1].operation}" if stack else ""
+    statements.inc(statement=verb, operation=innermost)
+    statement_seconds.observe(elapsed, statement=verb)
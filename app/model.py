@@ -1,11 +1,54 @@
 # model.py
+import hashlib
+import json
 import logging
+from contextlib import contextmanager
 from datetime import datetime
 from typing import Any
 
-from sqlalchemy import inspect, and_, or_
+from sqlalchemy import Column, event, inspect, and_, or_, select, text, types
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import RelationshipProperty, make_transient_to_detached
+from sqlalchemy.orm.util import identity_key
 from uuid import uuid4
-from .config import db
+from . import pg_copy
+from .cache import LRUCache, invalidate_on_commit, response_cache
+from .config import db, bulk_batch_size, batch_flush_every, entity_cache_size
+from .metrics import timed
+from .results import Results
+
+
+def _to_int(value):
+    return value if type(value) is int else int(value)
+
+
+def _to_float(value):
+    return value if type(value) is float else float(value)
+
+
+def _to_bool(value):
+    if isinstance(value, str):
+        return value.strip().lower() in ("1", "true", "yes")
+    return bool(value)
+
+
+def _to_datetime(value):
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, (int, float)):
+        return datetime.fromtimestamp(value)
+    if isinstance(value, str) and value.isdigit():
+        return datetime.fromtimestamp(int(value))
+    return datetime.fromisoformat(value)
+
+
+# Checked in order, so Boolean is matched before its Integer-like peers.
+_COERCIONS = (
+    (types.Boolean, _to_bool),
+    (types.Integer, _to_int),
+    (types.Float, _to_float),
+    (types.DateTime, _to_datetime),
+)
 
 
 class Model(db.Model):
@@ -20,10 +63,82 @@ class Model(db.Model):
         onupdate=datetime.now
     )
 
+    _hidden_fields = ()
+    # Opt-in identity-map cache: the columns that lookups may be served by.
+    _entity_cache_keys = ()
+    _entity_cache = None
+    # Source attribute -> column for fields whose name differs upstream.
+    _aliases = {}
+    # Column holding a hash of the last bulk-upserted values, if any.
+    _fingerprint_column = None
+    # Columns whose values before and after a bulk upsert are handed to
+    # _bulk_upserted.
+    _tracked_columns = ()
+    # Hot access paths, collected along the class hierarchy. A spec is a
+    # column name, a tuple of names, or a dict with "columns" and optional
+    # "name", "unique" and "where" (a SQL predicate for a partial index).
+    _indexes = ("uuid",)
+
     def __init_subclass__(cls, **kwargs):
         super().__init_subclass__(**kwargs)
         cls.__tablename__ = cls.__name__.lower()
         cls._logger = cls.setup_logger(cls.__name__)
+        if cls._entity_cache_keys:
+            cls._entity_cache = LRUCache(entity_cache_size)
+        cls._extraction_plan = cls._compile_extraction_plan()
+        cls._declare_indexes()
+
+    @classmethod
+    def _declare_indexes(cls):
+        indexes = [
+            cls._index_from_spec(spec)
+            for klass in reversed(cls.__mro__)
+            for spec in vars(klass).get("_indexes", ())
+        ]
+        args = vars(cls).get("__table_args__", ())
+        if isinstance(args, dict):
+            args = (args,)
+        if args and isinstance(args[-1], dict):
+            cls.__table_args__ = (*args[:-1], *indexes, args[-1])
+        else:
+            cls.__table_args__ = (*args, *indexes)
+
+    @classmethod
+    def _index_from_spec(cls, spec):
+        if isinstance(spec, str):
+            spec = {"columns": (spec,)}
+        elif not isinstance(spec, dict):
+            spec = {"columns": tuple(spec)}
+        columns = spec["columns"]
+        name = spec.get("name") or f"ix_{cls.__tablename__}_{'_'.join(columns)}"
+        kwargs = {}
+        if spec.get("where"):
+            where = db.text(spec["where"])
+            kwargs = {"postgresql_where": where, "sqlite_where": where}
+        return db.Index(name, *columns, unique=spec.get("unique", False), **kwargs)
+
+    @classmethod
+    def _compile_extraction_plan(cls):
+        """Build the (source, field, coerce) triples used by flattening.
+
+        Fields are the declared columns and relationships; aliases come
+        first so a source attribute named exactly like the column wins.
+        """
+        fields = {}
+        for klass in reversed(cls.__mro__):
+            for name, value in vars(klass).items():
+                if isinstance(value, Column):
+                    fields[name] = next(
+                        (coerce for type_, coerce in _COERCIONS
+                         if isinstance(value.type, type_)), None)
+                elif isinstance(value, RelationshipProperty):
+                    fields[name] = None
+        plan = [
+            (source, field, fields[field])
+            for source, field in cls._aliases.items() if field in fields
+        ]
+        plan.extend((field, field, coerce) for field, coerce in fields.items())
+        return tuple(plan)
 
     def __repr__(self):
         mapper = inspect(self).mapper
@@ -31,6 +146,65 @@ class Model(db.Model):
             f"{column.key}={repr(getattr(self, column.key))}" for column in mapper.column_attrs)
         return f"<{self.__class__.__name__}({self.id})>"
 
+    @classmethod
+    @contextmanager
+    def batch(cls, flush_every=None):
+        """Defer the commits of create/update/delete/upsert in this block.
+
+        Pending changes are flushed every ``flush_every`` operations and
+        committed once on exit; an error rolls back the whole batch. Nested
+        blocks join the outer one.
+        """
+        info = db.session.info
+        if "batch" in info:
+            yield
+            return
+        info["batch"] = {
+            "flush_every": flush_every or batch_flush_every,
+            "pending": 0,
+        }
+        try:
+            yield
+            db.session.commit()
+            cls._publish_changes()
+        except Exception:
+            db.session.rollback()
+            info.pop("touched", None)
+            raise
+        finally:
+            info.pop("batch", None)
+
+    @classmethod
+    def _touch(cls):
+        db.session.info.setdefault("touched", set()).add(cls.__tablename__)
+
+    @staticmethod
+    def _publish_changes():
+        # Bump the generation of every model written by the committed
+        # transaction so cached responses built from it are not served.
+        for name in db.session.info.pop("touched", ()):
+            response_cache.bump(name)
+
+    @classmethod
+    def _commit(cls):
+        cls._touch()
+        batch = db.session.info.get("batch")
+        if batch is None:
+            db.session.commit()
+            cls._publish_changes()
+            return
+        batch["pending"] += 1
+        if batch["pending"] >= batch["flush_every"]:
+            db.session.flush()
+            batch["pending"] = 0
+
+    @classmethod
+    def _rollback(cls):
+        # Inside a batch the whole unit is rolled back when the block exits.
+        if "batch" not in db.session.info:
+            db.session.rollback()
+            db.session.info.pop("touched", None)
+
     @staticmethod
     def setup_logger(name):
         _logger = logging.getLogger(name)
@@ -44,11 +218,17 @@ class Model(db.Model):
             kwargs = {}
         for arg in args:
             if isinstance(arg, dict):
-                kwargs.update(
-                    {k: v for k, v in arg.items() if hasattr(cls, k)})
+                values = arg
             elif hasattr(arg, "__dict__"):
-                kwargs.update(
-                    {k: v for k, v in arg.__dict__.items() if hasattr(cls, k)})
+                values = arg.__dict__
+            else:
+                continue
+            for source, field, coerce in cls._extraction_plan:
+                if source in values:
+                    value = values[source]
+                    if coerce is not None and value is not None:
+                        value = coerce(value)
+                    kwargs[field] = value
         return kwargs
 
     @classmethod
@@ -64,10 +244,99 @@ class Model(db.Model):
     @classmethod
     def _get_existing_record(cls, key, kwargs):
         if key in kwargs and hasattr(cls, key):
-            return cls.query.filter_by(**{key: kwargs.get(key)}).first()
+            return cls.get_many([kwargs[key]], _key=key).get(kwargs[key])
         return None
 
     @classmethod
+    def _cache_entities(cls, records):
+        snapshots = {}
+        for record in records:
+            snapshot = {
+                column.key: getattr(record, column.key)
+                for column in cls.__table__.columns
+            }
+            for key in cls._entity_cache_keys:
+                if snapshot.get(key) is not None:
+                    snapshots[(key, snapshot[key])] = snapshot
+        cls._entity_cache.set_many(snapshots)
+
+    @classmethod
+    def _invalidate_entities(cls, rows, session=None):
+        if cls._entity_cache is None:
+            return
+        invalidate_on_commit(session or db.session, cls._entity_cache, (
+            (key, row[key]) for row in rows
+            for key in cls._entity_cache_keys if row.get(key) is not None
+        ))
+
+    @classmethod
+    def _from_snapshot(cls, snapshot):
+        record = db.session.identity_map.get(identity_key(cls, snapshot["id"]))
+        if record is None:
+            record = cls(**snapshot)
+            make_transient_to_detached(record)
+            db.session.add(record)
+        return record
+
+    @classmethod
+    def _coerce_key(cls, key, value):
+        """``value`` as the Python type of column ``key``, when it converts."""
+        column_type = cls.__table__.c[key].type
+        coerce = next(
+            (coerce for type_, coerce in _COERCIONS if isinstance(column_type, type_)), None)
+        if coerce is None or value is None:
+            return value
+        try:
+            return coerce(value)
+        except (TypeError, ValueError):
+            return value
+
+    @classmethod
+    @timed("get_many")
+    def get_many(cls, values, _key="id", chunk_size=500):
+        """Fetch records by ``_key`` as {value: record}.
+
+        Values are coerced to the column's type for the lookup (so "123"
+        finds ratingKey 123) but the result is keyed by the values given.
+        Models that list ``_key`` in ``_entity_cache_keys`` answer from
+        their entity cache first; the misses are loaded with one IN query
+        per ``chunk_size`` values.
+        """
+        requested = {}
+        for value in values:
+            requested.setdefault(cls._coerce_key(_key, value), []).append(value)
+        values = list(requested)
+        records = {}
+        if cls._entity_cache is not None and _key in cls._entity_cache_keys:
+            found, missing = cls._entity_cache.get_many(
+                [(_key, value) for value in values])
+            for (_, value), snapshot in found.items():
+                records[value] = cls._from_snapshot(snapshot)
+            values = [value for _, value in missing]
+        column = getattr(cls, _key)
+        for i in range(0, len(values), chunk_size):
+            loaded = cls.query.filter(column.in_(values[i:i + chunk_size])).all()
+            if cls._entity_cache is not None:
+                cls._cache_entities(loaded)
+            for record in loaded:
+                records[getattr(record, _key)] = record
+        return {
+            value: record for key, record in records.items()
+            for value in requested.get(key, ())
+        }
+
+    @classmethod
+    def get_by_id(cls, value):
+        """Fetch one record by integer id or uuid string."""
+        key = "uuid" if isinstance(value, str) else "id"
+        return cls.get_many([value], _key=key).get(value)
+
+    @classmethod
+    def entity_cache_stats(cls):
+        return cls._entity_cache.stats() if cls._entity_cache is not None else None
+
+    @classmethod
+    @timed("create")
     def create(cls, *args: (dict | list | set | object), **kwargs):
         try:
             flattened_kwargs = cls._flatten_args_kwargs(*args, **kwargs)
@@ -75,15 +344,16 @@ class Model(db.Model):
                 flattened_kwargs.update({"uuid": str(uuid4())})
             new_record = cls(**flattened_kwargs)
             db.session.add(new_record)
-            db.session.commit()
+            cls._commit()
             cls._logger.debug(f"Created new {cls.__name__}: {new_record}")
             return new_record
         except Exception as e:
             cls._logger.warning(f"Failed to create {cls.__name__}: {e}")
-            db.session.rollback()
+            cls._rollback()
             raise
 
     @classmethod
+    @timed("upsert")
     def upsert(cls, *args, _key="id", **kwargs):
         try:
             flattened_kwargs = cls._flatten_args_kwargs(*args, **kwargs)
@@ -94,10 +364,313 @@ class Model(db.Model):
                 return cls.create(**flattened_kwargs)
         except Exception as e:
             cls._logger.warning(f"Failed to upsert {cls.__name__}: {e}")
-            db.session.rollback()
+            cls._rollback()
             raise
 
     @classmethod
+    def _column_kwargs(cls, flattened_kwargs):
+        columns = cls.__table__.columns
+        return {k: v for k, v in flattened_kwargs.items() if k in columns}
+
+    @classmethod
+    def _insert(cls):
+        dialect = db.session.get_bind().dialect.name
+        if dialect == "postgresql":
+            return postgresql.insert(cls.__table__)
+        elif dialect == "sqlite":
+            return sqlite.insert(cls.__table__)
+        raise NotImplementedError(
+            f"Bulk upsert is not supported on {dialect}")
+
+    @classmethod
+    @timed("bulk_upsert")
+    def bulk_upsert(cls, rows, key="id", batch_size=None):
+        """Insert or update many records with one statement per batch.
+
+        ``rows`` may hold dicts or plexapi objects. ``key`` must be covered
+        by a unique constraint. Flattened values that are not columns (such
+        as relationships) are handed to ``_bulk_upsert_related`` per batch.
+        Returns inserted/updated/unchanged counts.
+        """
+        batch_size = batch_size or bulk_batch_size
+        counts = {"inserted": 0, "updated": 0, "unchanged": 0}
+        columns = cls.__table__.columns
+        batch = {}
+        related = {}
+        for row in rows:
+            flattened_kwargs = cls._flatten_args_kwargs(row)
+            values = cls._column_kwargs(flattened_kwargs)
+            if values.get(key) is None:
+                raise ValueError(
+                    f"Cannot upsert {cls.__name__} without a value for {key}")
+            if cls._fingerprint_column:
+                values[cls._fingerprint_column] = cls._fingerprint(flattened_kwargs)
+            batch[values[key]] = values
+            extras = {k: v for k, v in flattened_kwargs.items() if k not in columns}
+            if extras:
+                related[values[key]] = extras
+            if len(batch) >= batch_size:
+                cls._bulk_upsert_batch(list(batch.values()), key, counts, related)
+                batch = {}
+                related = {}
+        if batch:
+            cls._bulk_upsert_batch(list(batch.values()), key, counts, related)
+        cls._logger.info(f"Bulk upserted {cls.__name__} records: {counts}")
+        return counts
+
+    @staticmethod
+    def _fingerprint_default(value):
+        if isinstance(value, datetime):
+            return value.isoformat()
+        return getattr(value, "id", None) or str(value)
+
+    @classmethod
+    def _fingerprint(cls, values):
+        """Stable sha1 of the flattened values of one incoming row."""
+        payload = json.dumps(
+            {k: v for k, v in values.items() if k not in (
+                "id", "uuid", "created_at", "updated_at", cls._fingerprint_column)},
+            sort_keys=True, separators=(",", ":"),
+            default=cls._fingerprint_default)
+        return hashlib.sha1(payload.encode()).hexdigest()
+
+    @classmethod
+    @timed("bulk_upsert_batch")
+    def _bulk_upsert_batch(cls, batch, key, counts, related=None):
+        try:
+            table = cls.__table__
+            fingerprint = cls._fingerprint_column
+            if fingerprint:
+                # Only the hash is needed to tell whether a row changed.
+                names = {fingerprint}
+            else:
+                names = {name for row in batch for name in row}
+            names = sorted(
+                names | {"id"} | set(cls._entity_cache_keys) | set(cls._tracked_columns))
+            existing = {
+                row[0]: row._mapping
+                for row in db.session.execute(
+                    select(table.c[key], *(table.c[name] for name in names))
+                    .where(table.c[key].in_([row[key] for row in batch]))
+                )
+            }
+            now = datetime.now()
+            groups = {}
+            changed = []
+            written = []
+            for row in batch:
+                existing_row = existing.get(row[key])
+                if existing_row is None:
+                    row.setdefault("uuid", str(uuid4()))
+                    row.setdefault("created_at", now)
+                    counts["inserted"] += 1
+                elif (existing_row[fingerprint] != row[fingerprint] if fingerprint
+                      else any(existing_row[k] != v for k, v in row.items())):
+                    counts["updated"] += 1
+                    changed.append(existing_row)
+                else:
+                    counts["unchanged"] += 1
+                    if fingerprint and related:
+                        related.pop(row[key], None)
+                    continue
+                row["updated_at"] = now
+                groups.setdefault(frozenset(row), []).append(row)
+            for columns, group in groups.items():
+                # executemany of one statement per column set: compiled once,
+                # not per batch and row count as a multi-VALUES insert would be.
+                stmt = cls._insert()
+                set_ = {
+                    name: stmt.excluded[name] for name in columns
+                    if name not in ("id", "uuid", "created_at", key)
+                }
+                if set_:
+                    stmt = stmt.on_conflict_do_update(
+                        index_elements=[key], set_=set_)
+                else:
+                    stmt = stmt.on_conflict_do_nothing(index_elements=[key])
+                stmt = stmt.returning(
+                    table.c.id, *(table.c[name] for name in cls._tracked_columns))
+                written.extend(db.session.execute(stmt, group).mappings())
+            cls._invalidate_entities(changed)
+            if related:
+                ids = dict(db.session.execute(
+                    select(table.c[key], table.c.id)
+                    .where(table.c[key].in_(list(related)))
+                ).all())
+                cls._bulk_upsert_related(
+                    {ids[k]: extras for k, extras in related.items()})
+            if written:
+                cls._bulk_upserted(written, {row["id"]: row for row in changed})
+            cls._commit()
+            cls._logger.debug(
+                f"Wrote batch of {len(batch)} {cls.__name__} records.")
+        except Exception as e:
+            cls._logger.warning(
+                f"Failed to bulk upsert {cls.__name__}: {e}")
+            cls._rollback()
+            raise
+
+    @classmethod
+    def _bulk_upsert_related(cls, related):
+        """Write non-column values of a bulk upsert batch ({id: values})."""
+        pass
+
+    @classmethod
+    def _bulk_upserted(cls, written, previous):
+        """Called after a bulk upsert batch wrote rows, before it commits.
+
+        ``written`` holds the id and ``_tracked_columns`` of each inserted
+        or updated row; ``previous`` maps the id of updated rows to their
+        values beforehand.
+        """
+        pass
+
+    @classmethod
+    @timed("copy_load")
+    def copy_load(cls, rows, key="id", batch_size=pg_copy.CHUNK_ROWS):
+        """Load ``rows`` with COPY through a staging table (Postgres only).
+
+        The fast path of an initial import. Rows are flattened and
+        fingerprinted as in ``bulk_upsert`` and COPYed into a temporary table
+        ``batch_size`` at a time; each chunk's non-column values are handed to
+        ``_copy_stage_related`` as it lands, so memory does not grow with the
+        number of rows. Staged rows with a new ``key`` are merged with one
+        INSERT ... SELECT (the last row of a ``key`` wins); those whose
+        ``key`` already exists are read back from the stage and upserted in
+        ``bulk_upsert`` batches. The whole load is one transaction and
+        writes what ``bulk_upsert`` would. Returns the counts.
+        """
+        connection = db.session.connection()
+        if connection.dialect.name != "postgresql":
+            raise NotImplementedError(
+                f"COPY loading is not supported on {connection.dialect.name}")
+        table = cls.__table__
+        columns = [column.name for column in table.columns if column.name != "id"]
+        stage = f"{table.name}_copy_stage"
+        fingerprint = cls._fingerprint_column
+        now = datetime.now()
+        counts = {"inserted": 0, "updated": 0, "unchanged": 0}
+
+        def quote(name):
+            return pg_copy.quote(connection, name)
+
+        def stage_chunk(staged, related, chunk):
+            pg_copy.copy_rows(connection, stage, ["copy_seq", *columns], staged)
+            cls._copy_stage_related(related, chunk)
+
+        with cls.batch():
+            try:
+                pg_copy.create_stage(connection, stage, table, columns, extra=[
+                    ("copy_seq", "bigint"), ("copy_conflict", "boolean")])
+                cls._copy_begin_related(key)
+                staged, related, chunk = [], {}, 0
+                for seq, row in enumerate(rows):
+                    flattened_kwargs = cls._flatten_args_kwargs(row)
+                    values = cls._column_kwargs(flattened_kwargs)
+                    if values.get(key) is None:
+                        raise ValueError(
+                            f"Cannot load {cls.__name__} without a value for {key}")
+                    if fingerprint:
+                        values[fingerprint] = cls._fingerprint(flattened_kwargs)
+                    values.setdefault("uuid", str(uuid4()))
+                    values.setdefault("created_at", now)
+                    values["updated_at"] = now
+                    extras = {k: v for k, v in flattened_kwargs.items() if k not in table.columns}
+                    if extras:
+                        related[values[key]] = extras
+                    staged.append((seq, *(values.get(column) for column in columns)))
+                    if len(staged) >= batch_size:
+                        stage_chunk(staged, related, chunk)
+                        staged, related, chunk = [], {}, chunk + 1
+                if staged:
+                    stage_chunk(staged, related, chunk)
+                conflicts = connection.execute(text(
+                    f"UPDATE {stage} SET copy_conflict = true FROM {quote(table.name)} t "
+                    f"WHERE {stage}.{quote(key)} = t.{quote(key)}")).rowcount
+                column_list = ", ".join(quote(column) for column in columns)
+                counts["inserted"] = connection.execute(text(
+                    f"INSERT INTO {quote(table.name)} ({column_list}) "
+                    f"SELECT DISTINCT ON ({quote(key)}) {column_list} FROM {stage} "
+                    f"WHERE copy_conflict IS NOT TRUE ORDER BY {quote(key)}, copy_seq DESC"
+                )).rowcount
+                cls._copy_load_related(stage, key)
+                cls._copy_report_inserted(stage, key, batch_size)
+                if conflicts:
+                    cls._copy_upsert_conflicts(stage, key, columns, counts, batch_size)
+                cls._commit()
+            except Exception as e:
+                cls._logger.warning(f"Failed to COPY load {cls.__name__}: {e}")
+                cls._rollback()
+                raise
+        cls._logger.info(f"COPY loaded {cls.__name__} records: {counts}")
+        return counts
+
+    @classmethod
+    def _copy_report_inserted(cls, stage, key, batch_size):
+        # Streamed from a server-side cursor, ``batch_size`` rows at a time.
+        connection = db.session.connection()
+        quote = connection.dialect.identifier_preparer.quote
+        columns = ", ".join(
+            f"t.{quote(column)}" for column in dict.fromkeys(("id", key, *cls._tracked_columns)))
+        result = connection.execute(text(
+            f"SELECT {columns} FROM {quote(cls.__table__.name)} t "
+            f"JOIN (SELECT DISTINCT {quote(key)} FROM {stage} WHERE copy_conflict IS NOT TRUE) s "
+            f"ON t.{quote(key)} = s.{quote(key)}"
+        ).execution_options(stream_results=True))
+        for written in result.mappings().partitions(batch_size):
+            cls._bulk_upserted(written, {})
+
+    @classmethod
+    def _copy_upsert_conflicts(cls, stage, key, columns, counts, batch_size):
+        """Upsert the staged rows whose ``key`` already existed, ``batch_size`` at a time."""
+        connection = db.session.connection()
+        quote = connection.dialect.identifier_preparer.quote
+        column_list = ", ".join(quote(column) for column in columns)
+        connection.execute(text(
+            f"CREATE INDEX ON {stage} ({quote(key)}, copy_seq) WHERE copy_conflict"))
+        last = None
+        while True:
+            after = "" if last is None else f"AND {quote(key)} > :last "
+            batch = [
+                {k: v for k, v in row.items() if k not in ("uuid", "created_at", "updated_at")}
+                for row in connection.execute(text(
+                    f"SELECT DISTINCT ON ({quote(key)}) {column_list} FROM {stage} "
+                    f"WHERE copy_conflict {after}"
+                    f"ORDER BY {quote(key)}, copy_seq DESC LIMIT :limit"
+                ), {"last": last, "limit": batch_size}).mappings()
+            ]
+            if not batch:
+                return
+            last = batch[-1][key]
+            cls._bulk_upsert_batch(
+                batch, key, counts, cls._copy_staged_related([row[key] for row in batch]))
+
+    @classmethod
+    def _copy_begin_related(cls, key):
+        """Prepare staging for the non-column values of a ``copy_load``."""
+        pass
+
+    @classmethod
+    def _copy_stage_related(cls, related, chunk):
+        """Stage the non-column values of one ``copy_load`` chunk ({key: values}).
+
+        ``chunk`` numbers the chunks in order; a later chunk's values for a
+        key win.
+        """
+        pass
+
+    @classmethod
+    def _copy_load_related(cls, stage, key):
+        """Write the staged values of the rows ``copy_load`` inserted from ``stage``."""
+        pass
+
+    @classmethod
+    def _copy_staged_related(cls, keys):
+        """The staged values of ``keys`` ({key: values}), for rows that are upserted."""
+        return {}
+
+    @classmethod
+    @timed("get")
     def get(cls, *args, _first=False, **kwargs):
         if args and isinstance(args[0], int):
             kwargs.update({"id": args[0]})
@@ -105,22 +678,27 @@ class Model(db.Model):
         try:
             if flattened_kwargs:
                 records = cls.query.filter_by(**flattened_kwargs)
-                cls._logger.info(
-                    f"Retrieved {len(records.all())} {cls.__name__} records with filters {flattened_kwargs}.")
             else:
                 records = cls.query
-                cls._logger.info(
-                    f"Retrieved all {cls.__name__} records. Count: {len(records.all())}")
             if not _first:
-                return records.all()
+                cls._logger.info(
+                    f"Querying {cls.__name__} records with filters {flattened_kwargs}.")
+                return Results(cls, records)
+            if len(flattened_kwargs) == 1 and next(iter(flattened_kwargs)) in cls._entity_cache_keys:
+                key, value = next(iter(flattened_kwargs.items()))
+                record = cls.get_many([value], _key=key).get(value)
             else:
-                return records.first()
+                record = records.first()
+            cls._logger.info(
+                f"Retrieved {cls.__name__} {record} with filters {flattened_kwargs}.")
+            return record
         except Exception as e:
             cls._logger.warning(
                 f"Failed to retrieve {cls.__name__} records with filters {flattened_kwargs}: {e}")
             raise
 
     @classmethod
+    @timed("search")
     def search(cls, filters, _first=False, _any=False):
         try:
             query = cls.query
@@ -149,17 +727,31 @@ class Model(db.Model):
                 else:
                     query = query.filter(or_(*filter_conditions))
             records = query
-            cls._logger.info(
-                f"Search returned {len(records.all())} {cls.__name__} records with filters {filters}.")
             if not _first:
-                return records.all()
-            else:
-                return records.first()
+                cls._logger.info(
+                    f"Searching {cls.__name__} records with filters {filters}.")
+                return Results(cls, records)
+            record = records.first()
+            cls._logger.info(
+                f"Search found {cls.__name__} {record} with filters {filters}.")
+            return record
         except Exception as e:
             cls._logger.warning(
                 f"Failed to search {cls.__name__} with filters {filters}: {e}")
             raise
 
+    def to_dict(self, fields=None):
+        data = {}
+        for column in self.__table__.columns:
+            if column.key in self._hidden_fields or (fields and column.key not in fields):
+                continue
+            value = getattr(self, column.key)
+            if isinstance(value, datetime):
+                value = value.isoformat()
+            data[column.key] = value
+        return data
+
+    @timed("update")
     def update(self, *args, **kwargs):
         try:
             flattened_kwargs = self._flatten_args_kwargs(*args, **kwargs)
@@ -168,7 +760,7 @@ class Model(db.Model):
                 for key, value in delta.items():
                     setattr(self, key, value)
                 self.updated_at = datetime.now()
-                db.session.commit()
+                self._commit()
                 self._logger.info(f"Updated {self.__class__.__name__}: {self}")
             else:
                 self._logger.info(
@@ -177,14 +769,15 @@ class Model(db.Model):
         except Exception as e:
             self._logger.warning(
                 f"Failed to update {self.__class__.__name__} with id {self.id}: {e}")
-            db.session.rollback()
+            self._rollback()
             raise
 
+    @timed("delete")
     def delete(self):
         try:
             record = self
             db.session.delete(self)
-            db.session.commit()
+            self._commit()
             self._logger.info(
                 f"Deleted {self.__class__.__name__}: {record.id}."
             )
@@ -192,5 +785,27 @@ class Model(db.Model):
         except Exception as e:
             self._logger.warning(
                 f"Failed to delete {self.__class__.__name__} with id {self.id}: {e}")
-            db.session.rollback()
+            self._rollback()
             raise
+
+
+@event.listens_for(Model, "after_update", propagate=True)
+@event.listens_for(Model, "after_delete", propagate=True)
+def _invalidate_entity_cache(mapper, connection, target):
+    if target._entity_cache is None:
+        return
+    state = inspect(target)
+    rows = [{key: getattr(target, key) for key in target._entity_cache_keys}]
+    for key in target._entity_cache_keys:
+        for value in state.attrs[key].history.deleted or ():
+            rows.append({key: value})
+    target._invalidate_entities(rows, state.session)
+
+
+@event.listens_for(Model, "before_update", propagate=True)
+def _clear_fingerprint(mapper, connection, target):
+    # Writes outside bulk_upsert do not maintain the hash; dropping it makes
+    # the next sync rewrite the row instead of wrongly skipping it.
+    name = target._fingerprint_column
+    if name and not inspect(target).attrs[name].history.has_changes():
+        setattr(target, name, None)
@@ -1,9 +1,15 @@
 # movie.py
 
-from .config import db
+from sqlalchemy import select
+
+from .config import db, image_renditions
+from .metrics import timed
 from .model import Model
-from .utils import build_url
-from .image import Image
+from .downloader import ImageDownloader
+from .fulltext import ranked_query, register_fulltext
+from .typeahead import register_typeahead, typeahead_query
+from .movie_stat import MovieStat
+from .rollup import register_rollup
 from app.guid import Guid
 
 
@@ -27,6 +33,7 @@ class Movie(Model):
     title = db.Column(db.String)
     titleSort = db.Column(db.String)
     type = db.Column(db.String)
+    updatedAt = db.Column(db.DateTime)
     userRating = db.Column(db.Float)
     viewCount = db.Column(db.Integer)
     playlistItemId = db.Column(db.Integer)
@@ -74,49 +81,265 @@ class Movie(Model):
     viewOffset = db.Column(db.Integer)
     # writers = db.Column(db.JSON) # Relationship (future, do not touch)
     year = db.Column(db.Integer)
+    fingerprint = db.Column(db.String(40))
+    __table_args__ = (
+        db.UniqueConstraint("ratingKey", name="uq_movie_ratingKey"),
+    )
+    _indexes = (
+        "guid",
+        "titleSort",
+        "year",
+        ("librarySectionID", "titleSort"),
+        {"columns": ("lastViewedAt",), "where": '"lastViewedAt" IS NOT NULL'},
+    )
+    _entity_cache_keys = ("id", "uuid", "ratingKey")
+    _fingerprint_column = "fingerprint"
+    _aliases = {
+        "playlistItemID": "playlistItemId",
+        "playQueueItemID": "playQueueItemId",
+    }
+
+    # Full-text weight class (A highest) of each searchable column.
+    _fulltext_fields = {
+        "title": "A",
+        "originalTitle": "A",
+        "tagline": "B",
+        "summary": "C",
+    }
+
+    # Fields matched by typeahead; the first also orders its results.
+    _typeahead_fields = ("titleSort", "title", "originalTitle")
+    _typeahead_index = None
+
+    # Rollups kept in MovieStat: every measure per value of each dimension.
+    _rollup_dimensions = ("year", "studio", "contentRating", "librarySectionID")
+    _rollup_measures = ("duration", "viewCount", "audienceRating")
+    _tracked_columns = _rollup_dimensions + _rollup_measures
+    _rollup = None
+
+    _image_sizes = {
+        "thumb": {"max_width": 250},
+        "art": {"max_height": 1080},
+    }
+    _image_downloader = None
 
-    def download_images(self, force_ext=None, quality=None):
-        self.download_thumb(force_ext, quality=quality)
-        self.download_art(force_ext, quality=quality)
-
-    def download_thumb(self, force_ext, quality=None):
-        self._download_image("thumb", max_width=250,
-                             force_ext=force_ext, quality=quality)
-
-    def download_art(self, force_ext, quality=None):
-        self._download_image("art", max_height=1080,
-                             force_ext=force_ext, quality=quality)
-
-    def _download_image(self, key, max_width=None, max_height=None, force_ext=None, quality=None):
-        if key == "thumb":
-            img_key = getattr(self, key)
-            url = build_url(img_key)
-        elif key == "art":
-            img_key = getattr(self, key)
-            url = build_url(img_key)
-        else:
+    def download_images(self, force_ext=None, quality=None, revalidate=False):
+        """Download thumb and art, skipping those the ImageManifest has unchanged."""
+        return self.image_downloader().download(
+            [self], {kind: [size] for kind, size in self._image_sizes.items()},
+            force_ext, quality, revalidate=revalidate)
+
+    def download_thumb(self, force_ext, quality=None, revalidate=False):
+        return self._download_image("thumb", force_ext=force_ext, quality=quality,
+                                    revalidate=revalidate, **self._image_sizes["thumb"])
+
+    def download_art(self, force_ext, quality=None, revalidate=False):
+        return self._download_image("art", force_ext=force_ext, quality=quality,
+                                    revalidate=revalidate, **self._image_sizes["art"])
+
+    def _download_image(self, key, max_width=None, max_height=None, force_ext=None,
+                        quality=None, revalidate=False):
+        if key not in self._image_sizes:
             raise ValueError(f"Unknown image key: {key}")
-        image = Image(url, img_key)
-        image.download(max_width, max_height, force_ext, quality=quality)
+        size = {"max_width": max_width, "max_height": max_height}
+        results = self.image_downloader().download(
+            [self], {key: [{k: v for k, v in size.items() if v}]},
+            force_ext, quality, revalidate=revalidate)
+        return results[0]
+
+    @classmethod
+    def image_downloader(cls, workers=None):
+        """The ImageDownloader shared by image downloads, or a new one for ``workers``.
+
+        A new downloader holds its own process pool; the caller closes it.
+        """
+        if workers is not None:
+            return ImageDownloader(workers)
+        if cls._image_downloader is None:
+            cls._image_downloader = ImageDownloader()
+        return cls._image_downloader
 
     @classmethod
+    def download_all_images(cls, movies, workers=None, force_ext=None, quality=None,
+                            revalidate=False, renditions=None):
+        """Download thumb and art for many movies concurrently.
+
+        ``renditions`` (default IMAGE_RENDITIONS, else one rendition per
+        kind at the download_thumb/download_art size) maps thumb/art to the
+        list of sizes and formats to write from each download.
+        """
+        renditions = renditions or image_renditions or {
+            kind: [size] for kind, size in cls._image_sizes.items()
+        }
+        if workers is None:
+            return cls.image_downloader().download(
+                movies, renditions, force_ext, quality, revalidate=revalidate)
+        with cls.image_downloader(workers) as downloader:
+            return downloader.download(
+                movies, renditions, force_ext, quality, revalidate=revalidate)
+
+    @classmethod
+    def by_external_ids(cls, guids, chunk_size=5000):
+        """Map external ids (``imdb://…``, ``tmdb://…``) to a Movie or None."""
+        resolved = Guid.resolve_many(guids)
+        ids = sorted({
+            media_id for media in resolved.values()
+            for media_type, media_id in media if media_type == "movie"
+        })
+        movies = {}
+        for i in range(0, len(ids), chunk_size):
+            for movie in cls.query.filter(cls.id.in_(ids[i:i + chunk_size])):
+                movies[movie.id] = movie
+        return {
+            guid: next((movies[media_id] for media_type, media_id in media
+                        if media_type == "movie" and media_id in movies), None)
+            for guid, media in resolved.items()
+        }
+
+    @classmethod
+    def by_external_id(cls, guid):
+        return cls.by_external_ids([guid])[guid]
+
+    @classmethod
+    def fulltext(cls, query, limit=20, year=None, contentRating=None, librarySectionID=None):
+        """Search title, originalTitle, tagline and summary, best match first.
+
+        Every word of ``query`` must match (stemmed, case and accent
+        insensitive); title matches outrank tagline and summary ones.
+        """
+        ranked = ranked_query(cls, query, db.session.get_bind().dialect.name)
+        if ranked is None:
+            return []
+        filters = {
+            "year": year,
+            "contentRating": contentRating,
+            "librarySectionID": librarySectionID,
+        }
+        ranked = ranked.filter(*(
+            getattr(cls, field) == value
+            for field, value in filters.items() if value is not None))
+        records = ranked.limit(limit).all()
+        cls._logger.info(
+            f"Full-text search {query!r} found {len(records)} {cls.__name__} records.")
+        return records
+
+    @classmethod
+    def typeahead(cls, prefix, limit=10):
+        """Movies whose title, titleSort or originalTitle starts with ``prefix``.
+
+        Matching ignores case, accents, punctuation and a leading article,
+        so "burbs" and "the bu" both find "The 'Burbs".
+        """
+        if db.session.get_bind().dialect.name == "postgresql":
+            query = typeahead_query(cls, prefix, cls._typeahead_fields)
+            return [] if query is None else query.limit(limit).all()
+        index = cls._typeahead_index
+        columns = (cls.id, *(getattr(cls, field) for field in cls._typeahead_fields))
+        stale = index.take_stale()
+        # Re-reading the table beats re-inserting a large share of it.
+        if not index.built or len(stale) > len(index) // 10:
+            index.build(db.session.execute(select(*columns)))
+        elif stale:
+            index.refresh(
+                db.session.execute(select(*columns).where(cls.id.in_(stale))), stale)
+        ids = index.search(prefix, limit)
+        records = cls.get_many(ids)
+        return [records[id_] for id_ in ids if id_ in records]
+
+    @classmethod
+    def stats(cls, by=None):
+        """Catalog totals, or per value of ``by`` (one of _rollup_dimensions).
+
+        Each entry has ``count`` and, for every measure, its sum and
+        ``<measure>_avg``. Served from MovieStat, so the cost does not grow
+        with the number of movies.
+        """
+        return cls._rollup.read(by)
+
+    @classmethod
+    def rebuild_stats(cls):
+        """Recompute MovieStat from scratch, e.g. after writes made outside the ORM."""
+        try:
+            cls._rollup.rebuild(db.session)
+            cls._commit()
+        except Exception as e:
+            cls._logger.warning(f"Failed to rebuild {cls.__name__} stats: {e}")
+            cls._rollback()
+            raise
+
+    @classmethod
+    def _bulk_upserted(cls, written, previous):
+        cls._typeahead_index.track(db.session, [row["id"] for row in written])
+        for row in written:
+            cls._rollup.track(db.session, old=previous.get(row["id"]), new=row)
+
+    @staticmethod
+    def _guid_ids(guids):
+        ids = []
+        for guid in guids:
+            if isinstance(guid, str):
+                ids.append(guid)
+            elif isinstance(guid, dict):
+                ids.append(guid.get("id") or guid.get("guid"))
+            else:
+                ids.append(guid.id)
+        return ids
+
+    @classmethod
+    def _bulk_upsert_related(cls, related):
+        links = {
+            media_id: cls._guid_ids(values["guids"])
+            for media_id, values in related.items() if values.get("guids") is not None
+        }
+        if links:
+            Guid.sync_links("movie", links)
+
+    @classmethod
+    def _copy_begin_related(cls, key):
+        Guid.create_link_stage(cls.__table__, key)
+
+    @classmethod
+    def _copy_stage_related(cls, related, chunk):
+        links = {
+            media_key: cls._guid_ids(values["guids"])
+            for media_key, values in related.items() if values.get("guids") is not None
+        }
+        if links:
+            Guid.stage_links(links, chunk)
+
+    @classmethod
+    def _copy_load_related(cls, stage, key):
+        Guid.copy_staged_links("movie", cls.__table__, key, stage)
+
+    @classmethod
+    def _copy_staged_related(cls, keys):
+        return {
+            media_key: {"guids": guids}
+            for media_key, guids in Guid.staged_links(keys).items()
+        }
+
+    @classmethod
+    @timed("upsert")
     def upsert(cls, *args, _key="id", **kwargs):
         flattened_kwargs = cls._flatten_args_kwargs(*args, **kwargs)
 
-        guids = flattened_kwargs.get("guids", [])
-        obj_guids = []
-
-        del flattened_kwargs["guids"]
+        guids = flattened_kwargs.pop("guids", None)
         record = super().upsert(_key="ratingKey", **flattened_kwargs)
 
-        for guid in guids:
-            guid.guid = guid.id
-            delattr(guid, "id")
-            guid.media_id = record.id
-            guid.media_type = "movie"
-            obj_guids.append(Guid.upsert(guid, _key="guid"))
-
-        record.guids.clear()
-        record.guids.extend(obj_guids)
-        db.session.commit()
+        if guids is not None:
+            try:
+                if record.id is None:
+                    db.session.flush()
+                Guid.sync_links("movie", {record.id: cls._guid_ids(guids)})
+                cls._commit()
+            except Exception as e:
+                cls._logger.warning(f"Failed to sync guids for {record}: {e}")
+                cls._rollback()
+                raise
         return record
+
+
+register_fulltext(Movie.__table__, Movie._fulltext_fields)
+Movie._typeahead_index = register_typeahead(Movie, Movie._typeahead_fields)
+Movie._rollup = register_rollup(
+    Movie, MovieStat, Movie._rollup_dimensions, Movie._rollup_measures)
@@ -0,0 +1,25 @@
+# movie_stat.py
+from .config import db
+from .model import Model
+
+
+class MovieStat(Model):
+    """One rollup bucket of Movie: a value of one dimension and its totals.
+
+    Maintained by the Rollup registered in movie.py; read it through
+    ``Movie.stats``.
+    """
+    bucket = db.Column(db.String)
+    dimension = db.Column(db.String)
+    value = db.Column(db.String)
+    count = db.Column(db.Integer)
+    duration_sum = db.Column(db.BigInteger)
+    duration_count = db.Column(db.Integer)
+    viewCount_sum = db.Column(db.BigInteger)
+    viewCount_count = db.Column(db.Integer)
+    audienceRating_sum = db.Column(db.Float)
+    audienceRating_count = db.Column(db.Integer)
+    __table_args__ = (
+        db.UniqueConstraint("bucket", name="uq_moviestat_bucket"),
+    )
+    _indexes = ("dimension",)
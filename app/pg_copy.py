@@ -0,0 +1,106 @@
+# pg_copy.py
+import json
+from datetime import date, datetime
+
+from sqlalchemy import text
+
+# Rows encoded per write to the COPY stream.
+CHUNK_ROWS = 1000
+
+
+def csv_field(value):
+    """One value in COPY's CSV format, where an unquoted empty field is NULL."""
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if isinstance(value, (int, float)):
+        return str(value)
+    if isinstance(value, (datetime, date)):
+        value = value.isoformat(sep=" ") if isinstance(value, datetime) else value.isoformat()
+    elif isinstance(value, (dict, list)):
+        value = json.dumps(value)
+    return '"' + str(value).replace('"', '""') + '"'
+
+
+def csv_chunks(rows, chunk_rows=CHUNK_ROWS):
+    """Encode an iterable of value tuples as CSV text, ``chunk_rows`` rows per chunk."""
+    lines = []
+    for row in rows:
+        lines.append(",".join(map(csv_field, row)))
+        if len(lines) >= chunk_rows:
+            yield "\n".join(lines) + "\n"
+            lines = []
+    if lines:
+        yield "\n".join(lines) + "\n"
+
+
+class ChunkReader:
+    """File-like view of an iterator of str chunks, for psycopg2's copy_expert."""
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._chunk = ""
+        self._offset = 0
+
+    def read(self, size=-1):
+        parts = []
+        wanted = size
+        while wanted != 0:
+            if self._offset >= len(self._chunk):
+                self._chunk = next(self._chunks, None)
+                self._offset = 0
+                if self._chunk is None:
+                    self._chunk = ""
+                    break
+            end = len(self._chunk) if wanted < 0 else min(len(self._chunk), self._offset + wanted)
+            parts.append(self._chunk[self._offset:end])
+            if wanted > 0:
+                wanted -= end - self._offset
+            self._offset = end
+        return "".join(parts)
+
+
+def quote(connection, name):
+    return connection.dialect.identifier_preparer.quote(name)
+
+
+def create_stage(connection, name, table, columns, extra=()):
+    """Create temp table ``name`` typed like ``columns`` of ``table``, dropped on commit.
+
+    ``extra`` holds (name, SQL type) columns put before the table's columns.
+    Constraints, defaults and indexes are not copied, so any subset of
+    columns can be loaded.
+    """
+    select_list = ", ".join(
+        [f"NULL::{type_} AS {quote(connection, column)}" for column, type_ in extra]
+        + [quote(connection, column) for column in columns])
+    connection.execute(text(f"DROP TABLE IF EXISTS {name}"))
+    connection.execute(text(
+        f"CREATE TEMP TABLE {name} ON COMMIT DROP AS "
+        f"SELECT {select_list} FROM {quote(connection, table.name)} WITH NO DATA"))
+
+
+def copy_rows(connection, name, columns, rows):
+    """Stream ``rows`` (value tuples) into table ``name`` with COPY ... FROM STDIN.
+
+    Runs on the DBAPI connection behind ``connection``, inside its
+    transaction; psycopg 3 (``cursor.copy``) and psycopg2
+    (``cursor.copy_expert``) are supported.
+    """
+    sql = (f"COPY {name} ({', '.join(quote(connection, column) for column in columns)}) "
+           f"FROM STDIN WITH (FORMAT csv)")
+    chunks = csv_chunks(rows)
+    cursor = connection.connection.cursor()
+    try:
+        if hasattr(cursor, "copy"):
+            with cursor.copy(sql) as copy:
+                for chunk in chunks:
+                    copy.write(chunk)
+        elif hasattr(cursor, "copy_expert"):
+            cursor.copy_expert(sql, ChunkReader(chunks))
+        else:
+            raise NotImplementedError(
+                f"COPY is not supported by {type(cursor).__module__}")
+    finally:
+        cursor.close()
@@ -0,0 +1,110 @@
+# results.py
+from sqlalchemy import and_, func, or_, tuple_
+from sqlalchemy.orm import load_only
+
+from .metrics import timed
+
+
+class Results:
+    """Lazy result set returned by ``Model.get`` and ``Model.search``.
+
+    Nothing is executed until the results are used. Iterating, ``len()``,
+    truth testing, indexing and slicing behave like the list these methods
+    used to return: the first of them loads the rows with one query and
+    the rest reuse them. Until then indexing and slicing query just the
+    rows asked for; ``count()``, ``page()`` and ``stream()`` always query,
+    without loading rows that are not needed.
+    """
+
+    def __init__(self, model, query):
+        self.model = model
+        self.query = query
+        self._records = None
+
+    def _loaded(self):
+        if self._records is None:
+            self._records = self.all()
+        return self._records
+
+    def __iter__(self):
+        return iter(self._loaded())
+
+    def __len__(self):
+        return len(self._loaded())
+
+    def __bool__(self):
+        return bool(self._loaded())
+
+    def __getitem__(self, index):
+        if self._records is not None:
+            return self._records[index]
+        return self.query[index]
+
+    def __repr__(self):
+        return f"<Results {self.model.__name__}>"
+
+    def only(self, *fields):
+        """Return a copy that loads only ``fields`` (plus the primary key)."""
+        return Results(self.model, self.query.options(
+            load_only(*(getattr(self.model, field) for field in fields))))
+
+    @timed("all")
+    def all(self):
+        return self.query.all()
+
+    @timed("first")
+    def first(self):
+        return self.query.first()
+
+    @timed("count")
+    def count(self):
+        return self.query.with_entities(
+            func.count(self.model.id)).order_by(None).scalar()
+
+    @timed("page")
+    def page(self, after=None, limit=100, key="id"):
+        """Return up to ``limit`` records following the ``after`` cursor.
+
+        Keyset pagination ordered by ``key`` then id, so deep pages cost the
+        same as the first one. ``after`` is the ``cursor()`` of the last
+        record of the previous page. NULLs of a nullable ``key`` sort last
+        on every backend.
+        """
+        id_column = self.model.id
+        query = self.query.order_by(None)
+        if key == "id":
+            if after is not None:
+                query = query.filter(id_column > after)
+            query = query.order_by(id_column)
+        elif not getattr(self.model.__table__.c, key).nullable:
+            column = getattr(self.model, key)
+            if after is not None:
+                query = query.filter(tuple_(column, id_column) > tuple_(*after))
+            query = query.order_by(column, id_column)
+        else:
+            column = getattr(self.model, key)
+            if after is not None:
+                query = query.filter(self._after_nullable(column, *after))
+            query = query.order_by(column.asc().nulls_last(), id_column)
+        return query.limit(limit).all()
+
+    def _after_nullable(self, column, value, id):
+        # A row comparison is never true against NULL, so spell it out.
+        id_column = self.model.id
+        if value is None:
+            return and_(column.is_(None), id_column > id)
+        return or_(
+            column > value,
+            and_(column == value, id_column > id),
+            column.is_(None),
+        )
+
+    @staticmethod
+    def cursor(record, key="id"):
+        if key == "id":
+            return record.id
+        return getattr(record, key), record.id
+
+    def stream(self, batch_size=1000):
+        """Yield records while fetching ``batch_size`` rows at a time."""
+        yield from self.query.yield_per(batch_size)
@@ -0,0 +1,173 @@
+# rollup.py
+import json
+from datetime import datetime
+from uuid import uuid4
+
+from sqlalchemy import delete, event, func, inspect, select
+from sqlalchemy.orm import Session
+
+from .config import db
+
+
+def encode(value):
+    return json.dumps(value, default=str)
+
+
+class Rollup:
+    """Counts, sums and averages of ``measures`` per value of each dimension.
+
+    Buckets live in ``summary`` (columns bucket, dimension, value, count and
+    <measure>_sum / <measure>_count). Every insert, update and delete of
+    ``source`` is turned into per-bucket deltas that are applied when the
+    session commits, so neither writes nor reads aggregate the source table.
+    """
+
+    def __init__(self, source, summary, dimensions, measures):
+        self.source = source
+        self.summary = summary
+        self.dimensions = tuple(dimensions)
+        self.measures = tuple(measures)
+        self._measure_counters = [
+            (measure, f"{measure}_sum", f"{measure}_count") for measure in self.measures
+        ]
+        self.counters = ["count"] + [
+            name for _, *names in self._measure_counters for name in names
+        ]
+
+    def _add(self, deltas, row, sign):
+        for dimension in self.dimensions:
+            delta = deltas.setdefault(
+                (dimension, encode(row[dimension])), dict.fromkeys(self.counters, 0))
+            delta["count"] += sign
+            for measure, total, count in self._measure_counters:
+                if row[measure] is not None:
+                    delta[total] += sign * row[measure]
+                    delta[count] += sign
+
+    def track(self, session, old=None, new=None):
+        """Record a row going from ``old`` to ``new`` values (None: absent)."""
+        deltas = session.info.setdefault("rollup", {}).setdefault(self, {})
+        if old is not None:
+            self._add(deltas, old, -1)
+        if new is not None:
+            self._add(deltas, new, 1)
+
+    def apply(self, session, deltas):
+        now = datetime.now()
+        rows = [
+            {"bucket": f"{dimension}={value}", "dimension": dimension, "value": value,
+             "uuid": str(uuid4()), "created_at": now, "updated_at": now, **delta}
+            for (dimension, value), delta in deltas.items() if any(delta.values())
+        ]
+        if not rows:
+            return
+        rows.sort(key=lambda row: row["bucket"])
+        table = self.summary.__table__
+        # executemany of one statement: compiled once, not per bucket. Rows
+        # go in bucket order so concurrent commits (parallel section syncs)
+        # lock shared buckets in the same order instead of deadlocking.
+        stmt = self.summary._insert()
+        stmt = stmt.on_conflict_do_update(index_elements=["bucket"], set_={
+            "updated_at": stmt.excluded.updated_at,
+            **{name: table.c[name] + stmt.excluded[name] for name in self.counters},
+        })
+        session.execute(stmt, rows)
+        session.execute(delete(table).where(
+            table.c.bucket.in_([row["bucket"] for row in rows]), table.c.count <= 0))
+        self.summary._touch()
+
+    def rebuild(self, session):
+        """Recompute every bucket from the source table."""
+        table = self.source.__table__
+        aggregates = [func.count()] + [
+            aggregate(table.c[measure])
+            for measure in self.measures for aggregate in (func.sum, func.count)
+        ]
+        deltas = {}
+        for dimension in self.dimensions:
+            column = table.c[dimension]
+            for value, *totals in session.execute(
+                    select(column, *aggregates).group_by(column)):
+                deltas[(dimension, encode(value))] = dict(
+                    zip(self.counters, (total or 0 for total in totals)))
+        session.execute(delete(self.summary.__table__))
+        self.apply(session, deltas)
+
+    def read(self, by=None):
+        """Totals, or one entry per value of dimension ``by``."""
+        dimension = by or self.dimensions[0]
+        if dimension not in self.dimensions:
+            raise ValueError(f"Unknown {self.source.__name__} stats dimension: {by}")
+        table = self.summary.__table__
+        buckets = db.session.execute(
+            select(table.c.value, *(table.c[name] for name in self.counters))
+            .where(table.c.dimension == dimension)
+        ).all()
+        if by is None:
+            # Every row sits in exactly one bucket of any dimension.
+            totals = [sum(bucket[i] for bucket in buckets) for i in range(1, len(self.counters) + 1)]
+            return self._entry(dict(zip(self.counters, totals)))
+        entries = [
+            {by: json.loads(bucket[0]), **self._entry(dict(zip(self.counters, bucket[1:])))}
+            for bucket in buckets
+        ]
+        return sorted(entries, key=lambda entry: (entry[by] is None, entry[by]))
+
+    def _entry(self, counters):
+        entry = {"count": counters["count"]}
+        for measure in self.measures:
+            total, count = counters[f"{measure}_sum"], counters[f"{measure}_count"]
+            entry[measure] = total
+            entry[f"{measure}_avg"] = total / count if count else None
+        return entry
+
+
+@event.listens_for(Session, "before_commit")
+def _apply_rollups(session):
+    if "rollup" not in session.info and not (session.new or session.dirty or session.deleted):
+        return
+    # Flush first so the ORM events of pending changes record their deltas.
+    session.flush()
+    rollups = session.info.pop("rollup", {})
+    for rollup in sorted(rollups, key=lambda rollup: rollup.summary.__tablename__):
+        rollup.apply(session, rollups[rollup])
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rollups(session):
+    session.info.pop("rollup", None)
+
+
+def register_rollup(source, summary, dimensions, measures):
+    """Maintain ``summary`` from ORM writes of ``source`` and return the Rollup.
+
+    Bulk writes report their rows through ``source._bulk_upserted``.
+    """
+    rollup = Rollup(source, summary, dimensions, measures)
+    columns = (*rollup.dimensions, *rollup.measures)
+
+    def values(target):
+        return {column: getattr(target, column) for column in columns}
+
+    def inserted(mapper, connection, target):
+        rollup.track(inspect(target).session, new=values(target))
+
+    def deleted(mapper, connection, target):
+        rollup.track(inspect(target).session, old=values(target))
+
+    def updated(mapper, connection, target):
+        state = inspect(target)
+        old = values(target)
+        changed = False
+        for column in columns:
+            history = state.attrs[column].history
+            if history.has_changes():
+                changed = True
+                old[column] = history.deleted[0] if history.deleted else None
+        if changed:
+            rollup.track(state.session, old=old, new=values(target))
+
+    event.listen(source, "after_insert", inserted)
+    event.listen(source, "after_delete", deleted)
+    event.listen(source, "after_update", updated)
+    return rollup
@@ -1,8 +1,10 @@
 # section.py
 
 from app.movie import Movie
-from .config import app, db
+from . import metrics
+from .config import app, db, sync_page_size, copy_initial_load
 from .model import Model
+from .sync_state import SyncState
 
 
 class Section(Model):
@@ -19,10 +21,97 @@ class Section(Model):
     thumb = db.Column(db.String)
     title = db.Column(db.String)
     type = db.Column(db.String)
-    
+    _entity_cache_keys = ("id", "uuid")
+
     @classmethod
     def create(cls, obj=None, **kwargs):
         if obj is not None:
-            for media in obj.all():
-                Movie.create(media) # This will change to work with other media types soon
-        return super().create(obj=obj, **kwargs)
\ No newline at end of file
+            cls.sync(obj, incremental=False) # This will change to work with other media types soon
+            return super().create(obj, **kwargs)
+        return super().create(**kwargs)
+
+    @classmethod
+    def ingest(cls, obj, page_size=None, params=None, watermarks=None):
+        """Write every item of a plexapi section, one page at a time.
+
+        A full read of a section with no rows yet is COPY loaded on
+        Postgres (see ``Model.copy_load``) unless COPY_INITIAL_LOAD=0; the
+        section is read from Plex once either way.
+        """
+        page_size = page_size or sync_page_size
+        if not params and cls._initial_load(obj):
+            counts = Movie.copy_load(
+                cls._tracked_media(obj, page_size, params, watermarks), key="ratingKey")
+            cls._logger.info(f"Ingested section {obj.key} with COPY: {counts}")
+            return counts
+        counts = Movie.bulk_upsert(
+            cls._tracked_media(obj, page_size, params, watermarks),
+            key="ratingKey",
+            batch_size=page_size
+        )
+        cls._logger.info(f"Ingested section {obj.key}: {counts}")
+        return counts
+
+    @classmethod
+    def _tracked_media(cls, obj, page_size, params, watermarks):
+        items = cls.iter_media(obj, page_size, params)
+        if watermarks is not None:
+            items = SyncState.track(items, watermarks)
+        return items
+
+    @staticmethod
+    def _initial_load(obj):
+        if not copy_initial_load or db.session.get_bind().dialect.name != "postgresql":
+            return False
+        return Movie.get(librarySectionID=int(obj.key), _first=True) is None
+
+    @classmethod
+    def sync(cls, obj, incremental=True, page_size=None):
+        """Upsert the items of a plexapi section changed since the last sync.
+
+        The per server + section watermark lives in SyncState and is only
+        advanced once every page has been written. ``incremental=False``
+        re-reads the whole section.
+        """
+        state = SyncState.for_section(obj)
+        params = state.params() if incremental else {}
+        watermarks = {}
+        with metrics.sync_run(obj.key) as run:
+            counts = cls.ingest(obj, page_size, params, watermarks)
+            run.rows = sum(counts.values())
+            state.advance(watermarks)
+        cls._logger.info(
+            f"Synced section {obj.key} ({'incremental' if params else 'full'}): {counts}")
+        return counts
+
+    @staticmethod
+    def iter_media(obj, page_size=None, params=None):
+        """Yield the items of a plexapi section without loading them all.
+
+        Pages through ``/library/sections/{key}/all`` with the
+        X-Plex-Container-Start/Size headers. Only one page of plexapi objects
+        is held at a time; it is released before the next page is requested.
+        """
+        page_size = page_size or sync_page_size
+        ekey = f"/library/sections/{obj.key}/all"
+        params = {"includeGuids": 1, **(params or {})}
+        metrics.observe_session(obj._server._session)
+        start = 0
+        while True:
+            with metrics.operation("Plex", "section_page"):
+                data = obj._server.query(ekey, params=params, headers={
+                    "X-Plex-Container-Start": str(start),
+                    "X-Plex-Container-Size": str(page_size),
+                })
+            items = obj.findItems(data, initpath=ekey)
+            total_size = int(data.attrib.get("totalSize") or 0)
+            section_id = data.attrib.get("librarySectionID")
+            del data
+            for item in items:
+                if section_id:
+                    item.librarySectionID = int(section_id)
+                yield item
+            start += len(items)
+            if len(items) < page_size or (total_size and start >= total_size):
+                break
+            del item, items
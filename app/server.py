@@ -49,7 +49,7 @@ class Server(Model):
     updater = db.Column(db.Boolean)
     version = db.Column(db.String)
     voiceSearch = db.Column(db.Boolean)
-
+    _hidden_fields = ("token",)
 
     @classmethod
     def create(cls, obj=None, **kwargs):
@@ -60,4 +60,4 @@ class Server(Model):
                 "timeout": obj._timeout
             })
             Library.create(obj.library)
-        return super().create(obj=obj, **kwargs)
\ No newline at end of file
+        return super().create(obj, **kwargs)
\ No newline at end of file
@@ -0,0 +1,118 @@
+# sync.py
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+
+from flask import current_app, has_app_context
+from sqlalchemy.engine import make_url
+
+from .config import app, sync_workers
+from .section import Section
+
+SECTION_TYPES = ("movie",)
+
+
+@dataclass
+class SectionSyncResult:
+    server: str
+    key: int
+    title: str
+    status: str = "pending"
+    counts: dict = field(default_factory=dict)
+    error: str = None
+    seconds: float = 0.0
+
+    @property
+    def ok(self):
+        return self.status == "done"
+
+
+def sections_of(*libraries, types=SECTION_TYPES):
+    """The plexapi sections of ``types`` in each plexapi Library."""
+    return [
+        section
+        for library in libraries for section in library.sections()
+        if section.type in types
+    ]
+
+
+class SectionSyncer:
+    """Sync many plexapi sections, from one or more servers, on a thread pool.
+
+    Every worker pushes its own context of the calling app and so gets its
+    own DB session and connection. ``results`` holds one SectionSyncResult
+    per section, updated as they run; a failing section is logged and
+    reported there while the others carry on. An in-memory SQLite database
+    is one shared connection, so it is synced one section after another.
+    """
+
+    def __init__(self, workers=None, progress=None):
+        self.workers = workers or sync_workers
+        self.progress = progress
+        self.results = []
+        self._logger = logging.getLogger(self.__class__.__name__)
+
+    def _pool_size(self, flask_app, count):
+        url = make_url(flask_app.config["SQLALCHEMY_DATABASE_URI"])
+        if url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:"):
+            return 1
+        return max(1, min(self.workers, count))
+
+    def sync(self, sections, incremental=True, record=False, page_size=None):
+        """Sync ``sections`` and return one SectionSyncResult per section.
+
+        ``incremental`` is passed on to Section.sync; ``record`` also
+        upserts a Section row per section, by its uuid, after a full sync.
+        ``progress``, if given, is called with each result as its section
+        finishes.
+        """
+        flask_app = current_app._get_current_object() if has_app_context() else app
+        sections = list(sections)
+        self.results = [
+            SectionSyncResult(
+                getattr(getattr(section, "_server", None), "machineIdentifier", None),
+                getattr(section, "key", None), getattr(section, "title", None))
+            for section in sections
+        ]
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self._pool_size(flask_app, len(sections))) as executor:
+            futures = [
+                executor.submit(
+                    self._sync, flask_app, section, result, incremental, record, page_size)
+                for section, result in zip(sections, self.results)
+            ]
+            for done, future in enumerate(as_completed(futures), 1):
+                result = future.result()
+                self._logger.info(
+                    f"Section {result.key} ({result.title}) {result.status} in "
+                    f"{result.seconds:.1f}s [{done}/{len(futures)}]")
+                if self.progress is not None:
+                    self.progress(result)
+        failed = sum(1 for result in self.results if not result.ok)
+        self._logger.info(
+            f"Synced {len(self.results) - failed}/{len(self.results)} sections in "
+            f"{time.perf_counter() - start:.1f}s ({failed} failed).")
+        return self.results
+
+    def _sync(self, flask_app, section, result, incremental, record, page_size):
+        result.status = "running"
+        start = time.perf_counter()
+        try:
+            with flask_app.app_context():
+                result.counts = Section.sync(section, incremental and not record, page_size)
+                if record:
+                    Section.upsert(section, _key="uuid")
+            result.status = "done"
+        except Exception as e:
+            result.status = "failed"
+            result.error = f"{type(e).__name__}: {e}"
+            self._logger.warning(f"Failed to sync section {result.key} ({result.title}): {e}")
+        result.seconds = time.perf_counter() - start
+        return result
+
+
+def sync_libraries(*libraries, workers=None, incremental=True, progress=None):
+    """Sync every movie section of the plexapi Libraries on one worker pool."""
+    return SectionSyncer(workers, progress).sync(
+        sections_of(*libraries), incremental=incremental)
@@ -0,0 +1,58 @@
+# sync_state.py
+from datetime import datetime
+
+from .config import db
+from .model import Model
+
+
+class SyncState(Model):
+    server = db.Column(db.String)
+    section_key = db.Column(db.Integer)
+    last_updated_at = db.Column(db.DateTime)
+    last_added_at = db.Column(db.DateTime)
+    last_synced_at = db.Column(db.DateTime)
+    __table_args__ = (
+        db.UniqueConstraint(
+            "server", "section_key", name="uq_syncstate_server_section"),
+    )
+
+    @classmethod
+    def for_section(cls, obj):
+        server = obj._server.machineIdentifier
+        state = cls.get(server=server, section_key=obj.key, _first=True)
+        if state is None:
+            state = cls.create(server=server, section_key=obj.key)
+        return state
+
+    def params(self):
+        """Plex filter params selecting items changed since the watermark."""
+        if self.last_updated_at is None:
+            return {}
+        # Plex compares whole seconds; re-reading the boundary second is
+        # harmless because the upsert is idempotent.
+        return {"updatedAt>>": int(self.last_updated_at.timestamp()) - 1}
+
+    @staticmethod
+    def track(items, watermarks):
+        """Pass items through, recording the newest updatedAt/addedAt seen."""
+        for item in items:
+            values = item if isinstance(item, dict) else item.__dict__
+            for field in ("updatedAt", "addedAt"):
+                value = values.get(field)
+                if value and (watermarks.get(field) is None or value > watermarks[field]):
+                    watermarks[field] = value
+            yield item
+
+    def advance(self, watermarks):
+        updated_at = watermarks.get("updatedAt")
+        added_at = watermarks.get("addedAt")
+        if updated_at and (self.last_updated_at is None or updated_at > self.last_updated_at):
+            self.last_updated_at = updated_at
+        if added_at and (self.last_added_at is None or added_at > self.last_added_at):
+            self.last_added_at = added_at
+        self.last_synced_at = datetime.now()
+        self._commit()
+        self._logger.info(
+            f"Advanced {self.server} section {self.section_key} to "
+            f"updatedAt={self.last_updated_at}, addedAt={self.last_added_at}.")
+        return self
@@ -0,0 +1,192 @@
+# typeahead.py
+import re
+import threading
+import unicodedata
+from bisect import bisect_left, insort
+
+from sqlalchemy import DDL, event, func, inspect, or_
+from sqlalchemy.orm import Session
+
+ARTICLES = ("the", "a", "an")
+_NON_ALNUM = re.compile(r"[\W_]+")
+
+
+def fold(text):
+    """Case and accent fold ``text``, reducing punctuation to single spaces."""
+    if not text:
+        return ""
+    if not text.isascii():
+        text = unicodedata.normalize("NFKD", text)
+        text = "".join(char for char in text if not unicodedata.combining(char))
+    return _NON_ALNUM.sub(" ", text.casefold()).strip()
+
+
+def strip_article(folded):
+    head, _, rest = folded.partition(" ")
+    return rest if head in ARTICLES and rest else folded
+
+
+def title_keys(*titles):
+    """Folded keys a record is found under, with and without its article."""
+    keys = set()
+    for title in titles:
+        folded = fold(title)
+        if folded:
+            keys.add(folded)
+            keys.add(strip_article(folded))
+    return keys
+
+
+class PrefixIndex:
+    """In-process sorted (key, id) list answering prefix queries by bisection.
+
+    Writes are recorded per session and only marked stale once committed;
+    stale ids are reloaded by the next reader through ``refresh``.
+    """
+
+    def __init__(self):
+        self.built = False
+        self._entries = []
+        self._keys = {}
+        self._stale = set()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._keys)
+
+    def clear(self):
+        with self._lock:
+            self.built = False
+            self._entries = []
+            self._keys = {}
+            self._stale = set()
+
+    def build(self, rows):
+        """Replace the index with ``rows`` of (id, *titles)."""
+        entries = []
+        keys_by_id = {}
+        for id_, *titles in rows:
+            keys = title_keys(*titles)
+            keys_by_id[id_] = keys
+            entries.extend((key, id_) for key in keys)
+        entries.sort()
+        with self._lock:
+            self._entries = entries
+            self._keys = keys_by_id
+            self.built = True
+
+    def _remove(self, id_):
+        for key in self._keys.pop(id_, ()):
+            i = bisect_left(self._entries, (key, id_))
+            if i < len(self._entries) and self._entries[i] == (key, id_):
+                del self._entries[i]
+
+    def refresh(self, rows, ids):
+        """Re-index ``ids`` from ``rows`` of (id, *titles); absent ids are dropped."""
+        with self._lock:
+            for id_ in ids:
+                self._remove(id_)
+            for id_, *titles in rows:
+                keys = title_keys(*titles)
+                self._keys[id_] = keys
+                for key in keys:
+                    insort(self._entries, (key, id_))
+
+    def mark_stale(self, ids):
+        with self._lock:
+            self._stale.update(ids)
+
+    def take_stale(self):
+        with self._lock:
+            stale, self._stale = self._stale, set()
+        return stale
+
+    def search(self, prefix, limit=10):
+        """Ids of up to ``limit`` records with a key starting with ``prefix``."""
+        prefix = strip_article(fold(prefix))
+        if not prefix:
+            return []
+        ids = []
+        with self._lock:
+            entries = self._entries
+            i = bisect_left(entries, (prefix,))
+            while i < len(entries) and len(ids) < limit:
+                key, id_ = entries[i]
+                if not key.startswith(prefix):
+                    break
+                if id_ not in ids:
+                    ids.append(id_)
+                i += 1
+        return ids
+
+    def track(self, session, ids):
+        """Mark ``ids`` stale once ``session`` commits."""
+        session.info.setdefault("typeahead", {}).setdefault(self, set()).update(ids)
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_typeahead(session):
+    for index, ids in session.info.pop("typeahead", {}).items():
+        index.mark_stale(ids)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_typeahead(session):
+    session.info.pop("typeahead", None)
+
+
+def _postgresql_ddl(name, fields):
+    # typeahead_fold mirrors fold(): unaccent, lowercase, punctuation to spaces.
+    columns = ", ".join(f'typeahead_fold("{field}") gin_trgm_ops' for field in fields)
+    return [
+        "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+        "CREATE EXTENSION IF NOT EXISTS unaccent",
+        "CREATE OR REPLACE FUNCTION typeahead_fold(text) RETURNS text AS "
+        "$$ SELECT btrim(regexp_replace(lower(public.unaccent("
+        "'public.unaccent'::regdictionary, $1)), '[^[:alnum:]]+', ' ', 'g')) $$ "
+        "LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT",
+        f"CREATE INDEX ix_{name}_typeahead ON {name} USING GIN ({columns})",
+    ]
+
+
+def register_typeahead(model, fields):
+    """Index ``fields`` of ``model`` for prefix search and return the PrefixIndex.
+
+    Postgres serves lookups from a pg_trgm GIN index over the folded
+    fields; other databases from the returned in-process index, which
+    follows ORM writes and ``_bulk_upserted`` through ``track``.
+    """
+    model_table = model.__table__
+    index = PrefixIndex()
+    model_table.info.setdefault("shadow_objects", set()).add(
+        f"ix_{model_table.name}_typeahead")
+    for statement in _postgresql_ddl(model_table.name, fields):
+        event.listen(model_table, "after_create",
+                     DDL(statement).execute_if(dialect="postgresql"))
+    for name in ("after_create", "after_drop"):
+        event.listen(model_table, name, lambda *args, **kwargs: index.clear())
+
+    def written(mapper, connection, target):
+        index.track(inspect(target).session, [target.id])
+
+    def updated(mapper, connection, target):
+        state = inspect(target)
+        if any(state.attrs[field].history.has_changes() for field in fields):
+            index.track(state.session, [target.id])
+
+    event.listen(model, "after_insert", written)
+    event.listen(model, "after_delete", written)
+    event.listen(model, "after_update", updated)
+    return index
+
+
+def typeahead_query(model, prefix, fields):
+    """ORM query of ``model`` records whose folded ``fields`` start with ``prefix``."""
+    prefix = strip_article(fold(prefix))
+    if not prefix:
+        return None
+    return (model.query
+            .filter(or_(*(
+                func.typeahead_fold(getattr(model, field)).like(f"{prefix}%")
+                for field in fields)))
+            .order_by(func.typeahead_fold(getattr(model, fields[0])), model.id))
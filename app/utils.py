@@ -1,25 +1,80 @@
 import os
 import mimetypes
+import tempfile
 import requests
 from PIL import Image
-import io
-from .config import static, baseurl, token
+from .config import static, baseurl, token, max_image_bytes, image_spool_bytes
+from .metrics import count_bytes, timed
 
 def build_url(key):
     return f"{baseurl}{key}?X-Plex-Token={token}"
 
 def download_image(url, path, max_width=None, max_height=None):
-    response = requests.get(url)
-    if response.status_code == 200:
-        create_dir(path)    
-        save(response, path, max_width=250)
+    response, buffer = fetch(url)
+    if buffer is not None:
+        with buffer:
+            save(response, buffer, path, max_width=250)
     else:
         print(f"Failed to download image, status code: {response.status_code}")
 
+@timed("fetch", model="Image")
+def fetch(url, session=None, headers=None, max_bytes=None, named=False):
+    """Stream an image response into a spooled temp file.
+
+    The content type and declared length are checked before the body is
+    read, and reading stops once ``max_bytes`` is exceeded. With ``named``
+    the body goes straight to a named temp file instead, so another
+    process can open it by path. Returns the response and the rewound
+    buffer, or None for the buffer when the status is not 200.
+    """
+    max_bytes = max_bytes or max_image_bytes
+    response = (session or requests).get(url, headers=headers, stream=True)
+    if response.status_code != 200:
+        response.close()
+        return response, None
+    try:
+        content_type = response.headers.get('Content-Type', '')
+        if not content_type.startswith('image/'):
+            raise ValueError(f"Unexpected content type: {content_type!r}")
+        content_length = response.headers.get('Content-Length')
+        if content_length and int(content_length) > max_bytes:
+            raise ValueError(f"Image of {content_length} bytes exceeds {max_bytes} bytes")
+        buffer = (tempfile.NamedTemporaryFile() if named
+                  else tempfile.SpooledTemporaryFile(max_size=image_spool_bytes))
+        try:
+            size = 0
+            for chunk in response.iter_content(chunk_size=64 * 1024):
+                size += len(chunk)
+                if size > max_bytes:
+                    raise ValueError(f"Image exceeds {max_bytes} bytes")
+                buffer.write(chunk)
+        except BaseException:
+            buffer.close()
+            raise
+    finally:
+        response.close()
+    count_bytes("image", size)
+    buffer.seek(0)
+    return response, buffer
+
 def create_dir(path):
     dir_path = os.path.dirname(path)
     os.makedirs(dir_path, exist_ok=True)
 
+def atomic_save(img, path, format=None, **params):
+    """Save ``img`` via a temp file and rename, so readers never see a partial file."""
+    create_dir(path)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            img.save(f, format=format or Image.registered_extensions().get(
+                os.path.splitext(path)[1].lower()), **params)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
 def get_extension(response):
     content_type = response.headers.get('Content-Type')
     if not content_type:
@@ -31,25 +86,29 @@ def get_extension(response):
         return 
     return extension
 
-def resize(img, max_width=None, max_height=None):
-    original_width, original_height = img.size
+def target_size(size, max_width=None, max_height=None):
+    original_width, original_height = size
     if max_width and max_height:
-        return img.resize((max_width, max_height))
+        return max_width, max_height
     elif max_width:
-        new_height = int((max_width / original_width) * original_height)
-        return img.resize((max_width, new_height))
+        return max_width, int((max_width / original_width) * original_height)
     elif max_height:
-        new_width = int((max_height / original_height) * original_width)
-        return img.resize((new_width, max_height))
+        return int((max_height / original_height) * original_width), max_height
+    return size
+
+def resize(img, max_width=None, max_height=None):
+    if max_width or max_height:
+        return img.resize(target_size(img.size, max_width, max_height))
     return img
     
-def save(response, path, max_width=None, max_height=None):
+def save(response, buffer, path, max_width=None, max_height=None):
     extension = get_extension(response)
     if extension:
-        img = Image.open(io.BytesIO(response.content))
+        img = Image.open(buffer)
         img = resize(img, max_width, max_height)
         file_path = static + path + extension
-        img.save(file_path)
+        atomic_save(img, file_path)
         print(f"Image saved to {file_path}")
+        return
     print("Could not save image")
     return 
\ No newline at end of file
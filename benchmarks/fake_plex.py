@@ -0,0 +1,385 @@
+# fake_plex.py
+"""Local stand-in for a Plex Media Server, serving a seeded movie section.
+
+    python -m benchmarks.fake_plex --movies 10000 --port 32400 --latency 0.02
+
+Serves what the sync code and plexapi read: ``/`` (server identity),
+``/library``, ``/library/sections``, ``/library/sections/{id}/all`` (paged
+with X-Plex-Container-Start/Size as headers or params, filtered by
+``updatedAt>>``/``guid`` and with ``includeMeta``), ``/library/metadata/{ids}``
+and the thumb/art JPEGs (with ETag/Last-Modified and 304 revalidation).
+``POST /:/touch?count=N`` bumps the updatedAt of N movies, so scripts can
+drive incremental syncs against a server running in another process.
+Every movie comes from ``synthetic.movie``, seeded by its ratingKey, so
+two servers started with the same arguments serve byte-identical data.
+With ``sections`` > 1 the movies are dealt round-robin into that many
+movie sections.
+Tokens are accepted but not checked.
+
+``latency`` (plus up to ``jitter``) seconds is slept before every response
+and ``error_rate`` of the section, metadata and image requests fail with a
+503, drawn from an RNG seeded by ``seed``.
+"""
+import argparse
+import random
+import sys
+import threading
+import time
+from datetime import datetime
+from email.utils import formatdate, parsedate_to_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+from xml.sax.saxutils import quoteattr
+
+from .synthetic import jpeg, movie
+
+# (kind, width, height) of the artwork pool; items share a few images.
+ARTWORK = (("thumb", 300, 450), ("art", 1280, 720))
+ARTWORK_VARIANTS = 4
+# synthetic attributes rendered as Video attributes, and tag lists as children.
+ATTRIBUTES = (
+    "ratingKey", "key", "guid", "slug", "studio", "type", "title", "titleSort",
+    "librarySectionTitle", "librarySectionID", "librarySectionKey", "contentRating",
+    "summary", "rating", "audienceRating", "viewCount", "lastViewedAt", "year",
+    "tagline", "thumb", "art", "duration", "originallyAvailableAt", "addedAt",
+    "updatedAt", "audienceRatingImage", "chapterSource", "primaryExtraKey",
+    "ratingImage",
+)
+TAGS = (
+    ("Genre", "genres"), ("Country", "countries"), ("Director", "directors"),
+    ("Writer", "writers"), ("Role", "roles"),
+)
+
+
+def _attribute(value):
+    if isinstance(value, datetime):
+        if value.hour == value.minute == value.second == 0:
+            return value.strftime("%Y-%m-%d")
+        return str(int(value.timestamp()))
+    return str(value)
+
+
+def render_movie(obj):
+    """The ``<Video>`` element of a synthetic movie, as plexapi parses it."""
+    attributes = " ".join(
+        f"{name}={quoteattr(_attribute(getattr(obj, name)))}"
+        for name in ATTRIBUTES if getattr(obj, name) is not None
+    )
+    children = [
+        f'<Media id="{tag.tag}" duration="{obj.duration}" videoResolution="1080" '
+        f'container="mkv" videoCodec="h264" audioCodec="aac"/>'
+        for tag in obj.media
+    ]
+    children.extend(
+        f"<{element} tag={quoteattr(tag.tag)}/>"
+        for element, field in TAGS for tag in getattr(obj, field)
+    )
+    children.extend(f"<Guid id={quoteattr(guid.id)}/>" for guid in obj.guids)
+    return f"<Video {attributes}>{''.join(children)}</Video>"
+
+
+class Catalog:
+    """The seeded movies of the fake section, pre-rendered as XML.
+
+    Holds one rendered ``<Video>`` per movie (a couple of KB each) and the
+    artwork pool. ``touch`` moves movies' updatedAt forward, as a metadata
+    refresh on a real server would, for incremental sync runs.
+    """
+
+    def __init__(self, count, seed=0, sections=1):
+        self.seed = seed
+        self.sections = sections
+        self.machine_identifier = f"{random.Random(seed).getrandbits(160):040x}"
+        self.created_at = int(datetime(2020, 1, 1).timestamp())
+        self._lock = threading.Lock()
+        self.keys = list(range(1, count + 1))
+        self.updated = {}
+        self.guids = {}
+        self.videos = {}
+        for key in self.keys:
+            self._render(self._movie(key))
+        self.artwork = {
+            kind: [jpeg(width, height, seed=seed * ARTWORK_VARIANTS + i, quality=80)
+                   for i in range(ARTWORK_VARIANTS)]
+            for kind, width, height in ARTWORK
+        }
+
+    def section_of(self, key):
+        return (key - 1) % self.sections + 1
+
+    @staticmethod
+    def section_title(section):
+        return "Movies" if section == 1 else f"Movies {section}"
+
+    def _movie(self, key):
+        obj = movie(key, random.Random(f"{self.seed}:{key}"))
+        section = self.section_of(key)
+        obj.librarySectionID = section
+        obj.librarySectionKey = f"/library/sections/{section}"
+        obj.librarySectionTitle = self.section_title(section)
+        return obj
+
+    def _render(self, obj):
+        self.updated[obj.ratingKey] = int(obj.updatedAt.timestamp())
+        self.guids[obj.guid] = obj.ratingKey
+        self.videos[obj.ratingKey] = render_movie(obj).encode()
+
+    def touch(self, count, at=None):
+        """Bump updatedAt (and artwork URLs) of ``count`` movies; returns their keys."""
+        at = at or datetime.now().replace(microsecond=0)
+        rng = random.Random(f"{self.seed}:touch:{at.timestamp()}")
+        keys = sorted(rng.sample(self.keys, min(count, len(self.keys))))
+        with self._lock:
+            for key in keys:
+                obj = self._movie(key)
+                obj.updatedAt = at
+                obj.thumb = f"{obj.key}/thumb/{int(at.timestamp())}"
+                obj.art = f"{obj.key}/art/{int(at.timestamp())}"
+                self._render(obj)
+        return keys
+
+    def select(self, section, since=None, guid=None):
+        if guid is not None:
+            key = self.guids.get(guid)
+            return [key] if key is not None and self.section_of(key) == section else []
+        return [
+            key for key in self.keys[section - 1::self.sections]
+            if since is None or self.updated[key] >= since
+        ]
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "PlexMediaServer/1.40.0.0000-fake"
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        self.params = dict(parse_qsl(url.query, keep_blank_values=True))
+        parts = [part for part in url.path.split("/") if part]
+        self.server.delay()
+        try:
+            if not parts:
+                return self.identity()
+            if parts[0] != "library":
+                return self.send_xml(None, status=404)
+            if self.server.fail():
+                return self.send_xml(None, status=503)
+            if parts == ["library"]:
+                return self.library()
+            if parts == ["library", "sections"]:
+                return self.sections()
+            if parts[:2] == ["library", "sections"] and len(parts) == 4:
+                section = int(parts[2]) if parts[2].isdigit() else 0
+                if not 1 <= section <= self.server.catalog.sections:
+                    return self.send_xml(None, status=404)
+                if parts[3] == "all":
+                    return self.section_all(section)
+                if parts[3] == "collections":
+                    return self.send_xml(self.container(b"", section, size=0))
+            if parts[:2] == ["library", "metadata"]:
+                if len(parts) == 3:
+                    return self.metadata(parts[2])
+                if len(parts) >= 4 and parts[3] in self.server.catalog.artwork:
+                    return self.artwork(parts[2], parts[3])
+            return self.send_xml(None, status=404)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        params = dict(parse_qsl(url.query))
+        if url.path != "/:/touch":
+            return self.send_xml(None, status=404)
+        keys = self.server.catalog.touch(int(params.get("count", 1)))
+        self.send_xml(f'<MediaContainer size="{len(keys)}"/>'.encode())
+
+    def identity(self):
+        catalog = self.server.catalog
+        self.send_xml(
+            f'<MediaContainer size="1" friendlyName="fake-plex" '
+            f'machineIdentifier="{catalog.machine_identifier}" version="1.40.0.0000" '
+            f'platform="Linux" platformVersion="fake" myPlex="0" '
+            f'transcoderActiveVideoSessions="0" updatedAt="{catalog.created_at}">'
+            f'<Directory count="1" key="library" title="library"/></MediaContainer>'.encode())
+
+    def library(self):
+        self.send_xml(
+            b'<MediaContainer size="1" allowSync="0" identifier="com.plexapp.plugins.library" '
+            b'mediaTagPrefix="/system/bundle/media/flags/" mediaTagVersion="1" '
+            b'title1="Plex Library"><Directory key="sections" title="Library Sections"/>'
+            b'</MediaContainer>')
+
+    def sections(self):
+        catalog = self.server.catalog
+        directories = "".join(
+            f'<Directory allowSync="1" art="/:/resources/movie-fanart.jpg" '
+            f'composite="/library/sections/{section}/composite/{catalog.created_at}" '
+            f'filters="1" refreshing="0" thumb="/:/resources/movie.png" key="{section}" '
+            f'type="movie" title="{catalog.section_title(section)}" '
+            f'agent="tv.plex.agents.movie" scanner="Plex Movie" language="en-US" '
+            f'uuid="{catalog.machine_identifier[:8]}-0000-0000-0000-{section:012d}" '
+            f'updatedAt="{catalog.created_at}" createdAt="{catalog.created_at}" '
+            f'scannedAt="{catalog.created_at}" content="1" directory="1" hidden="0">'
+            f'<Location id="{section}" path="/data/movies/{section}"/></Directory>'
+            for section in range(1, catalog.sections + 1)
+        )
+        self.send_xml(
+            f'<MediaContainer size="{catalog.sections}" allowSync="0" title1="Plex Library">'
+            f'{directories}</MediaContainer>'.encode())
+
+    def _paging(self):
+        def value(name, default):
+            raw = self.headers.get(name) or self.params.get(name)
+            return int(raw) if raw not in (None, "") else default
+        return value("X-Plex-Container-Start", 0), value("X-Plex-Container-Size", None)
+
+    def section_all(self, section):
+        catalog = self.server.catalog
+        since = self.params.get("updatedAt>>") or self.params.get("updatedAt>")
+        keys = catalog.select(
+            section,
+            since=int(since) + 1 if since is not None else None,
+            guid=self.params.get("guid"))
+        start, size = self._paging()
+        page = keys[start:] if size is None else keys[start:start + size]
+        meta = (
+            f'<Meta><Type key="/library/sections/{section}/all?type=1" type="movie" '
+            f'title="Movies" active="1"/></Meta>'.encode()
+            if self.params.get("includeMeta") == "1" else b""
+        )
+        body = b"".join(catalog.videos[key] for key in page)
+        self.send_xml(self.container(body, section, size=len(page), total_size=len(keys),
+                                     offset=start, meta=meta))
+
+    def metadata(self, ids):
+        catalog = self.server.catalog
+        keys = [int(key) for key in ids.split(",") if key.isdigit()]
+        found = [key for key in keys if key in catalog.videos]
+        if not found:
+            return self.send_xml(None, status=404)
+        self.send_xml(self.container(
+            b"".join(catalog.videos[key] for key in found), catalog.section_of(found[0]),
+            size=len(found)))
+
+    def container(self, body, section, size, total_size=None, offset=0, meta=b""):
+        total = f' totalSize="{total_size}" offset="{offset}"' if total_size is not None else ""
+        return (
+            f'<MediaContainer size="{size}"{total} allowSync="1" librarySectionID="{section}" '
+            f'librarySectionTitle="{self.server.catalog.section_title(section)}" '
+            f'identifier="com.plexapp.plugins.library" mediaTagPrefix="/system/bundle/media/flags/">'
+        ).encode() + meta + body + b"</MediaContainer>"
+
+    def artwork(self, rating_key, kind):
+        catalog = self.server.catalog
+        if not rating_key.isdigit() or int(rating_key) not in catalog.updated:
+            return self.send_xml(None, status=404)
+        key = int(rating_key)
+        updated = catalog.updated[key]
+        etag = f'"{key}-{kind}-{updated}"'
+        last_modified = formatdate(updated, usegmt=True)
+        since = self.headers.get("If-Modified-Since")
+        if self.headers.get("If-None-Match") == etag or (
+                since and "If-None-Match" not in self.headers
+                and parsedate_to_datetime(since).timestamp() >= updated):
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        pool = catalog.artwork[kind]
+        body = pool[key % len(pool)]
+        self.send_response(200)
+        self.send_header("Content-Type", "image/jpeg")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.send_header("Last-Modified", last_modified)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_xml(self, body, status=200):
+        body = body or b""
+        self.send_response(status)
+        self.send_header("Content-Type", "text/xml;charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class FakePlex(ThreadingHTTPServer):
+    """Threaded HTTP server for a Catalog; ``url`` is its base URL."""
+
+    daemon_threads = True
+
+    def __init__(self, catalog, host="127.0.0.1", port=0, latency=0.0, jitter=0.0,
+                 error_rate=0.0, seed=0, verbose=False):
+        super().__init__((host, port), Handler)
+        self.catalog = catalog
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.verbose = verbose
+        self.requests = 0
+        self.errors = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def delay(self):
+        with self._lock:
+            self.requests += 1
+            seconds = self.latency + (self._rng.uniform(0, self.jitter) if self.jitter else 0)
+        if seconds:
+            time.sleep(seconds)
+
+    def fail(self):
+        if not self.error_rate:
+            return False
+        with self._lock:
+            failed = self._rng.random() < self.error_rate
+            self.errors += failed
+        return failed
+
+    def start(self):
+        """Serve from a daemon thread; returns the server."""
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--movies", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--sections", type=int, default=1)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=32400)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds per response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="extra random seconds, at most")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("-v", "--verbose", action="store_true")
+    args = parser.parse_args(argv)
+
+    server = FakePlex(Catalog(args.movies, args.seed, args.sections), args.host, args.port,
+                      args.latency, args.jitter, args.error_rate, args.seed, args.verbose)
+    # The first line is the base URL, for scripts starting the server on port 0.
+    print(server.url, flush=True)
+    print(f"Serving {args.movies} movies in {args.sections} sections (seed {args.seed}) "
+          f"on {server.url}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,303 @@
+# run.py
+"""Offline benchmarks for the model and sync hot paths.
+
+    python -m benchmarks.run                                # 1k/10k, memory + file SQLite
+    python -m benchmarks.run --scales 1000 10000 100000 -o after.json
+    python -m benchmarks.run --compare before.json after.json
+
+Every backend runs in its own interpreter, since the database URL is read
+when app.config is imported. Per-row ORM paths (create, upsert, get) run
+on ``--sample`` records of each scale; flattening and bulk upserts run on
+all of them. The typeahead case searches a ``PrefixIndex`` of 100k titles
+once per keystroke and reports p50/p99 latency; the run exits non-zero if
+its p99 is over the 10 ms target. Results are written as JSON; ``--compare`` reports the
+benchmarks whose throughput dropped by more than ``--threshold`` and exits
+non-zero if there are any.
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from .synthetic import jpeg, movies, title
+
+BACKENDS = ("memory", "file")
+DEFAULT_SCALES = (1000, 10000)
+TYPEAHEAD_SCALE = 100_000
+TYPEAHEAD_P99_MS = 10
+
+
+def _timed(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+class Suite:
+    def __init__(self, backend, repeat=3):
+        self.backend = backend
+        self.repeat = repeat
+        self.results = []
+
+    def measure(self, name, scale, ops, fn, repeat=None):
+        """Time ``fn`` (doing ``ops`` operations), keeping the best of ``repeat`` runs."""
+        seconds = min(_timed(fn) for _ in range(repeat or self.repeat))
+        self.results.append({
+            "name": name,
+            "backend": self.backend,
+            "scale": scale,
+            "ops": ops,
+            "seconds": round(seconds, 6),
+            "ops_per_sec": round(ops / seconds, 2) if seconds else None,
+        })
+        print(f"{self.backend:>6} {scale:>7} {name:<22} {ops / seconds:>12.1f} ops/s",
+              file=sys.stderr)
+
+    def latency(self, name, scale, calls, target_ms=None):
+        """Time each of ``calls`` separately, recording throughput and p50/p99 in ms.
+
+        A ``target_ms`` is kept with the result; a run whose p99 exceeds it fails.
+        """
+        durations = sorted(_timed(call) for call in calls)
+        seconds = sum(durations)
+
+        def percentile(p):
+            return round(durations[min(len(durations) - 1, int(len(durations) * p))] * 1000, 4)
+
+        self.results.append({
+            "name": name,
+            "backend": self.backend,
+            "scale": scale,
+            "ops": len(durations),
+            "seconds": round(seconds, 6),
+            "ops_per_sec": round(len(durations) / seconds, 2) if seconds else None,
+            "p50_ms": percentile(0.50),
+            "p99_ms": percentile(0.99),
+            "p99_target_ms": target_ms,
+        })
+        print(f"{self.backend:>6} {scale:>7} {name:<22} p50 {percentile(0.50):>8.3f} ms"
+              f"  p99 {percentile(0.99):>8.3f} ms", file=sys.stderr)
+
+
+def _model_benchmarks(suite, scale, sample):
+    from app.config import db
+    from app.movie import Movie
+
+    db.drop_all()
+    db.create_all()
+    catalog = movies(scale)
+    rng = random.Random(scale)
+
+    suite.measure("flatten", scale, scale, lambda: [
+        Movie._flatten_args_kwargs(obj) for obj in catalog])
+    suite.measure("bulk_upsert_insert", scale, scale, lambda: Movie.bulk_upsert(
+        catalog, key="ratingKey"), repeat=1)
+    suite.measure("bulk_upsert_noop", scale, scale, lambda: Movie.bulk_upsert(
+        catalog, key="ratingKey"))
+
+    # Model.create does not write relationships; Movie.upsert syncs guids.
+    created = [
+        {k: v for k, v in vars(obj).items() if k != "guids"}
+        for obj in movies(sample, seed=1, start=10_000_000)
+    ]
+    suite.measure("create", scale, sample, lambda: [
+        Movie.create(values) for values in created], repeat=1)
+    upserted = movies(sample, seed=2, start=20_000_000)
+    suite.measure("upsert_insert", scale, sample, lambda: [
+        Movie.upsert(obj) for obj in upserted], repeat=1)
+    suite.measure("upsert_noop", scale, sample, lambda: [
+        Movie.upsert(obj) for obj in upserted])
+
+    keys = [obj.ratingKey for obj in rng.sample(catalog, min(sample, scale))]
+
+    def get_cold():
+        Movie._entity_cache.clear()
+        db.session.expunge_all()
+        for key in keys:
+            Movie.get({"ratingKey": key}, _first=True)
+
+    suite.measure("get", scale, len(keys), get_cold)
+    suite.measure("get_cached", scale, len(keys), lambda: [
+        Movie.get({"ratingKey": key}, _first=True) for key in keys])
+    years = [rng.randint(1930, 2024) for _ in range(100)]
+    suite.measure("get_filter", scale, len(years), lambda: [
+        Movie.get(year=year).all() for year in years])
+    suite.measure("search", scale, len(years), lambda: [
+        Movie.search([("year", ">=", year), ("contentRating", "=", "PG")]).page(limit=50)
+        for year in years])
+    suite.measure("search_like", scale, 20, lambda: [
+        Movie.search([("title", "like", "%Night%")]).page(limit=50) for _ in range(20)])
+
+
+def _image_benchmarks(suite, count=20):
+    from app.image import render
+
+    source = jpeg()
+    with tempfile.TemporaryDirectory() as directory:
+        base = os.path.join(directory, "poster")
+        for name, renditions in (
+            ("image_thumb_jpeg", [{"max_width": 250}]),
+            ("image_art_jpeg", [{"max_height": 1080}]),
+            ("image_thumb_webp", [{"max_width": 250, "format": "webp", "quality": 80}]),
+        ):
+            suite.measure(name, 0, count, lambda: [
+                render(source, base, ".jpg", renditions) for _ in range(count)])
+
+
+def _typeahead_benchmarks(suite, scale=TYPEAHEAD_SCALE, queries=2000):
+    from app.typeahead import PrefixIndex
+
+    rng = random.Random(scale)
+    rows = []
+    for i in range(1, scale + 1):
+        name = title(rng)
+        rows.append((i, name[4:] if name.startswith("The ") else name, name, None))
+    index = PrefixIndex()
+    suite.measure("typeahead_build", scale, scale, lambda: index.build(rows), repeat=1)
+
+    # Every keystroke of a title someone is typing, article included.
+    typed = []
+    while len(typed) < queries:
+        name = rng.choice(rows)[2]
+        typed.extend(name[:n] for n in range(1, min(len(name), 12) + 1))
+    typed = typed[:queries]
+    suite.latency("typeahead_search", scale, [
+        lambda prefix=prefix: index.search(prefix) for prefix in typed],
+        target_ms=TYPEAHEAD_P99_MS)
+
+
+def worker(backend, scales, sample, repeat, images):
+    """Run the benchmarks against ``backend`` in this process, returning results."""
+    logging.disable(logging.INFO)
+    from app.config import app
+
+    suite = Suite(backend, repeat)
+    with app.app_context():
+        for scale in scales:
+            _model_benchmarks(suite, scale, min(sample, scale))
+    if images:
+        image_suite = Suite("none", repeat)
+        _image_benchmarks(image_suite)
+        _typeahead_benchmarks(image_suite)
+        suite.results.extend(image_suite.results)
+    return suite.results
+
+
+def _run_backend(backend, args, images, directory):
+    url = ("sqlite:///:memory:" if backend == "memory"
+           else f"sqlite:///{os.path.join(directory, 'benchmark.db')}")
+    command = [
+        sys.executable, "-m", "benchmarks.run", "--worker", backend,
+        "--scales", *map(str, args.scales), "--sample", str(args.sample),
+        "--repeat", str(args.repeat),
+    ]
+    if images:
+        command.append("--images")
+    completed = subprocess.run(
+        command, env={**os.environ, "DATABASE_URL": url},
+        stdout=subprocess.PIPE, check=True, text=True)
+    return json.loads(completed.stdout)
+
+
+def _meta():
+    def git(*command):
+        try:
+            return subprocess.run(["git", *command], capture_output=True, text=True,
+                                  check=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    import sqlalchemy
+    return {
+        "commit": git("rev-parse", "HEAD"),
+        "dirty": bool(git("status", "--porcelain", "--untracked-files=no")),
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "sqlalchemy": sqlalchemy.__version__,
+        "platform": platform.platform(),
+    }
+
+
+def compare(before, after, threshold=0.1):
+    """Return (name, backend, scale, before, after, change) rows and the regressions."""
+    index = {(r["name"], r["backend"], r["scale"]): r for r in before["results"]}
+    rows = []
+    for result in after["results"]:
+        previous = index.get((result["name"], result["backend"], result["scale"]))
+        if not previous or not previous["ops_per_sec"] or not result["ops_per_sec"]:
+            continue
+        change = result["ops_per_sec"] / previous["ops_per_sec"] - 1
+        rows.append((result["name"], result["backend"], result["scale"],
+                     previous["ops_per_sec"], result["ops_per_sec"], change))
+    return rows, [row for row in rows if row[-1] < -threshold]
+
+
+def missed_targets(results):
+    """Results whose p99 latency is above their ``p99_target_ms``."""
+    return [r for r in results
+            if r.get("p99_target_ms") and r["p99_ms"] > r["p99_target_ms"]]
+
+
+def _print_comparison(rows, regressions):
+    for name, backend, scale, before, after, change in rows:
+        flag = "  REGRESSION" if (name, backend, scale, before, after, change) in regressions else ""
+        print(f"{backend:>6} {scale:>7} {name:<22} {before:>12.1f} -> {after:>12.1f} "
+              f"{change:+7.1%}{flag}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scales", type=int, nargs="+", default=list(DEFAULT_SCALES))
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS, default=list(BACKENDS))
+    parser.add_argument("--sample", type=int, default=1000,
+                        help="records used by the per-row create/upsert/get benchmarks")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("-o", "--output", default="benchmark.json")
+    parser.add_argument("--compare", nargs="+", metavar="RESULTS",
+                        help="BEFORE [AFTER]; without AFTER, run and compare to BEFORE")
+    parser.add_argument("--threshold", type=float, default=0.1)
+    parser.add_argument("--worker", choices=BACKENDS, help=argparse.SUPPRESS)
+    parser.add_argument("--images", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        json.dump(worker(args.worker, args.scales, args.sample, args.repeat, args.images),
+                  sys.stdout)
+        return 0
+
+    if args.compare and len(args.compare) == 2:
+        with open(args.compare[0]) as before, open(args.compare[1]) as after:
+            rows, regressions = compare(json.load(before), json.load(after), args.threshold)
+        _print_comparison(rows, regressions)
+        return 1 if regressions else 0
+
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for i, backend in enumerate(args.backends):
+            results.extend(_run_backend(backend, args, images=i == 0, directory=directory))
+    report = {"meta": _meta(), "results": results}
+    with open(args.output, "w") as output:
+        json.dump(report, output, indent=2)
+    print(f"Wrote {len(results)} results to {args.output}", file=sys.stderr)
+    missed = missed_targets(results)
+    for result in missed:
+        print(f"{result['name']}: p99 {result['p99_ms']} ms is over the "
+              f"{result['p99_target_ms']} ms target", file=sys.stderr)
+
+    if args.compare:
+        with open(args.compare[0]) as before:
+            rows, regressions = compare(json.load(before), report, args.threshold)
+        _print_comparison(rows, regressions)
+        return 1 if regressions or missed else 0
+    return 1 if missed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
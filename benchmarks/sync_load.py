@@ -0,0 +1,266 @@
+# sync_load.py
+"""End-to-end sync load test against a local fake Plex server.
+
+    python -m benchmarks.sync_load                         # 10k movies, in-memory SQLite
+    python -m benchmarks.sync_load --movies 100000 --latency 0.01 -o sync.json
+    python -m benchmarks.sync_load --database sqlite:////tmp/plex.db --images 500
+
+Starts ``benchmarks.fake_plex`` in a child process (so its catalog and
+request handling stay out of this process's CPU and memory figures),
+connects with ``PlexServer`` and runs the real code paths through it:
+``Section.create`` (full sync), an unchanged incremental sync, an
+incremental sync after ``--touch`` movies changed, an unchanged full
+re-sync, ``getGuid`` + ``Movie.upsert`` for ``--sample`` movies and, with
+``--images``, ``Movie.download_all_images`` for that many movies: a cold
+download (fetch, rendering in the process pool, manifest record), a second
+pass skipped by the ImageManifest and a ``revalidate`` pass answered with
+304s. Renditions go to a temporary directory; IMAGE_RENDITIONS and
+IMAGE_PROCESSES apply as in the app.
+
+Each phase reports rows/sec and the process's max RSS after it; with
+``--memory`` also the tracemalloc peak of Python allocations during the
+phase (tracing slows every allocation, so compare throughput between runs
+made the same way). Results use the ``benchmarks.run`` format, so
+``python -m benchmarks.run --compare before.json after.json`` works on them.
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+from urllib.request import Request, urlopen
+
+from .run import _meta
+
+TOKEN = "fake-token"
+
+
+class FakePlexProcess:
+    """``benchmarks.fake_plex`` running in a child process on a free port."""
+
+    def __init__(self, movies, seed=0, latency=0.0, jitter=0.0, error_rate=0.0):
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "benchmarks.fake_plex", "--port", "0",
+             "--movies", str(movies), "--seed", str(seed), "--latency", str(latency),
+             "--jitter", str(jitter), "--error-rate", str(error_rate)],
+            stdout=subprocess.PIPE, text=True)
+        self.url = self.process.stdout.readline().strip()
+        if not self.url:
+            self.close()
+            raise RuntimeError("fake Plex server did not start")
+
+    def touch(self, count):
+        with urlopen(Request(f"{self.url}/:/touch?count={count}", method="POST")) as response:
+            response.read()
+
+    def close(self):
+        self.process.terminate()
+        self.process.wait()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class Phases:
+    def __init__(self, backend, scale, trace=False):
+        self.backend = backend
+        self.scale = scale
+        self.trace = trace
+        self.results = []
+
+    def measure(self, name, fn, ops=None):
+        """Run ``fn`` once; it returns its operation count unless ``ops`` is given."""
+        if self.trace:
+            tracemalloc.reset_peak()
+        start = time.perf_counter()
+        error = None
+        try:
+            done = fn()
+        except Exception as e:
+            done, error = 0, f"{type(e).__name__}: {e}"
+        seconds = time.perf_counter() - start
+        ops = ops if ops is not None else done
+        peak = tracemalloc.get_traced_memory()[1] if self.trace else None
+        result = {
+            "name": name,
+            "backend": self.backend,
+            "scale": self.scale,
+            "ops": ops,
+            "seconds": round(seconds, 6),
+            "ops_per_sec": round(ops / seconds, 2) if seconds and not error else None,
+            "peak_bytes": peak,
+            "max_rss_kib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        }
+        if error:
+            result["error"] = error
+        self.results.append(result)
+        rate = f"{ops / seconds:>12.1f} ops/s" if result["ops_per_sec"] else f"{'failed':>18}"
+        memory = (f"{peak / 2**20:>8.1f} MiB peak" if self.trace
+                  else f"{result['max_rss_kib'] / 2**10:>8.1f} MiB rss")
+        print(f"{self.backend:>6} {self.scale:>7} {name:<22} {rate} {memory}"
+              f"{'  ' + error if error else ''}", file=sys.stderr)
+        return done
+
+
+def _written(counts):
+    return sum(counts.values()) if isinstance(counts, dict) else counts
+
+
+@contextmanager
+def _static(directory):
+    """Write rendered artwork under ``directory`` instead of config.static."""
+    import app.image
+
+    static, app.image.static = app.image.static, directory
+    try:
+        yield
+    finally:
+        app.image.static = static
+
+
+def _download_images(movies, workers, revalidate=False, expect_skipped=False):
+    """``Movie.download_all_images`` for ``movies``; returns the results."""
+    from app.movie import Movie
+
+    results = Movie.download_all_images(movies, workers=workers, revalidate=revalidate)
+    failed = [result for result in results if not result.ok]
+    if failed:
+        raise RuntimeError(f"{len(failed)} of {len(results)} images failed: {failed[0].error}")
+    if expect_skipped and not all(result.skipped for result in results):
+        changed = sum(1 for result in results if not result.skipped)
+        raise RuntimeError(f"{changed} of {len(results)} images were downloaded again")
+    return results
+
+
+def load(plex, args, backend):
+    """Run every phase against ``plex``; returns the results."""
+    from app.config import app, db
+    from app.movie import Movie
+    from app.section import Section
+
+    phases = Phases(backend, args.movies, trace=args.memory)
+    rng = random.Random(args.seed)
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        section = plex.library.section("Movies")
+
+        def full_sync():
+            Section.create(section)
+            return Movie.query.count()
+
+        phases.measure("sync_full", full_sync)
+        phases.measure("sync_noop", lambda: _written(Section.sync(section)), ops=args.movies)
+
+        def changed():
+            args.server.touch(args.touch)
+            return _written(Section.sync(section))
+
+        phases.measure("sync_incremental", changed)
+        phases.measure("sync_full_unchanged",
+                       lambda: _written(Section.sync(section, incremental=False)),
+                       ops=args.movies)
+
+        rows = Movie.query.with_entities(Movie.guid).all()
+        guids = [guid for guid, in rng.sample(rows, min(args.sample, len(rows)))]
+
+        def by_guid():
+            for guid in guids:
+                Movie.upsert(section.getGuid(guid))
+            return len(guids)
+
+        phases.measure("get_guid_upsert", by_guid)
+
+        if args.images:
+            movies = Movie.query.order_by(Movie.id).limit(args.images).all()
+            written = {}
+
+            def cold():
+                results = _download_images(movies, args.workers)
+                written["bytes"] = sum(output["size"] for result in results
+                                       for output in result.outputs)
+                return len(results)
+
+            with tempfile.TemporaryDirectory() as directory, _static(directory):
+                phases.measure("image_download", cold)
+                if written.get("bytes"):
+                    phases.results.append({
+                        **phases.results[-1], "name": "image_download_bytes",
+                        "ops": written["bytes"],
+                        "ops_per_sec": round(
+                            written["bytes"] / phases.results[-1]["seconds"], 2),
+                    })
+                phases.measure("image_skip", lambda: len(_download_images(
+                    movies, args.workers, expect_skipped=True)))
+                phases.measure("image_revalidate", lambda: len(_download_images(
+                    movies, args.workers, revalidate=True, expect_skipped=True)))
+    return phases.results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--movies", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--database", default="sqlite:///:memory:",
+                        help="DATABASE_URL to sync into; it is dropped and recreated")
+    parser.add_argument("--page-size", type=int, help="SYNC_PAGE_SIZE")
+    parser.add_argument("--touch", type=int, help="movies changed before the incremental "
+                                                  "sync (default 1%%)")
+    parser.add_argument("--sample", type=int, default=200,
+                        help="movies re-fetched through getGuid + Movie.upsert")
+    parser.add_argument("--images", type=int, default=0,
+                        help="movies whose thumb and art are downloaded")
+    parser.add_argument("--workers", type=int, default=8, help="image download threads")
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--memory", action="store_true",
+                        help="trace Python allocations per phase with tracemalloc")
+    parser.add_argument("-o", "--output", default="sync_load.json")
+    args = parser.parse_args(argv)
+    args.touch = args.touch if args.touch is not None else max(1, args.movies // 100)
+
+    logging.disable(logging.INFO)
+    with FakePlexProcess(args.movies, args.seed, args.latency, args.jitter,
+                         args.error_rate) as server:
+        # app.config reads these at import time.
+        os.environ.update(DATABASE_URL=args.database, BASEURL=server.url, TOKEN=TOKEN)
+        if args.page_size:
+            os.environ["SYNC_PAGE_SIZE"] = str(args.page_size)
+        from plexapi.server import PlexServer
+
+        args.server = server
+        backend = "memory" if args.database.endswith(":memory:") else args.database.split(":")[0]
+        if args.memory:
+            tracemalloc.start()
+        results = load(PlexServer(server.url, TOKEN), args, backend)
+        tracemalloc.stop()
+
+    report = {
+        "meta": {
+            **_meta(),
+            "movies": args.movies,
+            "latency": args.latency,
+            "error_rate": args.error_rate,
+            "memory_traced": args.memory,
+        },
+        "results": results,
+    }
+    with open(args.output, "w") as output:
+        json.dump(report, output, indent=2)
+    print(f"Wrote {len(results)} results to {args.output}", file=sys.stderr)
+    return 1 if any("error" in result for result in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
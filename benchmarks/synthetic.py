@@ -0,0 +1,162 @@
+# synthetic.py
+"""Seeded plexapi-shaped movie objects for the benchmarks.
+
+Objects carry the attribute set of ``example/movie.py``, including the
+private plexapi attributes, tag lists and guids, so flattening sees what
+a real sync does.
+"""
+import io
+import random
+from datetime import datetime, timedelta
+
+from PIL import Image as PILImage
+
+WORDS = (
+    "night day city dark last lost return secret king queen war love dead "
+    "house river star blood road home game black white iron red moon storm "
+    "island summer winter ghost dragon heist hunter shadow train empire"
+).split()
+STUDIOS = (
+    "Universal Pictures", "Warner Bros.", "Paramount Pictures", "20th Century Fox",
+    "Columbia Pictures", "Walt Disney Pictures", "Lionsgate", "New Line Cinema",
+    "Amblin Entertainment", "A24", "Touchstone Pictures", "Miramax",
+)
+CONTENT_RATINGS = ("G", "PG", "PG-13", "R", "NR")
+GENRES = ("Comedy", "Thriller", "Drama", "Action", "Horror", "Romance", "Sci-Fi")
+EPOCH = datetime(2020, 1, 1)
+
+
+class Tag:
+    """Stands in for plexapi media tags (Genre, Role, Director, ...)."""
+
+    def __init__(self, kind, tag):
+        self._kind = kind
+        self.tag = tag
+
+    def __repr__(self):
+        return f"<{self._kind}:{self.tag.replace(' ', '-')}>"
+
+
+class Guid:
+    def __init__(self, id):
+        self.id = id
+
+    def __repr__(self):
+        return f"<Guid:{self.id}>"
+
+
+class PlexMovie:
+    """Plain attribute bag shaped like ``plexapi.video.Movie``."""
+
+    def __repr__(self):
+        return f"<Movie:{self.ratingKey}:{self.slug}>"
+
+
+def title(rng):
+    words = rng.sample(WORDS, rng.randint(1, 4))
+    text = " ".join(words).title()
+    return f"The {text}" if rng.random() < 0.2 else text
+
+
+def movie(rating_key, rng=None):
+    """Build one synthetic movie with ratingKey ``rating_key``."""
+    rng = rng or random.Random(rating_key)
+    name = title(rng)
+    sort_title = name[4:] if name.startswith("The ") else name
+    added = EPOCH + timedelta(minutes=rating_key)
+    updated = added + timedelta(days=rng.randint(0, 400))
+    released = datetime(rng.randint(1930, 2024), rng.randint(1, 12), rng.randint(1, 28))
+    viewed = updated + timedelta(hours=rng.randint(1, 1000)) if rng.random() < 0.3 else None
+    obj = PlexMovie()
+    obj.__dict__.update({
+        "_server": "<PlexServer:http://127.0.0.1:32400>",
+        "_data": object(),
+        "_initpath": "/library/sections/1/all?includeGuids=1&type=1",
+        "_parent": None,
+        "_details_key": f"/library/metadata/{rating_key}?includeChapters=1&includeMarkers=1",
+        "_overwriteNone": True,
+        "_autoReload": False,
+        "_edits": None,
+        "addedAt": added,
+        "art": f"/library/metadata/{rating_key}/art/{int(updated.timestamp())}",
+        "artBlurHash": None,
+        "fields": [],
+        "guid": f"plex://movie/{rng.getrandbits(96):024x}",
+        "key": f"/library/metadata/{rating_key}",
+        "lastRatedAt": None,
+        "lastViewedAt": viewed,
+        "librarySectionID": 1,
+        "librarySectionKey": "/library/sections/1",
+        "librarySectionTitle": "Movies",
+        "listType": "video",
+        "ratingKey": rating_key,
+        "summary": " ".join(rng.choice(WORDS) for _ in range(rng.randint(20, 80))).capitalize() + ".",
+        "thumb": f"/library/metadata/{rating_key}/thumb/{int(updated.timestamp())}",
+        "thumbBlurHash": None,
+        "title": name,
+        "titleSort": sort_title,
+        "type": "movie",
+        "updatedAt": updated,
+        "userRating": None,
+        "viewCount": rng.choice((0, 0, 0, 1, 2, 5)),
+        "playlistItemID": None,
+        "playQueueItemID": None,
+        "audienceRating": round(rng.uniform(2, 9.8), 1),
+        "audienceRatingImage": "rottentomatoes://image.rating.upright",
+        "chapters": [],
+        "chapterSource": "media",
+        "collections": [],
+        "contentRating": rng.choice(CONTENT_RATINGS),
+        "countries": [Tag("Country", "United States of America")],
+        "directors": [Tag("Director", title(rng))],
+        "duration": rng.randint(70, 200) * 60000,
+        "editionTitle": None,
+        "enableCreditsMarkerGeneration": -1,
+        "genres": [Tag("Genre", genre) for genre in rng.sample(GENRES, 2)],
+        "guids": [
+            Guid(f"imdb://tt{rating_key:07d}"),
+            Guid(f"tmdb://{rating_key + 1000}"),
+            Guid(f"tvdb://{rating_key + 5000}"),
+        ],
+        "labels": [],
+        "languageOverride": None,
+        "markers": [],
+        "media": [Tag("Media", str(rating_key * 3))],
+        "originallyAvailableAt": released,
+        "originalTitle": None,
+        "primaryExtraKey": f"/library/metadata/{rating_key + 1}",
+        "producers": [],
+        "rating": round(rng.uniform(1, 10), 1),
+        "ratingImage": "rottentomatoes://image.rating.ripe",
+        "ratings": [],
+        "roles": [Tag("Role", title(rng)) for _ in range(3)],
+        "slug": sort_title.lower().replace(" ", "-"),
+        "similar": [],
+        "sourceURI": None,
+        "studio": rng.choice(STUDIOS),
+        "tagline": " ".join(rng.sample(WORDS, 6)).capitalize() + ".",
+        "theme": None,
+        "ultraBlurColors": None,
+        "useOriginalTitle": -1,
+        "viewOffset": 0,
+        "writers": [Tag("Writer", title(rng))],
+        "year": released.year,
+    })
+    return obj
+
+
+def movies(count, seed=0, start=1):
+    """``count`` synthetic movies with consecutive ratingKeys from ``start``."""
+    rng = random.Random(seed)
+    return [movie(start + i, rng) for i in range(count)]
+
+
+def jpeg(width=1000, height=1500, seed=0, quality=90):
+    """A noisy gradient JPEG, roughly as hard to compress as a poster."""
+    rng = random.Random(seed)
+    image = PILImage.linear_gradient("L").resize((width, height)).convert("RGB")
+    noise = PILImage.frombytes("RGB", (width // 4, height // 4), rng.randbytes(width * height * 3 // 16))
+    image = PILImage.blend(image, noise.resize((width, height)), 0.35)
+    buffer = io.BytesIO()
+    image.save(buffer, "JPEG", quality=quality)
+    return buffer.getvalue()
@@ -1,5 +1,9 @@
+import os
+
 import pytest
 
+os.environ.setdefault("DATABASE_URL", "sqlite:///:memory:")
+
 from app.config import app, db
 
 
@@ -4,6 +4,9 @@ from logging.config import fileConfig
 from flask import current_app
 
 from alembic import context
+from alembic.autogenerate import renderers, rewriter
+from alembic.autogenerate.render import _add_index, _drop_index
+from alembic.operations import ops
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
@@ -45,12 +48,60 @@ target_db = current_app.extensions['migrate'].db
 # ... etc.
 
 
+# Index DDL on Postgres is generated with CONCURRENTLY so it does not lock
+# writes; that cannot run in a transaction, hence the autocommit block.
+writer = rewriter.Rewriter()
+
+
+@writer.rewrites(ops.ModifyTableOps)
+def hoist_index_ops(context, revision, op):
+    # Batch operations run when their block exits, so index ops are moved
+    # out of it to run inside their own autocommit block.
+    if context.dialect.name != 'postgresql':
+        return op
+    index_ops = [
+        index_op for index_op in op.ops
+        if isinstance(index_op, (ops.CreateIndexOp, ops.DropIndexOp))
+    ]
+    for index_op in index_ops:
+        index_op.kw['postgresql_concurrently'] = True
+    op.ops = [table_op for table_op in op.ops if table_op not in index_ops]
+    return [op, *index_ops]
+
+
+def render_in_autocommit_block(text, op):
+    if not op.kw.get('postgresql_concurrently'):
+        return text
+    return ['with op.get_context().autocommit_block():', text, '']
+
+
+@renderers.dispatch_for(ops.CreateIndexOp, replace=True)
+def render_create_index(autogen_context, op):
+    return render_in_autocommit_block(_add_index(autogen_context, op), op)
+
+
+@renderers.dispatch_for(ops.DropIndexOp, replace=True)
+def render_drop_index(autogen_context, op):
+    return render_in_autocommit_block(_drop_index(autogen_context, op), op)
+
+
 def get_metadata():
     if hasattr(target_db, 'metadatas'):
         return target_db.metadatas[None]
     return target_db.metadata
 
 
+def include_object(object, name, type_, reflected, compare_to):
+    # Full-text search objects are created by DDL events on their table
+    # (see app/fulltext.py), so autogenerate must not try to drop them.
+    if reflected and compare_to is None:
+        return not any(
+            name in table.info.get('shadow_objects', ())
+            for table in get_metadata().tables.values()
+        )
+    return True
+
+
 def run_migrations_offline():
     """Run migrations in 'offline' mode.
 
@@ -65,7 +116,8 @@ def run_migrations_offline():
     """
     url = config.get_main_option("sqlalchemy.url")
     context.configure(
-        url=url, target_metadata=get_metadata(), literal_binds=True
+        url=url, target_metadata=get_metadata(), literal_binds=True,
+        include_object=include_object
     )
 
     with context.begin_transaction():
@@ -92,7 +144,9 @@ def run_migrations_online():
 
     conf_args = current_app.extensions['migrate'].configure_args
     if conf_args.get("process_revision_directives") is None:
-        conf_args["process_revision_directives"] = process_revision_directives
+        conf_args["process_revision_directives"] = writer.chain(
+            process_revision_directives)
+    conf_args.setdefault("include_object", include_object)
 
     connectable = get_engine()
 
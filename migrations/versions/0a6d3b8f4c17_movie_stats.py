@@ -0,0 +1,77 @@
+"""moviestat rollup buckets
+
+Revision ID: 0a6d3b8f4c17
+Revises: f2c7a8e1b593
+Create Date: 2026-10-18 19:03:51.117402
+
+"""
+import json
+from datetime import datetime
+from uuid import uuid4
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0a6d3b8f4c17'
+down_revision = 'f2c7a8e1b593'
+branch_labels = None
+depends_on = None
+
+DIMENSIONS = ('year', 'studio', 'contentRating', 'librarySectionID')
+MEASURES = ('duration', 'viewCount', 'audienceRating')
+
+
+def upgrade():
+    moviestat = op.create_table('moviestat',
+    sa.Column('bucket', sa.String(), nullable=True),
+    sa.Column('dimension', sa.String(), nullable=True),
+    sa.Column('value', sa.String(), nullable=True),
+    sa.Column('count', sa.Integer(), nullable=True),
+    sa.Column('duration_sum', sa.BigInteger(), nullable=True),
+    sa.Column('duration_count', sa.Integer(), nullable=True),
+    sa.Column('viewCount_sum', sa.BigInteger(), nullable=True),
+    sa.Column('viewCount_count', sa.Integer(), nullable=True),
+    sa.Column('audienceRating_sum', sa.Float(), nullable=True),
+    sa.Column('audienceRating_count', sa.Integer(), nullable=True),
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('uuid', sa.String(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('bucket', name='uq_moviestat_bucket')
+    )
+    with op.batch_alter_table('moviestat', schema=None) as batch_op:
+        batch_op.create_index('ix_moviestat_dimension', ['dimension'], unique=False)
+        batch_op.create_index('ix_moviestat_uuid', ['uuid'], unique=False)
+
+    # Seed the buckets from the existing catalog; later writes apply deltas.
+    movie = sa.table('movie', *(sa.column(name) for name in DIMENSIONS + MEASURES))
+    aggregates = [sa.func.count()] + [
+        aggregate(movie.c[measure])
+        for measure in MEASURES for aggregate in (sa.func.sum, sa.func.count)
+    ]
+    counters = ['count'] + [f'{measure}_{part}' for measure in MEASURES for part in ('sum', 'count')]
+    now = datetime.now()
+    rows = []
+    bind = op.get_bind()
+    for dimension in DIMENSIONS:
+        column = movie.c[dimension]
+        for value, *totals in bind.execute(sa.select(column, *aggregates).group_by(column)):
+            value = json.dumps(value, default=str)
+            rows.append({
+                'bucket': f'{dimension}={value}', 'dimension': dimension, 'value': value,
+                'uuid': str(uuid4()), 'created_at': now, 'updated_at': now,
+                **dict(zip(counters, (total or 0 for total in totals))),
+            })
+    if rows:
+        op.bulk_insert(moviestat, rows)
+
+
+def downgrade():
+    with op.batch_alter_table('moviestat', schema=None) as batch_op:
+        batch_op.drop_index('ix_moviestat_uuid')
+        batch_op.drop_index('ix_moviestat_dimension')
+
+    op.drop_table('moviestat')
@@ -0,0 +1,38 @@
+"""image manifest for conditional artwork downloads
+
+Revision ID: 2b7f4e8a91c6
+Revises: 9c2e5d17b3a0
+Create Date: 2026-10-18 11:20:36.104752
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2b7f4e8a91c6'
+down_revision = '9c2e5d17b3a0'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('imagemanifest',
+    sa.Column('rendition_key', sa.String(), nullable=True),
+    sa.Column('source_key', sa.String(), nullable=True),
+    sa.Column('settings', sa.String(), nullable=True),
+    sa.Column('etag', sa.String(), nullable=True),
+    sa.Column('last_modified', sa.String(), nullable=True),
+    sa.Column('path', sa.String(), nullable=True),
+    sa.Column('size', sa.Integer(), nullable=True),
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('uuid', sa.String(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('rendition_key', name='uq_imagemanifest_rendition_key')
+    )
+
+
+def downgrade():
+    op.drop_table('imagemanifest')
@@ -0,0 +1,26 @@
+"""unique constraint on movie.ratingKey for bulk upserts
+
+Revision ID: 4afca27902e7
+Revises: 
+Create Date: 2026-10-18 09:12:44.318204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4afca27902e7'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('movie', schema=None) as batch_op:
+        batch_op.create_unique_constraint('uq_movie_ratingKey', ['ratingKey'])
+
+
+def downgrade():
+    with op.batch_alter_table('movie', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_movie_ratingKey', type_='unique')
@@ -0,0 +1,40 @@
+"""unique constraint on guid (guid, media_type, media_id)
+
+Revision ID: 5d0a3c9e7f21
+Revises: 2b7f4e8a91c6
+Create Date: 2026-10-18 13:05:52.771390
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5d0a3c9e7f21'
+down_revision = '2b7f4e8a91c6'
+branch_labels = None
+depends_on = None
+
+MEDIA_CHECK = (
+    "(media_type = 'movie' AND media_id IS NOT NULL) OR "
+    "(media_type = 'episode' AND media_id IS NOT NULL)"
+)
+
+
+def guid_table_args():
+    # SQLite batch mode recreates guid and only carries named CHECK
+    # constraints over, so the media check is passed in until it has a name.
+    checks = sa.inspect(op.get_bind()).get_check_constraints('guid')
+    if any(check['name'] == 'ck_guid_media' for check in checks):
+        return ()
+    return (sa.CheckConstraint(MEDIA_CHECK, name='ck_guid_media'),)
+
+
+def upgrade():
+    with op.batch_alter_table('guid', schema=None, table_args=guid_table_args()) as batch_op:
+        batch_op.create_unique_constraint('uq_guid_guid_media', ['guid', 'media_type', 'media_id'])
+
+
+def downgrade():
+    with op.batch_alter_table('guid', schema=None, table_args=guid_table_args()) as batch_op:
+        batch_op.drop_constraint('uq_guid_guid_media', type_='unique')
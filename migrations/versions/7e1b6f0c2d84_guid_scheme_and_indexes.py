@@ -0,0 +1,47 @@
+"""guid scheme column and media index
+
+Revision ID: 7e1b6f0c2d84
+Revises: 5d0a3c9e7f21
+Create Date: 2026-10-18 13:48:09.215530
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7e1b6f0c2d84'
+down_revision = '5d0a3c9e7f21'
+branch_labels = None
+depends_on = None
+
+MEDIA_CHECK = (
+    "(media_type = 'movie' AND media_id IS NOT NULL) OR "
+    "(media_type = 'episode' AND media_id IS NOT NULL)"
+)
+
+
+def guid_table_args():
+    # SQLite batch mode recreates guid and only carries named CHECK
+    # constraints over, so the media check is passed in until it has a name.
+    checks = sa.inspect(op.get_bind()).get_check_constraints('guid')
+    if any(check['name'] == 'ck_guid_media' for check in checks):
+        return ()
+    return (sa.CheckConstraint(MEDIA_CHECK, name='ck_guid_media'),)
+
+
+def upgrade():
+    with op.batch_alter_table('guid', schema=None, table_args=guid_table_args()) as batch_op:
+        batch_op.add_column(sa.Column('scheme', sa.String(), nullable=True))
+        batch_op.create_index('ix_guid_media', ['media_type', 'media_id'], unique=False)
+
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute("UPDATE guid SET scheme = split_part(guid, '://', 1) WHERE guid LIKE '%://%'")
+    else:
+        op.execute("UPDATE guid SET scheme = substr(guid, 1, instr(guid, '://') - 1) WHERE guid LIKE '%://%'")
+
+
+def downgrade():
+    with op.batch_alter_table('guid', schema=None, table_args=guid_table_args()) as batch_op:
+        batch_op.drop_index('ix_guid_media')
+        batch_op.drop_column('scheme')
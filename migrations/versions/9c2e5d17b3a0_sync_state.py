@@ -0,0 +1,41 @@
+"""per section sync watermarks and movie.updatedAt
+
+Revision ID: 9c2e5d17b3a0
+Revises: 4afca27902e7
+Create Date: 2026-10-18 10:02:17.540931
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9c2e5d17b3a0'
+down_revision = '4afca27902e7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('syncstate',
+    sa.Column('server', sa.String(), nullable=True),
+    sa.Column('section_key', sa.Integer(), nullable=True),
+    sa.Column('last_updated_at', sa.DateTime(), nullable=True),
+    sa.Column('last_added_at', sa.DateTime(), nullable=True),
+    sa.Column('last_synced_at', sa.DateTime(), nullable=True),
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('uuid', sa.String(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('server', 'section_key', name='uq_syncstate_server_section')
+    )
+    with op.batch_alter_table('movie', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('updatedAt', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('movie', schema=None) as batch_op:
+        batch_op.drop_column('updatedAt')
+
+    op.drop_table('syncstate')
@@ -0,0 +1,26 @@
+"""movie.fingerprint for skipping unchanged rows on sync
+
+Revision ID: a3f9c1d7b256
+Revises: 7e1b6f0c2d84
+Create Date: 2026-10-18 14:41:09.218733
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3f9c1d7b256'
+down_revision = '7e1b6f0c2d84'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('movie', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('fingerprint', sa.String(length=40), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('movie', schema=None) as batch_op:
+        batch_op.drop_column('fingerprint')
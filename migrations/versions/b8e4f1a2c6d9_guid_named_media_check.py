@@ -0,0 +1,44 @@
+"""name the guid media check constraint
+
+Revision ID: b8e4f1a2c6d9
+Revises: 0a6d3b8f4c17
+Create Date: 2026-10-18 20:14:37.508261
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b8e4f1a2c6d9'
+down_revision = '0a6d3b8f4c17'
+branch_labels = None
+depends_on = None
+
+MEDIA_CHECK = (
+    "(media_type = 'movie' AND media_id IS NOT NULL) OR "
+    "(media_type = 'episode' AND media_id IS NOT NULL)"
+)
+
+
+def upgrade():
+    # Earlier batch migrations recreated guid on SQLite without its unnamed
+    # check; on Postgres it kept the generated name guid_check.
+    bind = op.get_bind()
+    checks = {check['name'] for check in sa.inspect(bind).get_check_constraints('guid')}
+    if 'ck_guid_media' in checks:
+        return
+    if bind.dialect.name == 'postgresql':
+        if 'guid_check' in checks:
+            op.execute('ALTER TABLE guid RENAME CONSTRAINT guid_check TO ck_guid_media')
+        else:
+            op.create_check_constraint('ck_guid_media', 'guid', MEDIA_CHECK)
+    else:
+        with op.batch_alter_table('guid', schema=None, recreate='always', table_args=(
+                sa.CheckConstraint(MEDIA_CHECK, name='ck_guid_media'),)):
+            pass
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute('ALTER TABLE guid RENAME CONSTRAINT ck_guid_media TO guid_check')
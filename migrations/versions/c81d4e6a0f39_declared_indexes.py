@@ -0,0 +1,55 @@
+"""declared indexes for hot lookup paths
+
+Revision ID: c81d4e6a0f39
+Revises: a3f9c1d7b256
+Create Date: 2026-10-18 16:52:30.471902
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c81d4e6a0f39'
+down_revision = 'a3f9c1d7b256'
+branch_labels = None
+depends_on = None
+
+# Only rows a user has watched are looked up by lastViewedAt.
+PARTIAL = {
+    'postgresql_where': sa.text('"lastViewedAt" IS NOT NULL'),
+    'sqlite_where': sa.text('"lastViewedAt" IS NOT NULL'),
+}
+
+
+def upgrade():
+    # CONCURRENTLY cannot run inside a transaction on Postgres.
+    with op.get_context().autocommit_block():
+        op.create_index('ix_guid_uuid', 'guid', ['uuid'], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_imagemanifest_uuid', 'imagemanifest', ['uuid'], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_library_uuid', 'library', ['uuid'], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_movie_guid', 'movie', ['guid'], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_movie_lastViewedAt', 'movie', ['lastViewedAt'], unique=False, postgresql_concurrently=True, **PARTIAL)
+        op.create_index('ix_movie_librarySectionID_titleSort', 'movie', ['librarySectionID', 'titleSort'], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_movie_titleSort', 'movie', ['titleSort'], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_movie_uuid', 'movie', ['uuid'], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_movie_year', 'movie', ['year'], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_section_uuid', 'section', ['uuid'], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_server_uuid', 'server', ['uuid'], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_syncstate_uuid', 'syncstate', ['uuid'], unique=False, postgresql_concurrently=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_syncstate_uuid', table_name='syncstate', postgresql_concurrently=True)
+        op.drop_index('ix_server_uuid', table_name='server', postgresql_concurrently=True)
+        op.drop_index('ix_section_uuid', table_name='section', postgresql_concurrently=True)
+        op.drop_index('ix_movie_year', table_name='movie', postgresql_concurrently=True)
+        op.drop_index('ix_movie_uuid', table_name='movie', postgresql_concurrently=True)
+        op.drop_index('ix_movie_titleSort', table_name='movie', postgresql_concurrently=True)
+        op.drop_index('ix_movie_librarySectionID_titleSort', table_name='movie', postgresql_concurrently=True)
+        op.drop_index('ix_movie_lastViewedAt', table_name='movie', postgresql_concurrently=True)
+        op.drop_index('ix_movie_guid', table_name='movie', postgresql_concurrently=True)
+        op.drop_index('ix_library_uuid', table_name='library', postgresql_concurrently=True)
+        op.drop_index('ix_imagemanifest_uuid', table_name='imagemanifest', postgresql_concurrently=True)
+        op.drop_index('ix_guid_uuid', table_name='guid', postgresql_concurrently=True)
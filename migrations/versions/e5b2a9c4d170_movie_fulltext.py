@@ -0,0 +1,65 @@
+"""full-text search over movie title, originalTitle, tagline and summary
+
+Revision ID: e5b2a9c4d170
+Revises: c81d4e6a0f39
+Create Date: 2026-10-18 17:26:44.903517
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5b2a9c4d170'
+down_revision = 'c81d4e6a0f39'
+branch_labels = None
+depends_on = None
+
+FIELDS = (('title', 'A'), ('originalTitle', 'A'), ('tagline', 'B'), ('summary', 'C'))
+COLUMNS = ', '.join(f'"{field}"' for field, _ in FIELDS)
+NEW = ', '.join(f'new."{field}"' for field, _ in FIELDS)
+OLD = ', '.join(f'old."{field}"' for field, _ in FIELDS)
+
+
+def upgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        vector = ' || '.join(
+            f"setweight(to_tsvector('english'::regconfig, coalesce(\"{field}\", '')), '{weight}')"
+            for field, weight in FIELDS
+        )
+        op.execute(
+            f'ALTER TABLE movie ADD COLUMN search_vector tsvector '
+            f'GENERATED ALWAYS AS ({vector}) STORED')
+        with op.get_context().autocommit_block():
+            op.execute(
+                'CREATE INDEX CONCURRENTLY ix_movie_search_vector '
+                'ON movie USING GIN (search_vector)')
+        return
+    op.execute(
+        f"CREATE VIRTUAL TABLE movie_fts USING fts5({COLUMNS}, "
+        f"content='movie', content_rowid='id', "
+        f"tokenize='porter unicode61 remove_diacritics 2')")
+    op.execute(
+        f'CREATE TRIGGER movie_fts_ai AFTER INSERT ON movie BEGIN '
+        f'INSERT INTO movie_fts(rowid, {COLUMNS}) VALUES (new.id, {NEW}); END')
+    op.execute(
+        f'CREATE TRIGGER movie_fts_ad AFTER DELETE ON movie BEGIN '
+        f"INSERT INTO movie_fts(movie_fts, rowid, {COLUMNS}) "
+        f"VALUES ('delete', old.id, {OLD}); END")
+    op.execute(
+        f'CREATE TRIGGER movie_fts_au AFTER UPDATE OF {COLUMNS} ON movie BEGIN '
+        f"INSERT INTO movie_fts(movie_fts, rowid, {COLUMNS}) "
+        f"VALUES ('delete', old.id, {OLD}); "
+        f'INSERT INTO movie_fts(rowid, {COLUMNS}) VALUES (new.id, {NEW}); END')
+    op.execute("INSERT INTO movie_fts(movie_fts) VALUES ('rebuild')")
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        with op.get_context().autocommit_block():
+            op.execute('DROP INDEX CONCURRENTLY IF EXISTS ix_movie_search_vector')
+        op.execute('ALTER TABLE movie DROP COLUMN search_vector')
+        return
+    for trigger in ('movie_fts_ai', 'movie_fts_ad', 'movie_fts_au'):
+        op.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+    op.execute('DROP TABLE IF EXISTS movie_fts')
@@ -0,0 +1,43 @@
+"""pg_trgm typeahead index over folded movie titles
+
+Revision ID: f2c7a8e1b593
+Revises: e5b2a9c4d170
+Create Date: 2026-10-18 18:12:05.638214
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2c7a8e1b593'
+down_revision = 'e5b2a9c4d170'
+branch_labels = None
+depends_on = None
+
+FIELDS = ('titleSort', 'title', 'originalTitle')
+
+
+def upgrade():
+    # Other databases use the in-process prefix index in app/typeahead.py.
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    op.execute('CREATE EXTENSION IF NOT EXISTS unaccent')
+    op.execute(
+        "CREATE OR REPLACE FUNCTION typeahead_fold(text) RETURNS text AS "
+        "$$ SELECT btrim(regexp_replace(lower(public.unaccent("
+        "'public.unaccent'::regdictionary, $1)), '[^[:alnum:]]+', ' ', 'g')) $$ "
+        "LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT")
+    columns = ', '.join(f'typeahead_fold("{field}") gin_trgm_ops' for field in FIELDS)
+    with op.get_context().autocommit_block():
+        op.execute(
+            f'CREATE INDEX CONCURRENTLY ix_movie_typeahead ON movie USING GIN ({columns})')
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    with op.get_context().autocommit_block():
+        op.execute('DROP INDEX CONCURRENTLY IF EXISTS ix_movie_typeahead')
+    op.execute('DROP FUNCTION IF EXISTS typeahead_fold(text)')
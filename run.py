@@ -7,6 +7,7 @@ from flask_migrate import init, migrate, upgrade
 from plexapi.server import PlexServer
 
 from app.config import app, db, baseurl, token
+from app import api
 from app.library import Library
 from app.section import Section
 from app.server import Server
@@ -0,0 +1,84 @@
+"""In-process stand-ins for requests sessions serving Plex artwork."""
+import io
+import threading
+import time
+
+from PIL import Image as PILImage
+
+
+def jpeg(width, height, color=(120, 40, 40)):
+    buffer = io.BytesIO()
+    PILImage.new("RGB", (width, height), color).save(buffer, "JPEG")
+    return buffer.getvalue()
+
+
+class FakeResponse:
+    def __init__(self, body=b"", status_code=200, content_type="image/jpeg",
+                 declare_length=True, fail_after=None, headers=None):
+        self.status_code = status_code
+        self.headers = {"Content-Type": content_type, **(headers or {})}
+        if declare_length:
+            self.headers["Content-Length"] = str(len(body))
+        self.body = body
+        self.fail_after = fail_after
+        self.closed = False
+
+    def iter_content(self, chunk_size):
+        for start in range(0, len(self.body), chunk_size):
+            if self.fail_after is not None and start >= self.fail_after:
+                raise ConnectionResetError("reset by peer")
+            yield self.body[start:start + chunk_size]
+
+    def close(self):
+        self.closed = True
+
+
+class FakeSession:
+    """Answers every request with the same response."""
+
+    def __init__(self, response):
+        self.response = response
+
+    def get(self, url, headers=None, stream=False):
+        return self.response
+
+
+class ArtworkSession:
+    """Serves ``images`` (key -> (body, etag)) like a Plex server.
+
+    Conditional requests for an unchanged ETag get a 304, unknown keys a
+    404. Records every request, the threads that made them and the most
+    requests in flight at once when ``delay`` holds each one open.
+    """
+
+    def __init__(self, images, delay=0.0):
+        self.images = images
+        self.delay = delay
+        self.requests = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.threads = set()
+        self._lock = threading.Lock()
+
+    def get(self, url, headers=None, stream=False):
+        key = url.split("?", 1)[0]
+        key = next((k for k in self.images if key.endswith(k)), key)
+        with self._lock:
+            self.requests.append((key, dict(headers or {})))
+            self.threads.add(threading.get_ident())
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            time.sleep(self.delay)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+        if key not in self.images:
+            return FakeResponse(status_code=404, content_type="text/plain")
+        body, etag = self.images[key]
+        if (headers or {}).get("If-None-Match") == etag:
+            return FakeResponse(status_code=304, headers={"ETag": etag})
+        return FakeResponse(body, headers={"ETag": etag})
+
+    def requested(self, key):
+        return [headers for requested, headers in self.requests if requested == key]
@@ -0,0 +1,32 @@
+"""Query plan helpers for asserting that lookups are served by an index."""
+import re
+
+SEQUENTIAL_SCAN = {
+    "sqlite": re.compile(r"^SCAN (\w+)$"),
+    "postgresql": re.compile(r"Seq Scan on (\w+)"),
+}
+
+
+def explain(query):
+    """Return the plan lines the database chooses for an ORM query."""
+    connection = query.session.connection()
+    dialect = connection.dialect
+    compiled = query.statement.compile(dialect=dialect)
+    params = compiled.params
+    if compiled.positional:
+        params = tuple(params[name] for name in compiled.positiontup)
+    if dialect.name == "sqlite":
+        rows = connection.exec_driver_sql(
+            f"EXPLAIN QUERY PLAN {compiled}", params)
+        return [row[-1] for row in rows]
+    rows = connection.exec_driver_sql(f"EXPLAIN {compiled}", params)
+    return [row[0] for row in rows]
+
+
+def sequential_scans(query):
+    """Tables the plan reads in full rather than through an index."""
+    pattern = SEQUENTIAL_SCAN[query.session.connection().dialect.name]
+    return [
+        match.group(1) for line in explain(query)
+        for match in [pattern.search(line.strip())] if match
+    ]
@@ -0,0 +1,87 @@
+import gzip
+import json
+from datetime import datetime
+
+import app.api
+from app.cache import response_cache
+from app.movie import Movie
+
+
+def _get(client, url, **headers):
+    response = client.get(url, headers=headers)
+    return response, json.loads(response.data) if response.status_code == 200 else None
+
+def test_movies_keyset_pages(test_app):
+    Movie.bulk_upsert([
+        {"ratingKey": 9000 + i, "title": f"Title {i:02d}", "titleSort": f"Sort {25 - i:02d}", "year": 1980 + i}
+        for i in range(25)
+    ], key="ratingKey")
+    client = test_app.test_client()
+    seen = []
+    url = "/api/movies?year__gte=1980&limit=10&fields=title,ratingKey"
+    while url:
+        response, body = _get(client, url)
+        assert response.status_code == 200
+        assert all(set(row) == {"title", "ratingKey"} for row in body["data"])
+        seen.extend(row["ratingKey"] for row in body["data"])
+        url = body["next"] and f"/api/movies?year__gte=1980&limit=10&fields=title,ratingKey&after={body['next']}"
+    assert seen == [9000 + i for i in range(25)]
+
+def test_movies_sorted_by_key(test_app):
+    client = test_app.test_client()
+    response, first = _get(client, "/api/movies?year__gte=1980&sort=titleSort&limit=3&fields=titleSort")
+    response, second = _get(client, f"/api/movies?year__gte=1980&sort=titleSort&limit=3&fields=titleSort&after={first['next']}")
+    assert [row["titleSort"] for row in first["data"] + second["data"]] == [f"Sort {i:02d}" for i in range(1, 7)]
+
+def test_etag_and_gzip(test_app):
+    client = test_app.test_client()
+    response = client.get("/api/movies?limit=20", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert json.loads(gzip.decompress(response.data))["data"]
+    etag = response.headers["ETag"]
+    assert etag.startswith("W/")
+    response = client.get("/api/movies?limit=20", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+
+def test_bad_requests(test_app):
+    client = test_app.test_client()
+    assert client.get("/api/movies?nope=1").status_code == 400
+    assert client.get("/api/movies?after=???").status_code == 400
+    assert client.get("/api/servers?fields=token").status_code == 400
+
+def test_response_cache_invalidated_by_writes(test_app):
+    client = test_app.test_client()
+    url = "/api/movies?ratingKey=9001&fields=title"
+    stats = response_cache.stats()
+    _, body = _get(client, url)
+    _, cached = _get(client, url)
+    assert cached == body
+    assert response_cache.stats()["hits"] == stats["hits"] + 1
+    Movie.get({"ratingKey": 9001}, _first=True).update(title="Retitled")
+    _, body = _get(client, url)
+    assert body["data"] == [{"title": "Retitled"}]
+    assert client.get("/api/cache").json["responses"]["backend"] == "local"
+
+def test_paging_nullable_sort_returns_every_row(test_app):
+    Movie.bulk_upsert([
+        {"ratingKey": 9100 + i, "title": f"Viewed {i}", "year": 1700,
+         "lastViewedAt": datetime(2024, 1, 1 + i % 3) if i % 2 else None}
+        for i in range(10)
+    ], key="ratingKey")
+    client = test_app.test_client()
+    seen = []
+    after = ""
+    while after is not None:
+        _, body = _get(client, f"/api/movies?year=1700&sort=lastViewedAt&limit=3&fields=ratingKey{after}")
+        seen.extend(row["ratingKey"] for row in body["data"])
+        after = body["next"] and f"&after={body['next']}"
+    assert sorted(seen) == [9100 + i for i in range(10)]
+    assert len(seen) == 10
+    assert seen[-5:] == [9100 + i for i in range(0, 10, 2)]
+
+def test_accept_encoding_q_values(test_app):
+    assert app.api._accepted_encodings("gzip, br;q=0, x-brotli") == {"gzip", "x-brotli"}
+    assert app.api._accepted_encodings("br;q=0.5,gzip;q=0") == {"br"}
+    client = test_app.test_client()
+    response = client.get("/api/movies?limit=20", headers={"Accept-Encoding": "br;q=0, gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
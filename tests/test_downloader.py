@@ -0,0 +1,90 @@
+import logging
+from types import SimpleNamespace
+
+import pytest
+
+from app.downloader import ImageDownloader
+from tests.fake_http import ArtworkSession, jpeg
+
+RENDITIONS = {"thumb": [{"max_width": 50}], "art": [{"max_height": 40}]}
+
+
+@pytest.fixture
+def static(tmp_path, monkeypatch):
+    monkeypatch.setattr("app.image.static", str(tmp_path))
+    return tmp_path
+
+def _media(count, start=38000):
+    return [
+        SimpleNamespace(id=i, thumb=f"/library/metadata/{start + i}/thumb/1",
+                        art=f"/library/metadata/{start + i}/art/1")
+        for i in range(count)
+    ]
+
+def _session(media, delay=0.0):
+    return ArtworkSession({
+        getattr(row, kind): (jpeg(100, 150), f'"{row.id}-{kind}"')
+        for row in media for kind in RENDITIONS
+    }, delay=delay)
+
+def test_build_session_pools_a_connection_per_worker():
+    session = ImageDownloader.build_session(6)
+    adapter = session.get_adapter("http://plex:32400")
+    assert adapter is session.get_adapter("https://plex:32400")
+    assert adapter.poolmanager.connection_pool_kw["maxsize"] == 6
+
+def test_workers_share_the_session_and_stay_bounded(static):
+    media = _media(8)
+    session = _session(media, delay=0.02)
+    with ImageDownloader(workers=3, session=session, processes=1) as downloader:
+        results = downloader.download(media, RENDITIONS, manifest=False)
+    assert all(result.ok for result in results)
+    assert len(session.requests) == 16
+    assert len(session.threads) > 1
+    assert session.max_in_flight == 3
+
+def test_failures_are_logged_and_do_not_abort(static, caplog):
+    media = _media(4, start=38100)
+    session = _session(media)
+    session.images[media[1].thumb] = (b"not a jpeg", '"broken"')
+    del session.images[media[2].art]
+    with ImageDownloader(workers=2, session=session, processes=1) as downloader, \
+            caplog.at_level(logging.INFO, logger="ImageDownloader"):
+        results = downloader.download(media, RENDITIONS, manifest=False)
+    failed = {(result.media_id, result.kind): result.error for result in results if not result.ok}
+    assert set(failed) == {(1, "thumb"), (2, "art")}
+    assert failed[(2, "art")] == "HTTP 404"
+    assert any(f"Failed to download thumb {media[1].thumb}" in message
+               for message in caplog.messages)
+    assert "Downloaded 6/8 images (0 unchanged, 2 failed)." in caplog.messages
+
+def test_results_cover_every_source_image(static):
+    media = _media(3, start=38200)
+    media.append(SimpleNamespace(id=3, thumb=None, art="/library/metadata/38203/art/1"))
+    session = _session(media[:3])
+    session.images[media[3].art] = (jpeg(100, 150), '"3-art"')
+    with ImageDownloader(workers=2, session=session, processes=1) as downloader:
+        results = downloader.download(
+            media, RENDITIONS, force_ext="webp", quality=70, manifest=False)
+    assert sorted((result.media_id, result.kind) for result in results) == [
+        (i, kind) for i in range(4) for kind in sorted(RENDITIONS)]
+    by_job = {(result.media_id, result.kind): result for result in results}
+    assert by_job[(3, "thumb")].error == "No thumb key"
+    thumb = by_job[(0, "thumb")]
+    assert thumb.etag == '"0-thumb"'
+    assert thumb.renditions == [{"format": "webp", "quality": 70, "max_width": 50}]
+    assert thumb.outputs[0]["path"].endswith(".webp")
+    assert thumb.outputs[0]["settings"] == "format=webp,max_width=50,quality=70"
+
+def test_process_pool_is_reused_until_closed(static):
+    media = _media(2, start=38300)
+    with ImageDownloader(workers=2, session=_session(media), processes=1) as downloader:
+        downloader.download(media[:1], RENDITIONS, manifest=False)
+        pool = downloader.process_pool()
+        # Workers are not forked from the threads submitting renders.
+        assert pool._mp_context.get_start_method() in ("forkserver", "spawn")
+        results = downloader.download(media[1:], RENDITIONS, manifest=False)
+        assert all(result.ok for result in results)
+        assert downloader.process_pool() is pool
+    with pytest.raises(RuntimeError):
+        pool.submit(int)
@@ -0,0 +1,28 @@
+from app.guid import Guid
+from app.movie import Movie
+
+
+def test_scheme_is_parsed(test_app):
+    guid = Guid.create(guid="imdb://tt0087363", media_type="movie", media_id=1)
+    assert guid.scheme == "imdb"
+
+def test_resolve_many(test_app):
+    movie = Movie.upsert({
+        "ratingKey": 5001,
+        "title": "Gremlins",
+        "guids": ["imdb://tt0087332", "tmdb://927"],
+    })
+    resolved = Guid.resolve_many(["imdb://tt0087332", "tvdb://0"])
+    assert resolved == {"imdb://tt0087332": [("movie", movie.id)], "tvdb://0": []}
+    assert Movie.by_external_id("tmdb://927").id == movie.id
+
+def test_resolve_cache_invalidated(test_app):
+    assert Guid.resolve("tvdb://5869") == []
+    movie = Movie.upsert({
+        "ratingKey": 5002,
+        "title": "The 'Burbs",
+        "guids": ["tvdb://5869"],
+    })
+    assert Guid.resolve("tvdb://5869") == [("movie", movie.id)]
+    Movie.upsert({"ratingKey": 5002, "guids": []})
+    assert Guid.resolve("tvdb://5869") == []
@@ -0,0 +1,110 @@
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from PIL import Image as PILImage
+
+from app.image import Image, render
+from app.utils import atomic_save, fetch
+from tests.fake_http import FakeResponse, FakeSession, jpeg as _jpeg
+
+def test_render_renditions(tmp_path):
+    base_path = str(tmp_path / "library" / "metadata" / "31010" / "thumb" / "1718592061")
+    outputs = render(_jpeg(1000, 1500), base_path, ".jpg", [
+        {"max_width": 250},
+        {"name": "500w", "max_width": 500, "format": "webp", "quality": 80},
+    ])
+    assert [output["path"] for output in outputs] == [
+        base_path + ".jpg",
+        base_path + "_500w.webp",
+    ]
+    assert PILImage.open(outputs[0]["path"]).size == (250, 375)
+    assert PILImage.open(outputs[1]["path"]).format == "WEBP"
+    assert all(output["size"] > 0 for output in outputs)
+
+
+def test_fetch_rejects_non_image_content_type():
+    response = FakeResponse(b"<html></html>", content_type="text/html")
+    with pytest.raises(ValueError, match="content type"):
+        fetch("http://plex/thumb", FakeSession(response))
+    assert response.closed
+
+def test_fetch_rejects_declared_length_over_cap():
+    response = FakeResponse(b"x" * 100)
+    with pytest.raises(ValueError, match="exceeds 50 bytes"):
+        fetch("http://plex/thumb", FakeSession(response), max_bytes=50)
+    assert response.closed
+
+def test_fetch_caps_streamed_body():
+    response = FakeResponse(b"x" * (200 * 1024), declare_length=False)
+    with pytest.raises(ValueError, match="exceeds 65536 bytes"):
+        fetch("http://plex/thumb", FakeSession(response), max_bytes=64 * 1024)
+    assert response.closed
+
+def test_fetch_closes_buffer_when_stream_fails(monkeypatch):
+    buffers = []
+    spooled = tempfile.SpooledTemporaryFile
+
+    def recording(**kwargs):
+        buffers.append(spooled(**kwargs))
+        return buffers[-1]
+
+    monkeypatch.setattr(tempfile, "SpooledTemporaryFile", recording)
+    response = FakeResponse(b"x" * (200 * 1024), fail_after=64 * 1024)
+    with pytest.raises(ConnectionResetError):
+        fetch("http://plex/thumb", FakeSession(response))
+    assert buffers[0].closed
+    assert response.closed
+
+def test_fetch_streams_into_buffer():
+    body = _jpeg(10, 10)
+    response, buffer = fetch("http://plex/thumb", FakeSession(FakeResponse(body)))
+    with buffer:
+        assert buffer.read() == body
+
+class BrokenImage:
+    def save(self, f, format=None, **params):
+        f.write(b"partial")
+        raise OSError("disk full")
+
+def test_atomic_save_leaves_no_partial_file(tmp_path):
+    path = str(tmp_path / "thumb.jpg")
+    with pytest.raises(OSError):
+        atomic_save(BrokenImage(), path, "JPEG")
+    assert os.listdir(tmp_path) == []
+
+def test_render_hands_executor_a_path(tmp_path, monkeypatch):
+    monkeypatch.setattr("app.image.static", str(tmp_path))
+    image = Image("http://plex/thumb", "/thumb", FakeSession(FakeResponse(_jpeg(400, 600))))
+    submitted = []
+
+    class RecordingExecutor(ThreadPoolExecutor):
+        def submit(self, fn, data, *args):
+            submitted.append(data)
+            return super().submit(fn, data, *args)
+
+    with RecordingExecutor(1) as executor:
+        outputs = image.render([{"max_width": 100}], executor)
+    assert isinstance(submitted[0], str)
+    assert not os.path.exists(submitted[0])
+    assert PILImage.open(outputs[0]["path"]).size == (100, 150)
+
+def test_render_hands_executor_the_named_download(tmp_path, monkeypatch):
+    monkeypatch.setattr("app.image.static", str(tmp_path))
+    image = Image("http://plex/thumb", "/thumb",
+                  FakeSession(FakeResponse(_jpeg(400, 600))), named=True)
+    downloaded = image.buffer.name
+    submitted = []
+
+    class RecordingExecutor(ThreadPoolExecutor):
+        def submit(self, fn, data, *args):
+            submitted.append(data)
+            return super().submit(fn, data, *args)
+
+    monkeypatch.setattr(tempfile, "NamedTemporaryFile", None)  # no second copy
+    with RecordingExecutor(1) as executor:
+        outputs = image.render([{"max_width": 100}], executor)
+    assert submitted == [downloaded]
+    assert not os.path.exists(downloaded)
+    assert PILImage.open(outputs[0]["path"]).size == (100, 150)
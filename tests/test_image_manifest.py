@@ -0,0 +1,67 @@
+import os
+
+import pytest
+
+from app.downloader import ImageDownloader
+from app.image_manifest import ImageManifest
+from app.movie import Movie
+from tests.fake_http import ArtworkSession, jpeg
+
+THUMB = "/library/metadata/35000/thumb/1"
+ART = "/library/metadata/35000/art/1"
+
+
+@pytest.fixture
+def artwork(test_app, tmp_path, monkeypatch):
+    monkeypatch.setattr("app.image.static", str(tmp_path))
+    session = ArtworkSession({
+        THUMB: (jpeg(500, 750), '"thumb-1"'),
+        ART: (jpeg(1920, 1080), '"art-1"'),
+    })
+    with ImageDownloader(workers=2, session=session, processes=1) as downloader:
+        monkeypatch.setattr(Movie, "_image_downloader", downloader)
+        yield session
+
+def _movie(rating_key, thumb=THUMB, art=ART):
+    Movie.bulk_upsert([{"ratingKey": rating_key, "title": f"Artwork {rating_key}",
+                        "thumb": thumb, "art": art}], key="ratingKey")
+    return Movie.get({"ratingKey": rating_key}, _first=True)
+
+def test_download_images_skips_unchanged(artwork):
+    movie = _movie(35000)
+    results = movie.download_images()
+    assert all(result.ok and not result.skipped for result in results)
+    assert {entry.etag for entry in ImageManifest.lookup(
+        ImageManifest.rendition_key_for(result.key, output["settings"])
+        for result in results for output in result.outputs).values()} == {'"thumb-1"', '"art-1"'}
+    requests = len(artwork.requests)
+    results = movie.download_images()
+    assert all(result.ok and result.skipped for result in results)
+    assert len(artwork.requests) == requests
+
+def test_revalidate_uses_conditional_requests(artwork):
+    movie = _movie(35001)
+    movie.download_images()
+    result = movie.download_thumb(None, revalidate=True)
+    assert result.skipped
+    assert artwork.requested(THUMB)[-1]["If-None-Match"] == '"thumb-1"'
+    artwork.images[THUMB] = (jpeg(500, 750, color=(0, 0, 255)), '"thumb-2"')
+    result = movie.download_thumb(None, revalidate=True)
+    assert result.ok and not result.skipped
+    entry = ImageManifest.get(source_key=THUMB, _first=True)
+    assert entry.etag == '"thumb-2"'
+
+def test_manifest_invalidated_by_missing_file_and_new_key(artwork):
+    movie = _movie(35002)
+    (result,) = [r for r in movie.download_images() if r.kind == "thumb"]
+    os.unlink(result.outputs[0]["path"])
+    requests = len(artwork.requested(THUMB))
+    assert not movie.download_thumb(None).skipped
+    assert len(artwork.requested(THUMB)) == requests + 1
+
+    new_thumb = "/library/metadata/35000/thumb/2"
+    artwork.images[new_thumb] = (jpeg(500, 750), '"thumb-3"')
+    movie = _movie(35002, thumb=new_thumb)
+    result = movie.download_thumb(None)
+    assert result.ok and not result.skipped
+    assert len(artwork.requested(new_thumb)) == 1
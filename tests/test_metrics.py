@@ -0,0 +1,100 @@
+import pytest
+from sqlalchemy.exc import OperationalError
+
+import app.api
+from app import metrics
+from app.config import db
+from app.movie import Movie
+
+
+def _batch_statements():
+    labels = {"model": "Movie", "operation": "bulk_upsert_batch"}
+    return (metrics.operation_statements.count(**labels),
+            metrics.operation_statements.sum(**labels))
+
+def test_statements_per_batch_do_not_grow_with_rows(test_app):
+    observed = []
+    for start, size in ((31000, 3), (32000, 60)):
+        count, total = _batch_statements()
+        Movie.bulk_upsert([
+            {"ratingKey": start + i, "title": f"Metered {start + i}", "year": 1990}
+            for i in range(size)
+        ], key="ratingKey")
+        new_count, new_total = _batch_statements()
+        assert new_count == count + 1
+        observed.append(new_total - total)
+    assert observed[0] == observed[1] > 0
+
+def test_operations_are_timed_once_per_call(test_app):
+    labels = {"model": "Movie", "operation": "upsert", "outcome": "ok"}
+    before = metrics.operations.value(**labels)
+    Movie.upsert({"ratingKey": 33000, "title": "Metered Upsert"})
+    # Movie.upsert calls Model.upsert; both are one operation.
+    assert metrics.operations.value(**labels) == before + 1
+    assert metrics.operations.value(model="Movie", operation="create", outcome="ok") >= 1
+
+def test_sync_run_rates():
+    with metrics.sync_run("metered") as run:
+        metrics.count_bytes("plex", 2048)
+        metrics.count_bytes("image", 4096)
+        run.rows = 10
+    assert metrics.sync_rows.value(section="metered") == 10
+    assert metrics.sync_bytes.value(section="metered") == 2048
+    assert metrics.sync_rows_rate.value(section="metered") > 0
+    assert metrics.sync_runs.value(section="metered", outcome="ok") == 1
+
+def test_histogram_text_format():
+    histogram = metrics.Histogram("test_seconds", "Test.", ("kind",), buckets=(0.1, 1))
+    histogram.observe(0.05, kind='a"b')
+    histogram.observe(0.5, kind='a"b')
+    assert histogram.render() == [
+        "# HELP test_seconds Test.",
+        "# TYPE test_seconds histogram",
+        'test_seconds_bucket{kind="a\\"b",le="0.1"} 1',
+        'test_seconds_bucket{kind="a\\"b",le="1.0"} 2',
+        'test_seconds_bucket{kind="a\\"b",le="+Inf"} 2',
+        'test_seconds_sum{kind="a\\"b"} 0.55',
+        'test_seconds_count{kind="a\\"b"} 2',
+    ]
+
+def test_metrics_route(test_app):
+    Movie.get(ratingKey=31000, _first=True)
+    response = test_app.test_client().get("/metrics")
+    assert response.status_code == 200
+    assert response.content_type.startswith("text/plain; version=0.0.4")
+    body = response.get_data(as_text=True)
+    assert "# TYPE plexdb_operation_duration_seconds histogram" in body
+    assert 'plexdb_operations_total{model="Movie",operation="get",outcome="ok"}' in body
+    assert 'plexdb_sql_statements_total{statement="SELECT",operation="Movie.get_many"}' in body
+
+
+def test_failed_statements_leave_nothing_on_the_connection(test_app):
+    connection = db.session.connection()
+    for _ in range(3):
+        with pytest.raises(OperationalError):
+            connection.exec_driver_sql("SELECT * FROM no_such_table")
+        db.session.rollback()
+        connection = db.session.connection()
+    assert not any(key.startswith("metrics") for key in connection.info)
+    count = metrics.statement_seconds.count(statement="SELECT")
+    total = metrics.statement_seconds.sum(statement="SELECT")
+    connection.exec_driver_sql("SELECT 1")
+    assert metrics.statement_seconds.count(statement="SELECT") == count + 1
+    assert metrics.statement_seconds.sum(statement="SELECT") > total
+
+def test_results_load_rows_once(test_app):
+    Movie.bulk_upsert([
+        {"ratingKey": 34000 + i, "title": f"Counted {i}", "year": 1961} for i in range(3)
+    ], key="ratingKey")
+
+    def selects():
+        return metrics.statement_seconds.count(statement="SELECT")
+
+    before = selects()
+    results = Movie.get(year=1961)
+    assert results and len(results) == 3
+    assert [movie.title for movie in results] == [f"Counted {i}" for i in range(3)]
+    assert list(results)[0] is results[0]
+    assert selects() == before + 1
+    assert results.count() == 3
+    assert selects() == before + 2
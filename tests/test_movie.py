@@ -0,0 +1,267 @@
+import pytest
+
+from app.config import db
+from app.guid import Guid
+from app.movie import Movie
+
+
+def test_bulk_upsert(test_app):
+    counts = Movie.bulk_upsert([
+        {"ratingKey": 1001, "title": "The 'Burbs", "year": 1988},
+        {"ratingKey": 1002, "title": "Gremlins", "year": 1984},
+    ], key="ratingKey")
+    assert counts == {"inserted": 2, "updated": 0, "unchanged": 0}
+    movie = Movie.get({"ratingKey": 1001}, _first=True)
+    assert movie.title == "The 'Burbs"
+    assert movie.uuid
+
+def test_bulk_upsert_update_and_unchanged(test_app):
+    Movie.bulk_upsert([
+        {"ratingKey": 1003, "title": "Innerspace", "year": 1987},
+        {"ratingKey": 1004, "title": "Explorers", "year": 1985},
+    ], key="ratingKey")
+    counts = Movie.bulk_upsert([
+        {"ratingKey": 1003, "title": "Innerspace", "year": 1987},
+        {"ratingKey": 1004, "title": "Explorers (Director's Cut)", "year": 1985},
+        {"ratingKey": 1005, "title": "Matinee", "year": 1993},
+    ], key="ratingKey", batch_size=2)
+    assert counts == {"inserted": 1, "updated": 1, "unchanged": 1}
+    movie = Movie.get({"ratingKey": 1004}, _first=True)
+    assert movie.title == "Explorers (Director's Cut)"
+    assert len(Movie.get(title="Innerspace")) == 1
+
+def test_upsert_syncs_guids(test_app):
+    movie = Movie.upsert({
+        "ratingKey": 31010,
+        "title": "The 'Burbs",
+        "guids": ["imdb://tt0096734", "tmdb://11974", "tvdb://5869"],
+    })
+    assert sorted(guid.guid for guid in movie.guids) == [
+        "imdb://tt0096734", "tmdb://11974", "tvdb://5869"]
+    movie = Movie.upsert({
+        "ratingKey": 31010,
+        "title": "The 'Burbs",
+        "guids": ["imdb://tt0096734", "tmdb://11974"],
+    })
+    db.session.expire(movie)
+    assert sorted(guid.guid for guid in movie.guids) == [
+        "imdb://tt0096734", "tmdb://11974"]
+
+def test_bulk_upsert_syncs_guids(test_app):
+    Movie.bulk_upsert([
+        {"ratingKey": 2001, "title": "Gremlins", "guids": ["imdb://tt0087363"]},
+        {"ratingKey": 2002, "title": "Innerspace", "guids": ["imdb://tt0093260", "tmdb://11548"]},
+    ], key="ratingKey")
+    Movie.bulk_upsert([
+        {"ratingKey": 2001, "title": "Gremlins", "guids": ["imdb://tt0087363", "tmdb://927"]},
+        {"ratingKey": 2002, "title": "Innerspace", "guids": ["imdb://tt0093260", "tmdb://11548"]},
+    ], key="ratingKey")
+    gremlins = Movie.get({"ratingKey": 2001}, _first=True)
+    assert sorted(guid.guid for guid in gremlins.guids) == ["imdb://tt0087363", "tmdb://927"]
+    assert len(Guid.get(media_type="movie", media_id=gremlins.id)) == 2
+
+def test_entity_cache(test_app):
+    Movie.bulk_upsert([
+        {"ratingKey": 6000 + i, "title": f"Cached {i}"} for i in range(5)
+    ], key="ratingKey")
+    movies = Movie.get_many([6000 + i for i in range(5)], _key="ratingKey")
+    assert sorted(movie.title for movie in movies.values()) == [f"Cached {i}" for i in range(5)]
+    hits = Movie.entity_cache_stats()["hits"]
+    db.session.expunge_all()
+    movie = Movie.get({"ratingKey": 6001}, _first=True)
+    assert movie.title == "Cached 1"
+    assert Movie.get_by_id(movie.id) is movie
+    assert Movie.entity_cache_stats()["hits"] == hits + 2
+
+def test_entity_cache_invalidation(test_app):
+    movie = Movie.get({"ratingKey": 6002}, _first=True)
+    movie.update(title="Renamed")
+    db.session.expunge_all()
+    assert Movie.get({"ratingKey": 6002}, _first=True).title == "Renamed"
+    Movie.bulk_upsert([{"ratingKey": 6002, "title": "Bulk renamed"}], key="ratingKey")
+    db.session.expunge_all()
+    assert Movie.get_by_id(movie.id).title == "Bulk renamed"
+    Movie.get_by_id(movie.id).delete()
+    assert Movie.get({"ratingKey": 6002}, _first=True) is None
+
+def test_lookup_by_string_key(test_app):
+    Movie.bulk_upsert([{"ratingKey": 6010, "title": "Stringly"}], key="ratingKey")
+    for _ in range(2):  # cold, then from the entity cache
+        movie = Movie.get(ratingKey="6010", _first=True)
+        assert movie.title == "Stringly"
+    assert Movie.get_many(["6010", 6010], _key="ratingKey") == {"6010": movie, 6010: movie}
+    assert Movie.upsert(ratingKey="6010", title="Typed").id == movie.id
+    db.session.expunge_all()
+    assert Movie.get(ratingKey=6010, _first=True).title == "Typed"
+    assert Movie.get_many(["not a key"], _key="ratingKey") == {}
+
+def test_flatten_aliases_and_coercion(test_app):
+    class PlexMovie:
+        pass
+    obj = PlexMovie()
+    obj.__dict__.update({
+        "_server": object(),
+        "_data": "<Video/>",
+        "ratingKey": "42",
+        "title": "Gremlins",
+        "addedAt": "1700000000",
+        "rating": "7.3",
+        "playlistItemID": 9,
+        "playQueueItemID": None,
+        "guids": [],
+    })
+    flattened = Movie._flatten_args_kwargs(obj)
+    assert "_server" not in flattened and "_data" not in flattened
+    assert flattened["ratingKey"] == 42
+    assert flattened["rating"] == 7.3
+    assert flattened["addedAt"].year == 2023
+    assert flattened["playlistItemId"] == 9
+    assert flattened["playQueueItemId"] is None
+    assert flattened["guids"] == []
+
+def test_bulk_upsert_fingerprint(test_app):
+    rows = [
+        {"ratingKey": 1101, "title": "Gremlins", "guids": ["imdb://tt0087363"]},
+        {"ratingKey": 1102, "title": "Matinee", "guids": ["tmdb://10439"]},
+    ]
+    Movie.bulk_upsert(rows, key="ratingKey")
+    movie = Movie.get({"ratingKey": 1101}, _first=True)
+    fingerprint, updated_at = movie.fingerprint, movie.updated_at
+    assert fingerprint
+    counts = Movie.bulk_upsert(rows, key="ratingKey")
+    assert counts == {"inserted": 0, "updated": 0, "unchanged": 2}
+    db.session.expire_all()
+    movie = Movie.get({"ratingKey": 1101}, _first=True)
+    assert movie.updated_at == updated_at
+    rows[1]["guids"] = ["tmdb://10439", "imdb://tt0107497"]
+    counts = Movie.bulk_upsert(rows, key="ratingKey")
+    assert counts == {"inserted": 0, "updated": 1, "unchanged": 1}
+    assert len(Guid.get(media_type="movie", media_id=Movie.get(
+        {"ratingKey": 1102}, _first=True).id)) == 2
+
+def test_update_clears_fingerprint(test_app):
+    rows = [{"ratingKey": 1103, "title": "Explorers"}]
+    Movie.bulk_upsert(rows, key="ratingKey")
+    movie = Movie.get({"ratingKey": 1103}, _first=True)
+    movie.update({"title": "Explorers (1985)"})
+    assert movie.fingerprint is None
+    counts = Movie.bulk_upsert(rows, key="ratingKey")
+    assert counts["updated"] == 1
+    assert Movie.get({"ratingKey": 1103}, _first=True).title == "Explorers"
+
+def test_fulltext(test_app):
+    Movie.bulk_upsert([
+        {"ratingKey": 1201, "title": "Gremlins", "year": 1984, "contentRating": "PG",
+         "summary": "A boy receives a strange creature called a mogwai."},
+        {"ratingKey": 1202, "title": "Gremlins 2: The New Batch", "year": 1990,
+         "contentRating": "PG-13", "tagline": "The mogwai are back."},
+        {"ratingKey": 1203, "title": "Mogwai Hunting", "year": 1990, "contentRating": "R"},
+    ], key="ratingKey")
+    titles = [movie.title for movie in Movie.fulltext("mogwai")]
+    assert titles[0] == "Mogwai Hunting"
+    assert set(titles) == {"Gremlins", "Gremlins 2: The New Batch", "Mogwai Hunting"}
+    assert [movie.ratingKey for movie in Movie.fulltext("mogwai", year=1990, contentRating="PG-13")] == [1202]
+    assert [movie.ratingKey for movie in Movie.fulltext("strange creatures")] == [1201]
+    assert Movie.fulltext("mogwai", limit=1)[0].ratingKey == 1203
+    assert Movie.fulltext('"') == []
+
+def test_fulltext_follows_updates(test_app):
+    Movie.bulk_upsert([{"ratingKey": 1204, "title": "Innerspace"}], key="ratingKey")
+    movie = Movie.get({"ratingKey": 1204}, _first=True)
+    movie.update({"summary": "A test pilot is miniaturized."})
+    assert [m.ratingKey for m in Movie.fulltext("miniaturized")] == [1204]
+    movie.delete()
+    assert Movie.fulltext("miniaturized") == []
+
+def test_typeahead(test_app):
+    Movie.bulk_upsert([
+        {"ratingKey": 1301, "title": "The 'Money Pit", "titleSort": "'Money Pit"},
+        {"ratingKey": 1302, "title": "Amélie", "titleSort": "Amélie",
+         "originalTitle": "Le Fabuleux Destin d'Amélie Poulain"},
+        {"ratingKey": 1303, "title": "Spider-Man", "titleSort": "Spider-Man"},
+    ], key="ratingKey")
+    assert [m.ratingKey for m in Movie.typeahead("money")] == [1301]
+    assert [m.ratingKey for m in Movie.typeahead("The mon")] == [1301]
+    assert [m.ratingKey for m in Movie.typeahead("AME")] == [1302]
+    assert [m.ratingKey for m in Movie.typeahead("le fab")] == [1302]
+    assert [m.ratingKey for m in Movie.typeahead("spider m")] == [1303]
+    assert Movie.typeahead("") == []
+
+def test_typeahead_follows_writes(test_app):
+    Movie.typeahead("d")
+    Movie.bulk_upsert([{"ratingKey": 1304, "title": "Dragnet"}], key="ratingKey")
+    movie = Movie.typeahead("dragn")[0]
+    assert movie.ratingKey == 1304
+    movie.update({"title": "Splash"})
+    assert Movie.typeahead("dragn") == []
+    assert [m.ratingKey for m in Movie.typeahead("splash")] == [1304]
+    movie.title = "Big"
+    db.session.flush()
+    db.session.rollback()
+    assert Movie.typeahead("big") == []
+    movie = Movie.get({"ratingKey": 1304}, _first=True)
+    movie.delete()
+    assert Movie.typeahead("splash") == []
+
+def test_stats(test_app):
+    Movie.bulk_upsert([
+        {"ratingKey": 1401, "title": "Big", "year": 1988, "studio": "Fox",
+         "duration": 6240000, "viewCount": 2, "audienceRating": 7.0},
+        {"ratingKey": 1402, "title": "Splash", "year": 1984, "studio": "Touchstone",
+         "duration": 6660000, "audienceRating": 6.0},
+        {"ratingKey": 1403, "title": "Dragnet", "year": 1987, "studio": "Universal"},
+    ], key="ratingKey")
+    Movie.bulk_upsert([
+        {"ratingKey": 1401, "title": "Big", "year": 1988, "studio": "Fox",
+         "duration": 6240000, "viewCount": 3, "audienceRating": 7.0},
+        {"ratingKey": 1403, "title": "Dragnet", "year": 1987, "studio": "Touchstone"},
+    ], key="ratingKey")
+    touchstone = next(s for s in Movie.stats("studio") if s["studio"] == "Touchstone")
+    assert touchstone["count"] == 2
+    assert touchstone["duration"] == 6660000
+    assert touchstone["audienceRating_avg"] == 6.0
+    assert all(s["studio"] != "Universal" for s in Movie.stats("studio"))
+    fox = next(s for s in Movie.stats("studio") if s["studio"] == "Fox")
+    assert fox["viewCount"] == 3
+
+    before = {s["year"]: s["count"] for s in Movie.stats("year")}
+    Movie.get({"ratingKey": 1402}, _first=True).update({"year": 1985})
+    Movie.get({"ratingKey": 1403}, _first=True).delete()
+    years = {s["year"]: s["count"] for s in Movie.stats("year")}
+    assert years.get(1984, 0) == before[1984] - 1
+    assert years[1985] == before.get(1985, 0) + 1
+    assert years.get(1987, 0) == before[1987] - 1
+    incremental = {by: Movie.stats(by) for by in (None, *Movie._rollup_dimensions)}
+    Movie.rebuild_stats()
+    rebuilt = {by: Movie.stats(by) for by in (None, *Movie._rollup_dimensions)}
+    assert incremental == rebuilt
+    assert rebuilt[None]["count"] == Movie.get().count()
+
+def test_stats_rollback(test_app):
+    before = Movie.stats()
+    with pytest.raises(RuntimeError):
+        with Movie.batch():
+            Movie.bulk_upsert([{"ratingKey": 1404, "title": "Turner & Hooch",
+                                "year": 1989}], key="ratingKey")
+            raise RuntimeError
+    assert Movie.stats() == before
+
+def test_stats_buckets_are_written_in_order(test_app):
+    executed = []
+
+    class Recorder:
+        info = {}
+
+        def execute(self, statement, parameters=None):
+            executed.append(parameters)
+
+    session = Recorder()
+    rollup = Movie._rollup
+    for year, studio in ((1999, "Warner"), (1984, "Fox"), (1990, "Carolco")):
+        rollup.track(session, new={
+            "year": year, "studio": studio, "contentRating": "R", "librarySectionID": 1,
+            "duration": None, "viewCount": None, "audienceRating": None})
+    rollup.apply(session, session.info["rollup"][rollup])
+    buckets = [row["bucket"] for row in executed[0]]
+    # Concurrent commits must lock shared buckets in one order.
+    assert buckets == sorted(buckets)
@@ -0,0 +1,96 @@
+import os
+from datetime import datetime
+
+import pytest
+from flask import Flask
+
+from app.config import db
+from app.guid import Guid
+from app.movie import Movie
+from app.pg_copy import ChunkReader, csv_chunks, csv_field
+
+
+def test_csv_fields():
+    assert csv_field(None) == ""
+    assert csv_field("") == '""'
+    assert csv_field('say "hi"\nbye') == '"say ""hi""\nbye"'
+    assert csv_field(True) == "t"
+    assert csv_field(2.5) == "2.5"
+    assert csv_field(datetime(2024, 6, 17, 8, 30)) == '"2024-06-17 08:30:00"'
+    assert csv_field(["a", 1]) == '"[""a"", 1]"'
+
+def test_csv_chunks():
+    rows = [(i, f"title {i}") for i in range(5)]
+    chunks = list(csv_chunks(rows, chunk_rows=2))
+    assert len(chunks) == 3
+    assert "".join(chunks).splitlines() == [f'{i},"title {i}"' for i in range(5)]
+
+def test_chunk_reader_reads_across_chunks():
+    reader = ChunkReader(["abc", "defg", "h"])
+    assert [reader.read(3) for _ in range(4)] == ["abc", "def", "gh", ""]
+    assert ChunkReader(["ab", "cd"]).read() == "abcd"
+
+def test_copy_load_requires_postgres(test_app):
+    with pytest.raises(NotImplementedError):
+        Movie.copy_load([{"ratingKey": 34000, "title": "Copied"}], key="ratingKey")
+
+
+@pytest.fixture(scope="module")
+def pg_app():
+    url = os.environ.get("TEST_POSTGRES_URL")
+    if not url:
+        pytest.skip("TEST_POSTGRES_URL is not set")
+    pg = Flask(__name__)
+    pg.config["SQLALCHEMY_DATABASE_URI"] = url
+    db.init_app(pg)
+    with pg.app_context():
+        db.drop_all()
+        yield pg
+        db.session.remove()
+        db.drop_all()
+
+def _movie(i):
+    return {
+        "ratingKey": 36000 + i,
+        "title": f"Copied {i}" if i < 20 else f"Copied {i} (Remastered)",
+        "year": 1980 + i % 5,
+        "studio": f"Studio {i % 3}",
+        "duration": 1000 * i,
+        "librarySectionID": 7,
+        "guids": [f"imdb://tt{36000 + i:07d}", f"tmdb://{i}"] if i % 4 else [],
+    }
+
+def _load(loader):
+    db.session.remove()
+    db.drop_all()
+    db.create_all()
+    Guid._resolved.clear()
+    # Rows 0-9 exist already; 5-9 come in again, 8 and 9 changed.
+    Movie.bulk_upsert([
+        _movie(i) if i < 8 else {**_movie(i), "title": f"Old {i}", "guids": ["plex://stale"]}
+        for i in range(10)
+    ], key="ratingKey")
+    incoming = [_movie(i) for i in range(5, 30)]
+    del incoming[3]["guids"]
+    # A repeated key: the last row and its guids win.
+    incoming.append({**incoming[-1], "title": "Copied twice", "guids": ["tvdb://36029"]})
+    counts = loader(incoming)
+    movies = {
+        movie.ratingKey: {
+            column: getattr(movie, column) for column in Movie.__table__.columns.keys()
+            if column not in ("id", "uuid", "created_at", "updated_at")
+        }
+        for movie in Movie.get()
+    }
+    links = sorted(
+        (movie.ratingKey, guid.guid, guid.scheme)
+        for movie in Movie.get() for guid in movie.guids)
+    return counts, movies, links, Movie.stats(), Movie.stats(by="year")
+
+def test_copy_load_matches_bulk_upsert(pg_app):
+    copied = _load(lambda rows: Movie.copy_load(rows, key="ratingKey", batch_size=7))
+    upserted = _load(lambda rows: Movie.bulk_upsert(rows, key="ratingKey", batch_size=7))
+    assert copied[0] == upserted[0] == {"inserted": 20, "updated": 2, "unchanged": 3}
+    assert copied[1:] == upserted[1:]
+    assert copied[1][36029]["title"] == "Copied twice"
+    assert (36029, "tvdb://36029", "tvdb") in copied[2]
@@ -0,0 +1,53 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.config import db
+from app.guid import Guid
+from app.movie import Movie
+from tests.plan import sequential_scans
+
+ROWS = 5000
+
+
+@pytest.fixture(scope="module")
+def catalog(test_app):
+    start = datetime(2020, 1, 1)
+    Movie.bulk_upsert(({
+        "ratingKey": 100000 + i,
+        "guid": f"plex://movie/{i:08x}",
+        "title": f"Movie {i}",
+        "titleSort": f"Movie {i:05d}",
+        "year": 1950 + i % 75,
+        "librarySectionID": 1 + i % 4,
+        "lastViewedAt": start + timedelta(hours=i) if i % 10 == 0 else None,
+        "guids": [f"imdb://tt{i:07d}"],
+    } for i in range(ROWS)), key="ratingKey")
+    db.session.execute(db.text("ANALYZE"))
+    return Movie.get({"ratingKey": 100042}, _first=True)
+
+
+@pytest.mark.parametrize("filters", [
+    [("ratingKey", "=", 100042)],
+    [("guid", "=", "plex://movie/0000002a")],
+    [("year", "=", 1988)],
+    [("librarySectionID", "=", 2), ("titleSort", ">=", "Movie 04000")],
+    [("lastViewedAt", ">=", datetime(2020, 6, 1))],
+])
+def test_movie_search_uses_index(catalog, filters):
+    assert sequential_scans(Movie.search(filters).query) == []
+
+
+def test_uuid_search_uses_index(catalog):
+    results = Movie.search([("uuid", "=", catalog.uuid)])
+    assert sequential_scans(results.query) == []
+
+
+def test_guid_search_uses_index(catalog):
+    results = Guid.search([("guid", "=", "imdb://tt0000042")])
+    assert sequential_scans(results.query) == []
+
+
+def test_unindexed_search_is_reported(catalog):
+    results = Movie.search([("studio", "=", "Amblin")])
+    assert sequential_scans(results.query) == ["movie"]
@@ -1,3 +1,9 @@
+import weakref
+from types import SimpleNamespace
+from xml.etree.ElementTree import Element, SubElement
+
+from app.config import db
+from app.movie import Movie
 from app.section import Section
 
 def test_create_section(test_app):
@@ -87,3 +93,113 @@ def test_get_all_sections(test_app):
     )
     sections = Section.get()
     assert len(sections) >= 2
+
+def test_batch_commits_once(test_app):
+    with Section.batch(flush_every=2):
+        for i in range(5):
+            Section.create(title=f"Batch {i}", type="batch")
+        assert db.session.info["batch"]["pending"] == 1
+    assert "batch" not in db.session.info
+    assert len(Section.get(type="batch")) == 5
+
+def test_batch_rolls_back_on_error(test_app):
+    try:
+        with Section.batch():
+            Section.create(title="Rolled back", type="rollback")
+            raise RuntimeError("boom")
+    except RuntimeError:
+        pass
+    assert Section.get(type="rollback").count() == 0
+
+def test_get_results_are_lazy(test_app):
+    for i in range(5):
+        Section.create(title=f"Paged {i}", type="paged")
+    results = Section.get(type="paged")
+    assert results.count() == 5
+    first_page = results.page(limit=2)
+    second_page = results.page(after=results.cursor(first_page[-1]), limit=2)
+    assert [s.title for s in first_page + second_page] == [f"Paged {i}" for i in range(4)]
+    by_title = results.page(after=("Paged 3", 0), limit=10, key="title")
+    assert [s.title for s in by_title] == ["Paged 3", "Paged 4"]
+    assert [s.title for s in results.stream(batch_size=2)] == [f"Paged {i}" for i in range(5)]
+    assert Section.search([("type", "=", "paged")], _first=True).title == "Paged 0"
+
+
+class StubItem:
+    def __init__(self, rating_key):
+        self.ratingKey = rating_key
+        self.title = f"Stub {rating_key}"
+
+class StubServer:
+    """Serves ``count`` items of a section page by page, like /all."""
+
+    def __init__(self, section, count, total_size=True):
+        self.section = section
+        self.count = count
+        self.total_size = total_size
+        self.pages = []
+        self._session = SimpleNamespace(hooks={})
+
+    def query(self, ekey, params=None, headers=None):
+        start = int(headers["X-Plex-Container-Start"])
+        size = int(headers["X-Plex-Container-Size"])
+        self.pages.append((start, size, len(self.section.alive)))
+        data = Element("MediaContainer", librarySectionID=str(self.section.key))
+        if self.total_size:
+            data.set("totalSize", str(self.count))
+        for rating_key in range(start, min(start + size, self.count)):
+            SubElement(data, "Video", ratingKey=str(37000 + rating_key))
+        return data
+
+class StubSection:
+    def __init__(self, key, count, total_size=True):
+        self.key = key
+        self.alive = weakref.WeakSet()
+        self._server = StubServer(self, count, total_size)
+
+    def findItems(self, data, initpath=None):
+        items = [StubItem(int(video.get("ratingKey"))) for video in data]
+        self.alive.update(items)
+        return items
+
+def _drain(section, page_size):
+    # Keep only the keys, as a consumer writing items out would.
+    most_alive = 0
+    keys = []
+    for item in Section.iter_media(section, page_size):
+        keys.append(item.ratingKey)
+        most_alive = max(most_alive, len(section.alive))
+        del item
+    return keys, most_alive
+
+def test_iter_media_pages_with_container_headers(test_app):
+    section = StubSection(7, 8)
+    keys, most_alive = _drain(section, 3)
+    assert keys == [37000 + i for i in range(8)]
+    # The short final page ends the read.
+    assert [(start, size) for start, size, _ in section._server.pages] == [(0, 3), (3, 3), (6, 3)]
+    assert most_alive <= 3
+    assert all(alive == 0 for _, _, alive in section._server.pages)
+
+def test_iter_media_stops_at_total_size(test_app):
+    section = StubSection(7, 6)
+    keys, _ = _drain(section, 3)
+    assert len(keys) == 6
+    assert len(section._server.pages) == 2
+
+def test_iter_media_short_page_without_total_size(test_app):
+    section = StubSection(7, 5, total_size=False)
+    keys, _ = _drain(section, 3)
+    assert len(keys) == 5
+    assert len(section._server.pages) == 2
+
+def test_iter_media_sets_section_id(test_app):
+    item = next(Section.iter_media(StubSection(9, 1), 3))
+    assert item.librarySectionID == 9
+
+def test_ingest_writes_every_page(test_app):
+    counts = Section.ingest(StubSection(8, 7), page_size=3)
+    assert counts == {"inserted": 7, "updated": 0, "unchanged": 0}
+    assert sorted(movie.ratingKey for movie in Movie.get(librarySectionID=8)) == [
+        37000 + i for i in range(7)]
+    assert Section.ingest(StubSection(8, 7), page_size=3)["unchanged"] == 7
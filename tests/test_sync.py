@@ -0,0 +1,119 @@
+import copy
+import threading
+import time
+
+import pytest
+from flask import Flask
+from plexapi.server import PlexServer
+
+from app.config import db
+from app.guid import Guid
+from app.library import Library
+from app.movie import Movie
+from app.section import Section
+from app.sync import SectionSyncer, sections_of
+from benchmarks.fake_plex import Catalog, FakePlex
+
+
+@pytest.fixture(scope="module")
+def plex():
+    server = FakePlex(Catalog(30, sections=3)).start()
+    yield PlexServer(server.url, "token")
+    server.shutdown()
+
+def _clear_caches():
+    # The caches are per process; keep ids of the two databases apart.
+    for cache in (Movie._entity_cache, Section._entity_cache, Guid._resolved):
+        cache.clear()
+
+@pytest.fixture(scope="module")
+def file_app(tmp_path_factory):
+    """An app on file-backed SQLite, where workers get their own connections."""
+    flask_app = Flask(__name__)
+    flask_app.config["SQLALCHEMY_DATABASE_URI"] = (
+        f"sqlite:///{tmp_path_factory.mktemp('sync') / 'plex.db'}")
+    db.init_app(flask_app)
+    with flask_app.app_context():
+        db.create_all()
+    _clear_caches()
+    yield flask_app
+    _clear_caches()
+
+def test_sections_of(plex):
+    assert [section.title for section in sections_of(plex.library)] == [
+        "Movies", "Movies 2", "Movies 3"]
+
+def test_failed_section_is_isolated(test_app, plex):
+    progress = []
+    sections = sections_of(plex.library)
+    missing = copy.copy(sections[2])
+    missing.key = 99
+    results = SectionSyncer(workers=4, progress=progress.append).sync(
+        [sections[0], missing, sections[1]])
+    assert [result.status for result in results] == ["done", "failed", "done"]
+    assert "NotFound" in results[1].error
+    assert sorted(result.key for result in progress) == [1, 2, 99]
+    assert len(Movie.get(librarySectionID=1)) == 10
+    assert len(Movie.get(librarySectionID=2)) == 10
+
+def test_library_create_syncs_sections(test_app, plex):
+    library = Library.create(plex.library)
+    assert library.id is not None
+    assert {section.title for section in Section.get()} >= {"Movies", "Movies 2", "Movies 3"}
+    assert len(Movie.get(librarySectionID=3)) == 10
+
+def test_library_create_is_idempotent(test_app, plex):
+    Library.create(plex.library)
+    counts = Library.get().count(), Section.get().count(), Movie.get().count()
+    Library.create(plex.library)
+    assert (Library.get().count(), Section.get().count(), Movie.get().count()) == counts
+
+def test_sections_sync_on_concurrent_workers(file_app, plex, monkeypatch):
+    lock = threading.Lock()
+    running = [0, 0]
+    sync = Section.sync.__func__
+
+    def tracked(cls, *args, **kwargs):
+        with lock:
+            running[0] += 1
+            running[1] = max(running)
+        try:
+            # Hold the worker so the others start before it finishes.
+            time.sleep(0.05)
+            return sync(cls, *args, **kwargs)
+        finally:
+            with lock:
+                running[0] -= 1
+
+    monkeypatch.setattr(Section, "sync", classmethod(tracked))
+    with file_app.app_context():
+        results = SectionSyncer(workers=3).sync(sections_of(plex.library), record=True)
+        assert [result.status for result in results] == ["done"] * 3
+        assert running[1] >= 2
+        assert Movie.get().count() == 30
+        assert Section.get().count() == 3
+
+def test_entity_cache_drops_rows_cached_before_commit(file_app):
+    with file_app.app_context():
+        Movie.bulk_upsert([{"ratingKey": 39000, "title": "Before"}], key="ratingKey")
+        movie = Movie.get_many([39000], _key="ratingKey")[39000]
+        movie.title = "After"
+        db.session.flush()
+        with file_app.app_context():
+            # Another worker reads the committed row in the meantime.
+            assert Movie.get_many([39000], _key="ratingKey")[39000].title == "Before"
+        assert ("ratingKey", 39000) in Movie._entity_cache
+        db.session.commit()
+        assert ("ratingKey", 39000) not in Movie._entity_cache
+
+def test_guid_cache_drops_lookups_cached_before_commit(file_app):
+    with file_app.app_context():
+        Movie.bulk_upsert([{"ratingKey": 39001, "title": "Linked"}], key="ratingKey")
+        movie_id = Movie.get_many([39001], _key="ratingKey")[39001].id
+        Guid.sync_links("movie", {movie_id: ["imdb://tt3900100"]})
+        with file_app.app_context():
+            assert Guid.resolve("imdb://tt3900100") == []
+        assert "imdb://tt3900100" in Guid._resolved
+        db.session.commit()
+        assert "imdb://tt3900100" not in Guid._resolved
+        assert Guid.resolve("imdb://tt3900100") == [("movie", movie_id)]
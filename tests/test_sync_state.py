@@ -0,0 +1,22 @@
+from datetime import datetime
+
+from app.sync_state import SyncState
+
+
+def test_params_without_watermark(test_app):
+    state = SyncState.create(server="abc123", section_key=1)
+    assert state.params() == {}
+
+def test_track_and_advance(test_app):
+    state = SyncState.create(server="abc123", section_key=2)
+    watermarks = {}
+    items = [
+        {"ratingKey": 1, "addedAt": datetime(2022, 12, 30), "updatedAt": datetime(2024, 6, 17)},
+        {"ratingKey": 2, "addedAt": datetime(2023, 1, 5), "updatedAt": datetime(2023, 2, 1)},
+    ]
+    assert list(SyncState.track(items, watermarks)) == items
+    state.advance(watermarks)
+    assert state.last_updated_at == datetime(2024, 6, 17)
+    assert state.last_added_at == datetime(2023, 1, 5)
+    assert state.last_synced_at is not None
+    assert state.params() == {"updatedAt>>": int(datetime(2024, 6, 17).timestamp()) - 1}